@@ -19,8 +19,100 @@ class Settings(BaseSettings):
         default="sqlite+aiosqlite:///./twocards.db",
         validation_alias="DATABASE_URL",
     )
+    database_read_url: str | None = Field(default=None, validation_alias="DATABASE_READ_URL")
+    db_pool_size: int = Field(default=10, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=30.0, validation_alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, validation_alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(default=True, validation_alias="DB_POOL_PRE_PING")
+    db_statement_cache_size: int = Field(default=100, validation_alias="DB_STATEMENT_CACHE_SIZE")
+    db_auto_migrate: bool = Field(default=False, validation_alias="DB_AUTO_MIGRATE")
+
+    audit_batch_size: int = Field(default=200, validation_alias="AUDIT_BATCH_SIZE")
+    audit_flush_interval: float = Field(default=1.0, validation_alias="AUDIT_FLUSH_INTERVAL")
+    audit_queue_size: int = Field(default=10_000, validation_alias="AUDIT_QUEUE_SIZE")
+    audit_retention_policies: dict[str, int] = Field(
+        default_factory=lambda: {"chat.*": 30, "system.status_checked": 7},
+        validation_alias="AUDIT_RETENTION_POLICIES",
+    )
+    audit_retention_batch_size: int = Field(
+        default=1000, validation_alias="AUDIT_RETENTION_BATCH_SIZE"
+    )
+    audit_retention_interval: float = Field(
+        default=0.0, validation_alias="AUDIT_RETENTION_INTERVAL"
+    )
+    audit_archive_dir: str = Field(default="./archive/audit", validation_alias="AUDIT_ARCHIVE_DIR")
+
+    voucher_import_chunk_size: int = Field(
+        default=1000, validation_alias="VOUCHER_IMPORT_CHUNK_SIZE"
+    )
+    voucher_reservation_ttl: int = Field(default=900, validation_alias="VOUCHER_RESERVATION_TTL")
+    voucher_reservation_sweep_interval: float = Field(
+        default=60.0, validation_alias="VOUCHER_RESERVATION_SWEEP_INTERVAL"
+    )
+    voucher_upload_dir: str = Field(
+        default="./uploads/vouchers", validation_alias="VOUCHER_UPLOAD_DIR"
+    )
+    voucher_upload_max_rows: int = Field(
+        default=1_000_000, validation_alias="VOUCHER_UPLOAD_MAX_ROWS"
+    )
+
+    job_poll_interval: float = Field(default=1.0, validation_alias="JOB_POLL_INTERVAL")
+    job_lease_seconds: float = Field(default=120.0, validation_alias="JOB_LEASE_SECONDS")
+    job_max_attempts: int = Field(default=5, validation_alias="JOB_MAX_ATTEMPTS")
+    job_backoff_base: float = Field(default=2.0, validation_alias="JOB_BACKOFF_BASE")
+    job_backoff_max: float = Field(default=300.0, validation_alias="JOB_BACKOFF_MAX")
+    # Per job type overrides of the handler's default concurrency, e.g. {"zid.create_product": 4}.
+    job_concurrency: dict[str, int] = Field(
+        default_factory=dict, validation_alias="JOB_CONCURRENCY"
+    )
+
+    user_cache_ttl: float = Field(default=60.0, validation_alias="USER_CACHE_TTL")
+    user_cache_size: int = Field(default=1024, validation_alias="USER_CACHE_SIZE")
+
+    bcrypt_rounds: int = Field(default=12, validation_alias="BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(default=4, validation_alias="PASSWORD_HASH_WORKERS")
+    password_hash_concurrency: int = Field(default=8, validation_alias="PASSWORD_HASH_CONCURRENCY")
+
+    token_cache_ttl: float = Field(default=300.0, validation_alias="TOKEN_CACHE_TTL")
+    token_cache_size: int = Field(default=4096, validation_alias="TOKEN_CACHE_SIZE")
+
+    ai_cache_ttl: float = Field(default=30 * 24 * 3600.0, validation_alias="AI_CACHE_TTL")
+    ai_cache_size: int = Field(default=1024, validation_alias="AI_CACHE_SIZE")
+    ai_cache_purge_interval: float = Field(
+        default=3600.0, validation_alias="AI_CACHE_PURGE_INTERVAL"
+    )
+    ai_batch_concurrency: int = Field(default=4, validation_alias="AI_BATCH_CONCURRENCY")
+    ai_batch_size: int = Field(default=25, validation_alias="AI_BATCH_SIZE")
+    ai_tokens_per_minute: int = Field(default=60_000, validation_alias="AI_TOKENS_PER_MINUTE")
+
+    http_timeouts: dict[str, float] = Field(default_factory=dict, validation_alias="HTTP_TIMEOUTS")
+    http_max_connections: dict[str, int] = Field(
+        default_factory=dict, validation_alias="HTTP_MAX_CONNECTIONS"
+    )
+    http_keepalive_expiry: float = Field(default=30.0, validation_alias="HTTP_KEEPALIVE_EXPIRY")
+    http_http2: bool = Field(default=False, validation_alias="HTTP_HTTP2")
 
     zid_token: str | None = Field(default=None, validation_alias="ZID_TOKEN")
+    # Starting budget until Zid's rate-limit headers report the real one.
+    zid_rate_limit: int = Field(default=60, validation_alias="ZID_RATE_LIMIT")
+    zid_rate_limit_window: float = Field(default=60.0, validation_alias="ZID_RATE_LIMIT_WINDOW")
+    zid_max_retries: int = Field(default=4, validation_alias="ZID_MAX_RETRIES")
+    zid_backoff_base: float = Field(default=0.5, validation_alias="ZID_BACKOFF_BASE")
+    zid_backoff_max: float = Field(default=30.0, validation_alias="ZID_BACKOFF_MAX")
+    zid_sync_concurrency: int = Field(default=4, validation_alias="ZID_SYNC_CONCURRENCY")
+    zid_sync_batch_size: int = Field(default=50, validation_alias="ZID_SYNC_BATCH_SIZE")
+    zid_store_id: str | None = Field(default=None, validation_alias="ZID_STORE_ID")
+    zid_pull_page_size: int = Field(default=100, validation_alias="ZID_PULL_PAGE_SIZE")
+    zid_pull_interval: float = Field(default=0.0, validation_alias="ZID_PULL_INTERVAL")
+    zid_voucher_chunk_size: int = Field(default=500, validation_alias="ZID_VOUCHER_CHUNK_SIZE")
+    zid_voucher_concurrency: int = Field(default=3, validation_alias="ZID_VOUCHER_CONCURRENCY")
+    zid_webhook_secret: str | None = Field(default=None, validation_alias="ZID_WEBHOOK_SECRET")
+    zid_webhook_batch_size: int = Field(default=100, validation_alias="ZID_WEBHOOK_BATCH_SIZE")
+    zid_webhook_poll_interval: float = Field(
+        default=2.0, validation_alias="ZID_WEBHOOK_POLL_INTERVAL"
+    )
+    zid_webhook_max_attempts: int = Field(default=5, validation_alias="ZID_WEBHOOK_MAX_ATTEMPTS")
     openai_api_key: str | None = Field(default=None, validation_alias="OPENAI_API_KEY")
     whatsapp_token: str | None = Field(default=None, validation_alias="WA_TOKEN")
     whatsapp_phone_id: str | None = Field(default=None, validation_alias="WA_PHONE_ID")
@@ -30,6 +122,10 @@ class Settings(BaseSettings):
         default="twocards-encryption-key-please-change",
         validation_alias="ENCRYPTION_SECRET",
     )
+    # Changing this key invalidates every stored vouchers.code_hash.
+    voucher_code_hash_key: str | None = Field(
+        default=None, validation_alias="VOUCHER_CODE_HASH_KEY"
+    )
 
     cors_allow_origins: list[str] = Field(
         default_factory=lambda: ["http://localhost:5173", "http://127.0.0.1:5173", "*"]
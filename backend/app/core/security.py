@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Callable, Dict, TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from ..utils.cache import TTLCache
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -23,6 +32,84 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Run bcrypt on a bounded thread pool so hashing never blocks the event loop."""
+
+    def __init__(self, *, workers: int, max_concurrency: int) -> None:
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_total = 0.0
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        enqueued = time.perf_counter()
+        async with self._semaphore:
+            started: list[float] = []
+
+            def call() -> T:
+                started.append(time.perf_counter())
+                return func(*args)
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), call)
+        finished = time.perf_counter()
+        queued = started[0] - enqueued
+        self.calls += 1
+        self.queue_time_total += queued
+        self.queue_time_max = max(self.queue_time_max, queued)
+        self.run_time_total += finished - started[0]
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """Verify a password and return a new hash if the stored one uses outdated parameters."""
+
+        return await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "queue_time_avg_ms": round(self.queue_time_total / self.calls * 1000, 2)
+            if self.calls
+            else 0.0,
+            "queue_time_max_ms": round(self.queue_time_max * 1000, 2),
+            "run_time_avg_ms": round(self.run_time_total / self.calls * 1000, 2)
+            if self.calls
+            else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_concurrency=settings.password_hash_concurrency,
+)
+
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     """Create a signed JWT access token."""
 
@@ -36,14 +123,57 @@ def create_access_token(subject: str, expires_delta: timedelta | None = None) ->
     return encoded_jwt
 
 
+token_cache: TTLCache[str, tuple[str, float]] = TTLCache(
+    maxsize=settings.token_cache_size, ttl=settings.token_cache_ttl
+)
+_token_cache_key_id: str | None = None
+
+
+def _signing_key_id() -> str:
+    material = f"{settings.jwt_algorithm}:{settings.secret_key}".encode("utf-8")
+    return hashlib.sha256(material).hexdigest()
+
+
+def clear_token_cache() -> None:
+    """Forget every verified token, e.g. after rotating the signing secret."""
+
+    global _token_cache_key_id
+    token_cache.clear()
+    _token_cache_key_id = _signing_key_id()
+
+
 def decode_token(token: str) -> str:
-    """Decode a JWT token and return the subject."""
+    """Decode a JWT token and return the subject.
+
+    Verified tokens are remembered by digest until they expire, so repeated calls skip
+    signature verification. The cache is dropped whenever the signing key changes.
+    """
+
+    if _token_cache_key_id != _signing_key_id():
+        clear_token_cache()
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        subject, expires_at = cached
+        if time.time() < expires_at:
+            return subject
+        token_cache.pop(digest)
+        raise ValueError("Invalid token")
 
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
         subject = payload.get("sub")
         if subject is None:
             raise ValueError("Token subject missing")
-        return subject
     except JWTError as exc:  # pragma: no cover - runtime guard
         raise ValueError("Invalid token") from exc
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            # python-jose compares whole seconds; reject tokens in their final second too.
+            raise ValueError("Invalid token")
+        token_cache.set(
+            digest, (subject, float(expires_at)), ttl=min(settings.token_cache_ttl, remaining)
+        )
+    return subject
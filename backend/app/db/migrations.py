@@ -0,0 +1,942 @@
+"""Versioned schema migrations.
+
+Apply pending migrations with ``python -m app.db.migrations upgrade`` and inspect the
+current version with ``python -m app.db.migrations current``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    inspect,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..core.security import get_password_hash
+from ..utils.encryption import hash_code
+
+schema_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    schema_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Arbitrary key for the PostgreSQL advisory lock that serialises concurrent upgrades.
+_ADVISORY_LOCK_KEY = 0x7C0D5
+
+
+UpgradeFn = Callable[[Connection], None]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: UpgradeFn
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str) -> Callable[[UpgradeFn], UpgradeFn]:
+    """Register the decorated function as the upgrade step for ``version``."""
+
+    def decorator(func: UpgradeFn) -> UpgradeFn:
+        if any(existing.version == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda item: item.version)
+        return func
+
+    return decorator
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def create_tables(conn: Connection, *tables: Table) -> None:
+    """Create frozen table definitions (with their indexes) if they do not exist yet."""
+
+    for table in tables:
+        table.create(conn, checkfirst=True)
+
+
+def referenced(metadata: MetaData, *names: str) -> None:
+    """Declare existing tables that foreign keys in ``metadata`` point at."""
+
+    for name in names:
+        Table(name, metadata, Column("id", Integer, primary_key=True))
+
+
+def timestamps() -> list[Column]:
+    return [
+        Column("created_at", DateTime, nullable=False),
+        Column("updated_at", DateTime, nullable=False),
+    ]
+
+
+def add_column(conn: Connection, table: str, column: Column) -> None:
+    """Add ``column`` to ``table`` unless it is already present."""
+
+    existing = {item["name"] for item in inspect(conn).get_columns(table)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column.name}" {column_type}'))
+
+
+def create_index(conn: Connection, index: Index) -> None:
+    index.create(conn, checkfirst=True)
+
+
+# Each migration below declares the tables, columns and indexes exactly as they were at
+# its version. Never build them from ``app.models``: those describe the latest schema.
+
+
+@migration(1, "baseline schema")
+def _baseline(conn: Connection) -> None:
+    metadata = MetaData()
+    users = Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("username", String, nullable=False),
+        Column("password_hash", String, nullable=False),
+        Column("role", Enum("ADMIN", "EMPLOYEE", name="userrole"), nullable=False),
+        Column("theme_preference", String, nullable=False),
+        *timestamps(),
+        Index("ix_users_username", "username", unique=True),
+    )
+    products = Table(
+        "products",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name_ar", String, nullable=False),
+        Column("name_en", String),
+        Column("description_ar", String),
+        Column("description_en", String),
+        Column("sku", String),
+        Column("price", Float, nullable=False),
+        Column("currency", String, nullable=False),
+        Column("image_url", String),
+        Column("categories", JSON),
+        Column("zid_product_id", String),
+        Column("is_active", Boolean, nullable=False),
+        Column("last_synced_at", DateTime),
+        *timestamps(),
+        Index("ix_products_sku", "sku", unique=True),
+        Index("ix_products_zid_product_id", "zid_product_id"),
+    )
+    vouchers = Table(
+        "vouchers",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column("code", String, nullable=False),
+        Column("is_redeemed", Boolean, nullable=False),
+        Column("redeemed_at", DateTime),
+        Column("notes", String),
+        *timestamps(),
+        Index("ix_vouchers_code", "code", unique=True),
+    )
+    settings_table = Table(
+        "settings",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("key", String, nullable=False),
+        Column("value_encrypted", String, nullable=False),
+        *timestamps(),
+        Index("ix_settings_key", "key", unique=True),
+    )
+    audit_logs = Table(
+        "audit_logs",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id")),
+        Column("action", String, nullable=False),
+        Column("details", JSON),
+        *timestamps(),
+    )
+    chat_messages = Table(
+        "chat_messages",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("sender_id", Integer, ForeignKey("users.id")),
+        Column("visitor_name", String(120)),
+        Column("content", String, nullable=False),
+        Column("is_command", Boolean, nullable=False),
+        *timestamps(),
+    )
+    create_tables(conn, users, products, vouchers, settings_table, audit_logs, chat_messages)
+
+
+@migration(2, "seed default admin")
+def _seed_admin(conn: Connection) -> None:
+    users = Table(
+        "users",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("username", String),
+        Column("password_hash", String),
+        Column("role", Enum("ADMIN", "EMPLOYEE", name="userrole")),
+        Column("theme_preference", String),
+        *timestamps(),
+    )
+    if conn.execute(select(users.c.id).where(users.c.username == "admin")).first():
+        return
+    now = datetime.utcnow()
+    conn.execute(
+        insert(users).values(
+            username="admin",
+            password_hash=get_password_hash("Admin@123"),
+            role="ADMIN",
+            theme_preference="dark",
+            created_at=now,
+            updated_at=now,
+        )
+    )
+
+
+@migration(3, "audit log keyset indexes")
+def _audit_log_indexes(conn: Connection) -> None:
+    audit_logs = Table(
+        "audit_logs",
+        MetaData(),
+        Column("id", Integer),
+        Column("user_id", Integer),
+        Column("action", String),
+        Column("created_at", DateTime),
+    )
+    columns = audit_logs.c
+    create_index(conn, Index("ix_audit_logs_created_at_id", columns.created_at, columns.id))
+    create_index(
+        conn,
+        Index("ix_audit_logs_action_created_at_id", columns.action, columns.created_at, columns.id),
+    )
+    create_index(
+        conn,
+        Index(
+            "ix_audit_logs_user_id_created_at_id", columns.user_id, columns.created_at, columns.id
+        ),
+    )
+
+
+@migration(4, "audit log daily rollups")
+def _audit_rollups(conn: Connection) -> None:
+    rollups = Table(
+        "audit_log_rollups",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("day", Date, nullable=False),
+        Column("action", String, nullable=False),
+        Column("user_id", Integer),
+        Column("count", Integer, nullable=False),
+        Column("first_at", DateTime, nullable=False),
+        Column("last_at", DateTime, nullable=False),
+        Index("ix_audit_log_rollups_day_action", "day", "action", "user_id"),
+    )
+    create_tables(conn, rollups)
+
+
+@migration(5, "voucher upload staging")
+def _voucher_uploads(conn: Connection) -> None:
+    metadata = MetaData()
+    referenced(metadata, "users", "products")
+    uploads = Table(
+        "voucher_uploads",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column("filename", String, nullable=False),
+        Column("notes", String),
+        Column(
+            "status",
+            Enum(
+                "PARSING", "STAGED", "COMMITTED", "DISCARDED", "FAILED", name="voucheruploadstatus"
+            ),
+            nullable=False,
+        ),
+        Column("created_by", Integer, ForeignKey("users.id")),
+        Column("rows_processed", Integer, nullable=False),
+        Column("valid", Integer, nullable=False),
+        Column("invalid", Integer, nullable=False),
+        Column("duplicates_in_file", Integer, nullable=False),
+        Column("existing", Integer, nullable=False),
+        Column("inserted", Integer, nullable=False),
+        Column("staged_path", String),
+        Column("report", JSON),
+        *timestamps(),
+    )
+    create_tables(conn, uploads)
+
+
+@migration(6, "voucher reservations")
+def _voucher_reservations(conn: Connection) -> None:
+    metadata = MetaData()
+    referenced(metadata, "users", "products")
+    vouchers = Table(
+        "vouchers",
+        metadata,
+        Column("product_id", Integer),
+        Column("is_redeemed", Boolean),
+        Column("reservation_id", String(32)),
+        Column("reserved_until", DateTime),
+    )
+    add_column(conn, "vouchers", vouchers.c.reservation_id)
+    add_column(conn, "vouchers", vouchers.c.reserved_until)
+    create_index(conn, Index("ix_vouchers_reservation_id", vouchers.c.reservation_id))
+    create_index(
+        conn,
+        Index(
+            "ix_vouchers_product_available",
+            vouchers.c.product_id,
+            vouchers.c.is_redeemed,
+            vouchers.c.reserved_until,
+        ),
+    )
+    reservations = Table(
+        "voucher_reservations",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column(
+            "status",
+            Enum("ACTIVE", "CONFIRMED", "RELEASED", name="reservationstatus"),
+            nullable=False,
+        ),
+        Column("expires_at", DateTime, nullable=False),
+        Column("reference", String(120)),
+        Column("created_by", Integer, ForeignKey("users.id")),
+        *timestamps(),
+        Index("ix_voucher_reservations_product_id", "product_id"),
+    )
+    create_tables(conn, reservations)
+
+
+@migration(7, "per-product inventory counters")
+def _inventory_counters(conn: Connection) -> None:
+    metadata = MetaData()
+    referenced(metadata, "products")
+    vouchers = Table(
+        "vouchers",
+        metadata,
+        Column("product_id", Integer),
+        Column("is_redeemed", Boolean),
+        Column("is_locked", Boolean),
+        Column("reservation_id", String(32)),
+    )
+    add_column(conn, "vouchers", vouchers.c.is_locked)
+    conn.execute(
+        update(vouchers).where(vouchers.c.is_locked.is_(None)).values(is_locked=False)
+    )
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TYPE reservationstatus ADD VALUE IF NOT EXISTS 'EXPIRED'"))
+    inventory = Table(
+        "product_inventory",
+        metadata,
+        Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
+        Column("available", Integer, nullable=False),
+        Column("reserved", Integer, nullable=False),
+        Column("redeemed", Integer, nullable=False),
+        Column("locked", Integer, nullable=False),
+        Column("updated_at", DateTime, nullable=False),
+    )
+    create_tables(conn, inventory)
+
+    # Backfill the counters from the vouchers as they stand now.
+    open_code = vouchers.c.is_redeemed.is_(False)
+    held = vouchers.c.reservation_id.isnot(None)
+    locked = vouchers.c.is_locked.is_(True)
+
+    def total(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    counts = select(
+        vouchers.c.product_id,
+        total(open_code & ~held & ~locked),
+        total(open_code & held),
+        total(vouchers.c.is_redeemed.is_(True)),
+        total(open_code & ~held & locked),
+        literal(datetime.utcnow(), DateTime),
+    ).group_by(vouchers.c.product_id)
+    conn.execute(delete(inventory))
+    conn.execute(
+        insert(inventory).from_select(
+            ["product_id", "available", "reserved", "redeemed", "locked", "updated_at"], counts
+        )
+    )
+
+
+@migration(8, "voucher listing index")
+def _voucher_listing_index(conn: Connection) -> None:
+    vouchers = Table(
+        "vouchers",
+        MetaData(),
+        Column("id", Integer),
+        Column("product_id", Integer),
+        Column("created_at", DateTime),
+    )
+    create_index(
+        conn,
+        Index(
+            "ix_vouchers_product_created",
+            vouchers.c.product_id,
+            vouchers.c.created_at,
+            vouchers.c.id,
+        ),
+    )
+
+
+@migration(9, "hashed voucher code index")
+def _voucher_code_hash(conn: Connection) -> None:
+    vouchers = Table(
+        "vouchers",
+        MetaData(),
+        Column("id", Integer),
+        Column("code", String),
+        Column("code_hash", String(64)),
+    )
+    add_column(conn, "vouchers", vouchers.c.code_hash)
+    backfill = (
+        update(vouchers)
+        .where(vouchers.c.id == bindparam("voucher_id"))
+        .values(code_hash=bindparam("digest"))
+    )
+    while True:
+        rows = conn.execute(
+            select(vouchers.c.id, vouchers.c.code)
+            .where(vouchers.c.code_hash.is_(None))
+            .limit(5000)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            backfill, [{"voucher_id": row.id, "digest": hash_code(row.code)} for row in rows]
+        )
+    create_index(conn, Index("ix_vouchers_code_hash", vouchers.c.code_hash, unique=True))
+
+
+@migration(10, "zid catalog sync runs")
+def _zid_sync_runs(conn: Connection) -> None:
+    add_column(conn, "products", Column("zid_payload_hash", String(64)))
+    metadata = MetaData()
+    referenced(metadata, "users")
+    runs = Table(
+        "zid_sync_runs",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column(
+            "status",
+            Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="zidsyncstatus"),
+            nullable=False,
+        ),
+        Column("created_by", Integer, ForeignKey("users.id")),
+        Column("checkpoint", Integer, nullable=False),
+        Column("processed", Integer, nullable=False),
+        Column("pushed", Integer, nullable=False),
+        Column("skipped", Integer, nullable=False),
+        Column("failed", Integer, nullable=False),
+        Column("failures", JSON),
+        Column("error", String),
+        Column("started_at", DateTime, nullable=False),
+        Column("finished_at", DateTime),
+        *timestamps(),
+    )
+    create_tables(conn, runs)
+
+
+@migration(11, "chunked zid voucher exports")
+def _zid_voucher_exports(conn: Connection) -> None:
+    metadata = MetaData()
+    referenced(metadata, "users", "products")
+    exports = Table(
+        "zid_voucher_exports",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column(
+            "status",
+            Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="zidsyncstatus"),
+            nullable=False,
+        ),
+        Column("created_by", Integer, ForeignKey("users.id")),
+        Column("total_codes", Integer, nullable=False),
+        Column("chunk_size", Integer, nullable=False),
+        Column("chunks_total", Integer, nullable=False),
+        Column("chunks_sent", Integer, nullable=False),
+        Column("chunks_failed", Integer, nullable=False),
+        Column("finished_at", DateTime),
+        *timestamps(),
+        Index("ix_zid_voucher_exports_product_id", "product_id"),
+    )
+    chunks = Table(
+        "zid_voucher_chunks",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("export_id", String(32), ForeignKey("zid_voucher_exports.id"), nullable=False),
+        Column("seq", Integer, nullable=False),
+        Column("status", Enum("PENDING", "SENT", "FAILED", name="zidchunkstatus"), nullable=False),
+        Column("voucher_ids", JSON, nullable=False),
+        Column("attempts", Integer, nullable=False),
+        Column("error", String),
+        *timestamps(),
+        Index("ix_zid_voucher_chunks_export_id", "export_id"),
+    )
+    create_tables(conn, exports, chunks)
+
+
+@migration(12, "zid catalog pull cursors")
+def _zid_pull_cursors(conn: Connection) -> None:
+    cursors = Table(
+        "zid_pull_cursors",
+        MetaData(),
+        Column("store", String(64), primary_key=True),
+        Column("updated_since", DateTime),
+        Column("last_run_at", DateTime),
+        Column("last_report", JSON),
+    )
+    create_tables(conn, cursors)
+
+
+@migration(13, "background job queue")
+def _jobs(conn: Connection) -> None:
+    jobs = Table(
+        "jobs",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("type", String(64), nullable=False),
+        Column("payload", JSON, nullable=False),
+        Column(
+            "status",
+            Enum("PENDING", "RUNNING", "SUCCEEDED", "DEAD", name="jobstatus"),
+            nullable=False,
+        ),
+        Column("attempts", Integer, nullable=False),
+        Column("max_attempts", Integer, nullable=False),
+        Column("run_after", DateTime, nullable=False),
+        Column("lease_until", DateTime),
+        Column("locked_by", String(64)),
+        Column("last_error", String),
+        Column("finished_at", DateTime),
+        *timestamps(),
+        Index("ix_jobs_type_status_run_after", "type", "status", "run_after"),
+    )
+    create_tables(conn, jobs)
+
+
+@migration(14, "zid webhook events")
+def _zid_webhook_events(conn: Connection) -> None:
+    metadata = MetaData()
+    events = Table(
+        "zid_webhook_events",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("event_id", String(128), nullable=False, unique=True),
+        Column("event_type", String(64), nullable=False),
+        Column("payload", JSON, nullable=False),
+        Column(
+            "status",
+            Enum(
+                "RECEIVED", "PROCESSING", "PROCESSED", "IGNORED", "FAILED", name="zidwebhookstatus"
+            ),
+            nullable=False,
+        ),
+        Column("attempts", Integer, nullable=False),
+        Column("lease_until", DateTime),
+        Column("error", String),
+        Column("processed_at", DateTime),
+        *timestamps(),
+        Index("ix_zid_webhook_events_status_id", "status", "id"),
+    )
+    create_tables(conn, events)
+    reservations = Table("voucher_reservations", metadata, Column("reference", String(120)))
+    create_index(conn, Index("ix_voucher_reservations_reference", reservations.c.reference))
+
+
+@migration(15, "ai completion cache")
+def _ai_cache(conn: Connection) -> None:
+    entries = Table(
+        "ai_cache_entries",
+        MetaData(),
+        Column("key", String(64), primary_key=True),
+        Column("model", String(64), nullable=False),
+        Column("content", Text, nullable=False),
+        Column("hits", Integer, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Column("expires_at", DateTime, nullable=False),
+        Index("ix_ai_cache_entries_expires_at", "expires_at"),
+    )
+    create_tables(conn, entries)
+
+
+@migration(16, "bulk ai description runs")
+def _ai_description_runs(conn: Connection) -> None:
+    metadata = MetaData()
+    referenced(metadata, "users")
+    runs = Table(
+        "ai_description_runs",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column(
+            "status",
+            Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="airunstatus"),
+            nullable=False,
+        ),
+        Column("created_by", Integer, ForeignKey("users.id")),
+        Column("options", JSON, nullable=False),
+        Column("total", Integer, nullable=False),
+        Column("checkpoint", Integer, nullable=False),
+        Column("processed", Integer, nullable=False),
+        Column("succeeded", Integer, nullable=False),
+        Column("cached", Integer, nullable=False),
+        Column("failed", Integer, nullable=False),
+        Column("tokens_used", Integer, nullable=False),
+        Column("failures", JSON),
+        Column("error", String),
+        Column("started_at", DateTime, nullable=False),
+        Column("finished_at", DateTime),
+        *timestamps(),
+    )
+    create_tables(conn, runs)
+
+
+@migration(17, "sequence zid webhook events per order")
+def _zid_webhook_order_key(conn: Connection) -> None:
+    events = Table(
+        "zid_webhook_events",
+        MetaData(),
+        Column("id", Integer),
+        Column("event_type", String(64)),
+        Column("payload", JSON),
+        Column(
+            "status",
+            Enum(
+                "RECEIVED", "PROCESSING", "PROCESSED", "IGNORED", "FAILED", name="zidwebhookstatus"
+            ),
+        ),
+        Column("order_key", String(64)),
+    )
+
+    def key_of(event_type: str, payload: dict) -> str | None:
+        if not event_type.startswith("order."):
+            return None
+        order = next(
+            (payload[name] for name in ("order", "data") if isinstance(payload.get(name), dict)),
+            payload,
+        )
+        return None if order.get("id") is None else f"order:{order['id']}"[:64]
+
+    add_column(conn, "zid_webhook_events", events.c.order_key)
+    create_index(
+        conn, Index("ix_zid_webhook_events_order_key_id", events.c.order_key, events.c.id)
+    )
+    # Only events still waiting to be applied need a key.
+    rows = conn.execute(
+        select(events.c.id, events.c.event_type, events.c.payload).where(
+            events.c.status.in_(["RECEIVED", "PROCESSING"])
+        )
+    ).all()
+    keys = [
+        {"event_id": row.id, "key": key_of(row.event_type, row.payload or {})} for row in rows
+    ]
+    keys = [item for item in keys if item["key"]]
+    if keys:
+        conn.execute(
+            update(events)
+            .where(events.c.id == bindparam("event_id"))
+            .values(order_key=bindparam("key")),
+            keys,
+        )
+
+
+@migration(18, "run zid voucher exports on the job queue")
+def _zid_export_jobs(conn: Connection) -> None:
+    metadata = MetaData()
+    exports = Table(
+        "zid_voucher_exports",
+        metadata,
+        Column("id", String(32)),
+        Column(
+            "status", Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="zidsyncstatus")
+        ),
+    )
+    jobs = Table(
+        "jobs",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("type", String(64)),
+        Column("payload", JSON),
+        Column("status", Enum("PENDING", "RUNNING", "SUCCEEDED", "DEAD", name="jobstatus")),
+        Column("attempts", Integer),
+        Column("max_attempts", Integer),
+        Column("run_after", DateTime),
+        *timestamps(),
+    )
+    # Exports used to be resumed by every process at startup; queue the unfinished ones once.
+    export_ids = conn.execute(select(exports.c.id).where(exports.c.status == "RUNNING")).scalars()
+    now = datetime.utcnow()
+    rows = [
+        {
+            "type": "zid.export_vouchers",
+            "payload": {"export_id": export_id},
+            "status": "PENDING",
+            "attempts": 0,
+            "max_attempts": 5,
+            "run_after": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for export_id in export_ids
+    ]
+    if rows:
+        conn.execute(insert(jobs), rows)
+
+
+@migration(19, "zid catalog sync runs on the job queue")
+def _zid_sync_run_jobs(conn: Connection) -> None:
+    runs = Table(
+        "zid_sync_runs",
+        MetaData(),
+        Column(
+            "status", Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="zidsyncstatus")
+        ),
+        Column("job_id", Integer),
+        Column("updated_at", DateTime),
+    )
+    add_column(conn, "zid_sync_runs", runs.c.job_id)
+    # Runs started by older versions have no job to continue them; they can be resumed.
+    conn.execute(
+        update(runs)
+        .where(runs.c.status == "RUNNING")
+        .values(status="INTERRUPTED", updated_at=datetime.utcnow())
+    )
+    create_index(
+        conn,
+        Index(
+            "ix_zid_sync_runs_running",
+            runs.c.status,
+            unique=True,
+            sqlite_where=text("status = 'RUNNING'"),
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+
+
+@migration(20, "ai description runs on the job queue")
+def _ai_description_run_jobs(conn: Connection) -> None:
+    runs = Table(
+        "ai_description_runs",
+        MetaData(),
+        Column(
+            "status", Enum("RUNNING", "COMPLETED", "FAILED", "INTERRUPTED", name="airunstatus")
+        ),
+        Column("job_id", Integer),
+        Column("updated_at", DateTime),
+    )
+    add_column(conn, "ai_description_runs", runs.c.job_id)
+    # Runs started by older versions have no job to continue them; they can be resumed.
+    conn.execute(
+        update(runs)
+        .where(runs.c.status == "RUNNING")
+        .values(status="INTERRUPTED", updated_at=datetime.utcnow())
+    )
+    create_index(
+        conn,
+        Index(
+            "ix_ai_description_runs_running",
+            runs.c.status,
+            unique=True,
+            sqlite_where=text("status = 'RUNNING'"),
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+
+
+@migration(21, "one audit rollup row per bucket")
+def _audit_rollup_buckets(conn: Connection) -> None:
+    rollups = Table(
+        "audit_log_rollups",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("day", Date),
+        Column("action", String),
+        Column("user_id", Integer),
+        Column("count", Integer),
+        Column("first_at", DateTime),
+        Column("last_at", DateTime),
+    )
+    bucket = (rollups.c.day, rollups.c.action, func.coalesce(rollups.c.user_id, 0))
+    # Concurrent retention runs could insert the same bucket twice; fold them together.
+    duplicates = conn.execute(
+        select(
+            *bucket,
+            func.min(rollups.c.id),
+            func.sum(rollups.c.count),
+            func.min(rollups.c.first_at),
+            func.max(rollups.c.last_at),
+        )
+        .group_by(*bucket)
+        .having(func.count() > 1)
+    ).all()
+    for day, action, user_key, keep_id, total, first_at, last_at in duplicates:
+        conn.execute(
+            update(rollups)
+            .where(rollups.c.id == keep_id)
+            .values(count=total, first_at=first_at, last_at=last_at)
+        )
+        conn.execute(
+            delete(rollups).where(
+                rollups.c.day == day,
+                rollups.c.action == action,
+                func.coalesce(rollups.c.user_id, 0) == user_key,
+                rollups.c.id != keep_id,
+            )
+        )
+    create_index(
+        conn,
+        Index(
+            "ix_audit_log_rollups_bucket",
+            rollups.c.day,
+            rollups.c.action,
+            text("coalesce(user_id, 0)"),
+            unique=True,
+        ),
+    )
+
+
+@migration(22, "unique zid product ids")
+def _unique_zid_product_ids(conn: Connection) -> None:
+    products = Table(
+        "products",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("zid_product_id", String),
+    )
+    # Concurrent pulls could insert the same Zid product twice. Keep the oldest row linked;
+    # the copies stay as local products (already in sync, so they are not pushed back).
+    keep_ids = (
+        select(func.min(products.c.id))
+        .where(products.c.zid_product_id.is_not(None))
+        .group_by(products.c.zid_product_id)
+    )
+    conn.execute(
+        update(products)
+        .where(products.c.zid_product_id.is_not(None), products.c.id.not_in(keep_ids))
+        .values(zid_product_id=None)
+    )
+    Index("ix_products_zid_product_id", products.c.zid_product_id).drop(conn, checkfirst=True)
+    create_index(
+        conn, Index("ix_products_zid_product_id", products.c.zid_product_id, unique=True)
+    )
+
+
+def _upgrade(conn: Connection, target: int | None) -> list[int]:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+    schema_migrations.create(conn, checkfirst=True)
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    performed: list[int] = []
+    for step in MIGRATIONS:
+        if step.version in applied or (target is not None and step.version > target):
+            continue
+        step.upgrade(conn)
+        conn.execute(
+            insert(schema_migrations).values(
+                version=step.version,
+                description=step.description,
+                applied_at=datetime.utcnow(),
+            )
+        )
+        performed.append(step.version)
+    return performed
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Return the applied schema version with a single query (0 for an empty database)."""
+
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(func.max(schema_migrations.c.version)))
+            return result.scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+async def upgrade(engine: AsyncEngine, target: int | None = None) -> list[int]:
+    """Apply pending migrations in one transaction and return the versions applied."""
+
+    try:
+        async with engine.begin() as conn:
+            return await conn.run_sync(_upgrade, target)
+    except IntegrityError:
+        # Another process applied the same version first (SQLite has no advisory lock);
+        # its transaction is committed, so only a schema still behind is an error.
+        wanted = latest_version() if target is None else target
+        if await current_version(engine) >= wanted:
+            return []
+        raise
+
+
+async def _main(command: str, target: int | None) -> None:
+    from .session import engine
+
+    try:
+        if command == "current":
+            print(f"current: {await current_version(engine)}, latest: {latest_version()}")
+            return
+        performed = await upgrade(engine, target)
+        if performed:
+            print("applied: " + ", ".join(str(version) for version in performed))
+        else:
+            print("schema is up to date")
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="stop at this version")
+    commands.add_parser("current", help="show the applied schema version")
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args.command, getattr(args, "to", None)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,79 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
-from sqlmodel import SQLModel
-from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core.config import settings
 
 
-engine: AsyncEngine = create_async_engine(settings.database_url, echo=False, future=True)
+def _engine_options(database_url: str) -> dict[str, Any]:
+    """Build pool and driver options for the given database URL."""
+
+    url = make_url(database_url)
+    options: dict[str, Any] = {
+        "echo": False,
+        "future": True,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if url.get_backend_name() == "sqlite":
+        # SQLite picks its own pool class; sizing options do not apply.
+        return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return options
+
 
+def _create_engine(database_url: str) -> AsyncEngine:
+    return create_async_engine(database_url, **_engine_options(database_url))
 
-async def init_db() -> None:
-    """Create all database tables."""
 
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+engine: AsyncEngine = _create_engine(settings.database_url)
+read_engine: AsyncEngine = (
+    _create_engine(settings.database_read_url) if settings.database_read_url else engine
+)
 
 
-@asynccontextmanager
-def get_session() -> AsyncSession:
+async def get_session() -> AsyncIterator[AsyncSession]:
     """Provide an async database session dependency."""
 
-    async_session = AsyncSession(engine, expire_on_commit=False)
-    try:
-        yield async_session
-    finally:
-        await async_session.close()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Provide a session bound to the read replica, or the primary if none is set."""
+
+    async with AsyncSession(read_engine, expire_on_commit=False) as session:
+        yield session
+
+
+session_scope = asynccontextmanager(get_session)
+
+
+def _pool_stats(target: AsyncEngine) -> dict[str, Any]:
+    pool = target.pool
+    stats: dict[str, Any] = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def pool_status() -> dict[str, dict[str, Any]]:
+    """Return connection pool statistics for the primary and replica engines."""
+
+    status = {"primary": _pool_stats(engine)}
+    if read_engine is not engine:
+        status["replica"] = _pool_stats(read_engine)
+    return status
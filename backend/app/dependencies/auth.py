@@ -5,12 +5,37 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ..core.config import settings
 from ..core.security import decode_token
 from ..db.session import get_session
 from ..models import User
+from ..utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+user_cache: TTLCache[str, User] = TTLCache(
+    maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl
+)
+
+
+async def load_user(session: AsyncSession, username: str) -> User | None:
+    """Return the user for a token subject, served from the TTL cache when possible."""
+
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    result = await session.exec(select(User).where(User.username == username))
+    user = result.one_or_none()
+    if user is not None:
+        user_cache.set(username, user)
+    return user
+
+
+def invalidate_user(username: str) -> None:
+    """Drop a cached user so the next request reloads it from the database."""
+
+    user_cache.pop(username)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)
@@ -20,8 +45,7 @@ async def get_current_user(
     except ValueError as exc:  # pragma: no cover - runtime guard
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
-    result = await session.exec(select(User).where(User.username == subject))
-    user = result.one_or_none()
+    user = await load_user(session, subject)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
@@ -1,25 +1,46 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import select
 
 from .core.config import settings
-from .core.security import get_password_hash
-from .db.session import get_session, init_db
-from .models import User, UserRole
+from .core.security import password_hasher
+from .db import migrations
+from .db.session import engine, session_scope
 from .routers import (
     ai,
     auth,
     chat,
+    jobs,
     logs,
     products,
     settings as settings_router,
     system,
     users,
     vouchers,
+    webhooks,
     whatsapp,
 )
+from .services import (
+    ai_batch,
+    ai_cache,
+    audit,
+    audit_retention,
+    http_clients,
+    jobs as job_service,
+    vouchers as voucher_service,
+    zid_pull,
+    zid_sync,
+    zid_webhooks,
+)
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title=settings.app_name)
 
@@ -32,20 +53,66 @@ app.add_middleware(
 )
 
 
+@contextmanager
+def _phase(timings: dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
-    await init_db()
-    async with get_session() as session:
-        result = await session.exec(select(User).where(User.username == "admin"))
-        admin = result.one_or_none()
-        if not admin:
-            user = User(
-                username="admin",
-                password_hash=get_password_hash("Admin@123"),
-                role=UserRole.ADMIN,
+    timings: dict[str, float] = {}
+    with _phase(timings, "schema_check"):
+        version = await migrations.current_version(engine)
+    if version < migrations.latest_version():
+        if not settings.db_auto_migrate:
+            raise RuntimeError(
+                f"Database schema is at version {version}, expected "
+                f"{migrations.latest_version()}; run `python -m app.db.migrations upgrade`"
             )
-            session.add(user)
-            await session.commit()
+        with _phase(timings, "migrate"):
+            await migrations.upgrade(engine)
+    with _phase(timings, "audit_writer"):
+        audit.writer.start()
+    async with session_scope() as session:
+        await zid_sync.mark_interrupted(session)
+        await ai_batch.mark_interrupted(session)
+    job_service.worker.start()
+    zid_webhooks.processor.start()
+    if settings.audit_retention_interval > 0:
+        app.state.retention_task = asyncio.create_task(
+            audit_retention.run_periodically(settings.audit_retention_interval)
+        )
+    if settings.voucher_reservation_sweep_interval > 0:
+        app.state.reservation_sweeper = asyncio.create_task(
+            voucher_service.run_sweeper_periodically(settings.voucher_reservation_sweep_interval)
+        )
+    if settings.ai_cache_purge_interval > 0:
+        app.state.ai_cache_purge_task = asyncio.create_task(
+            ai_cache.run_purge_periodically(settings.ai_cache_purge_interval)
+        )
+    if settings.zid_pull_interval > 0:
+        app.state.zid_pull_task = asyncio.create_task(
+            zid_pull.run_periodically(settings.zid_pull_interval)
+        )
+    app.state.startup_timings = timings
+    logger.info("Startup phases (ms): %s", timings)
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for name in ("retention_task", "reservation_sweeper", "zid_pull_task", "ai_cache_purge_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    await zid_webhooks.processor.stop()
+    await job_service.worker.stop()
+    await audit.writer.stop()
+    await http_clients.registry.aclose()
+    password_hasher.shutdown()
 
 
 app.include_router(auth.router)
@@ -58,6 +125,8 @@ app.include_router(ai.router)
 app.include_router(whatsapp.router)
 app.include_router(chat.router)
 app.include_router(system.router)
+app.include_router(jobs.router)
+app.include_router(webhooks.router)
 
 
 @app.get("/healthz")
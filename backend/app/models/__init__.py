@@ -1,19 +1,57 @@
 from .user import User, UserCreate, UserRead, UserRole, UserUpdate
 from .product import Product
-from .voucher import Voucher
+from .voucher import (
+    ReservationStatus,
+    Voucher,
+    VoucherReservation,
+    VoucherUpload,
+    VoucherUploadStatus,
+)
+from .inventory import ProductInventory
+from .job import Job, JobStatus
+from .ai import AICacheEntry, AIDescriptionRun, AIRunStatus
 from .setting import Setting
-from .audit import AuditLog
+from .audit import AuditLog, AuditLogRollup
 from .chat import ChatMessage
+from .zid import (
+    ZidChunkStatus,
+    ZidPullCursor,
+    ZidSyncRun,
+    ZidSyncStatus,
+    ZidVoucherChunk,
+    ZidVoucherExport,
+    ZidWebhookEvent,
+    ZidWebhookStatus,
+)
 
 __all__ = [
+    "AICacheEntry",
+    "AIDescriptionRun",
+    "AIRunStatus",
     "User",
     "UserCreate",
     "UserRead",
     "UserRole",
     "UserUpdate",
+    "Job",
+    "JobStatus",
     "Product",
+    "ProductInventory",
+    "ReservationStatus",
     "Voucher",
+    "VoucherReservation",
+    "VoucherUpload",
+    "VoucherUploadStatus",
     "Setting",
     "AuditLog",
+    "AuditLogRollup",
     "ChatMessage",
+    "ZidChunkStatus",
+    "ZidPullCursor",
+    "ZidSyncRun",
+    "ZidSyncStatus",
+    "ZidVoucherChunk",
+    "ZidVoucherExport",
+    "ZidWebhookEvent",
+    "ZidWebhookStatus",
 ]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import JSON, Column, Index, Text, text
+from sqlmodel import Field, SQLModel
+
+from .base import TimestampedModel
+
+
+class AICacheEntry(SQLModel, table=True):
+    """A stored completion, keyed by a digest of everything that determines it."""
+
+    __tablename__ = "ai_cache_entries"
+
+    key: str = Field(primary_key=True, max_length=64)
+    model: str = Field(max_length=64)
+    content: str = Field(sa_column=Column(Text, nullable=False))
+    hits: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(index=True)
+
+
+class AIRunStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"
+
+
+class AIDescriptionRun(TimestampedModel, table=True):
+    """A bulk description generation over a filtered set of products."""
+
+    __tablename__ = "ai_description_runs"
+    __table_args__ = (
+        # At most one run is ``running`` at a time, whichever process started it.
+        Index(
+            "ix_ai_description_runs_running",
+            "status",
+            unique=True,
+            sqlite_where=text("status = 'RUNNING'"),
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+
+    id: str = Field(primary_key=True, max_length=32)
+    status: AIRunStatus = Field(default=AIRunStatus.RUNNING)
+    created_by: int | None = Field(default=None, foreign_key="users.id")
+    # The ``ai.description_batch`` job carrying the run; its lease is the run's lease.
+    job_id: int | None = Field(default=None)
+    options: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    total: int = Field(default=0)
+    checkpoint: int = Field(default=0)
+    processed: int = Field(default=0)
+    succeeded: int = Field(default=0)
+    cached: int = Field(default=0)
+    failed: int = Field(default=0)
+    tokens_used: int = Field(default=0)
+    failures: list[dict] | None = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: str | None = None
+    started_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: datetime | None = None
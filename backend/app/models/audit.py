@@ -1,17 +1,48 @@
 from __future__ import annotations
 
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Column, JSON
-from sqlmodel import Field
+from sqlalchemy import Column, Index, JSON, text
+from sqlmodel import Field, SQLModel
 
 from .base import TimestampedModel
 
 
 class AuditLog(TimestampedModel, table=True):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        Index("ix_audit_logs_action_created_at_id", "action", "created_at", "id"),
+        Index("ix_audit_logs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int | None = Field(default=None, foreign_key="users.id")
     action: str
     details: dict | None = Field(default=None, sa_column=Column(JSON, nullable=True))
+
+
+class AuditLogRollup(SQLModel, table=True):
+    """Daily per-action/per-user counts kept after raw audit rows are purged."""
+
+    __tablename__ = "audit_log_rollups"
+    __table_args__ = (
+        Index("ix_audit_log_rollups_day_action", "day", "action", "user_id"),
+        # One row per bucket; system actions (no user) share the ``0`` slot.
+        Index(
+            "ix_audit_log_rollups_bucket",
+            "day",
+            "action",
+            text("coalesce(user_id, 0)"),
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: date = Field(nullable=False)
+    action: str
+    user_id: int | None = Field(default=None)
+    count: int = Field(default=0)
+    first_at: datetime
+    last_at: datetime
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class ProductInventory(SQLModel, table=True):
+    """Maintained voucher counts per product, updated in the same transaction as the vouchers."""
+
+    __tablename__ = "product_inventory"
+
+    product_id: int = Field(foreign_key="products.id", primary_key=True)
+    available: int = Field(default=0)
+    reserved: int = Field(default=0)
+    redeemed: int = Field(default=0)
+    locked: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
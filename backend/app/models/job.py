@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Column, Index, JSON
+from sqlmodel import Field
+
+from .base import TimestampedModel
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"
+
+
+class Job(TimestampedModel, table=True):
+    """A unit of background work, written in the same transaction as the change it follows."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_type_status_run_after", "type", "status", "run_after"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    type: str = Field(max_length=64)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    status: JobStatus = Field(default=JobStatus.PENDING)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_after: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    lease_until: datetime | None = None
+    locked_by: str | None = Field(default=None, max_length=64)
+    last_error: str | None = None
+    finished_at: datetime | None = None
@@ -25,6 +25,8 @@ class Product(TimestampedModel, table=True):
         default=None,
         sa_column=Column(JSON, nullable=True),
     )
-    zid_product_id: str | None = Field(default=None, index=True)
+    zid_product_id: str | None = Field(default=None, unique=True, index=True)
     is_active: bool = Field(default=True)
     last_synced_at: datetime | None = None
+    # Digest of the payload last accepted by Zid, used to skip unchanged products.
+    zid_payload_hash: str | None = Field(default=None, max_length=64)
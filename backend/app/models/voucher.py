@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
+from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Column, Index, JSON
 from sqlmodel import Field
 
 from .base import TimestampedModel
@@ -10,10 +12,68 @@ from .base import TimestampedModel
 
 class Voucher(TimestampedModel, table=True):
     __tablename__ = "vouchers"
+    __table_args__ = (
+        Index("ix_vouchers_product_available", "product_id", "is_redeemed", "reserved_until"),
+        Index("ix_vouchers_product_created", "product_id", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     product_id: int = Field(foreign_key="products.id")
     code: str = Field(index=True, unique=True)
+    code_hash: str | None = Field(default=None, index=True, unique=True, max_length=64)
     is_redeemed: bool = Field(default=False)
     redeemed_at: datetime | None = None
     notes: str | None = None
+    is_locked: bool = Field(default=False)
+    reservation_id: str | None = Field(default=None, index=True, max_length=32)
+    reserved_until: datetime | None = None
+
+
+class ReservationStatus(str, Enum):
+    ACTIVE = "active"
+    CONFIRMED = "confirmed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+
+
+class VoucherReservation(TimestampedModel, table=True):
+    """A hold on a set of vouchers for one order, valid until ``expires_at``."""
+
+    __tablename__ = "voucher_reservations"
+
+    id: str = Field(primary_key=True, max_length=32)
+    product_id: int = Field(foreign_key="products.id", index=True)
+    quantity: int
+    status: ReservationStatus = Field(default=ReservationStatus.ACTIVE)
+    expires_at: datetime
+    reference: str | None = Field(default=None, index=True, max_length=120)
+    created_by: int | None = Field(default=None, foreign_key="users.id")
+
+
+class VoucherUploadStatus(str, Enum):
+    PARSING = "parsing"
+    STAGED = "staged"
+    COMMITTED = "committed"
+    DISCARDED = "discarded"
+    FAILED = "failed"
+
+
+class VoucherUpload(TimestampedModel, table=True):
+    """A voucher file that has been parsed and staged, awaiting approval."""
+
+    __tablename__ = "voucher_uploads"
+
+    id: str = Field(primary_key=True, max_length=32)
+    product_id: int = Field(foreign_key="products.id")
+    filename: str
+    notes: str | None = None
+    status: VoucherUploadStatus = Field(default=VoucherUploadStatus.PARSING)
+    created_by: int | None = Field(default=None, foreign_key="users.id")
+    rows_processed: int = Field(default=0)
+    valid: int = Field(default=0)
+    invalid: int = Field(default=0)
+    duplicates_in_file: int = Field(default=0)
+    existing: int = Field(default=0)
+    inserted: int = Field(default=0)
+    staged_path: str | None = None
+    report: dict | None = Field(default=None, sa_column=Column(JSON, nullable=True))
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Column, Index, JSON, text
+from sqlmodel import Field, SQLModel
+
+from .base import TimestampedModel
+
+
+class ZidSyncStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"
+
+
+class ZidSyncRun(TimestampedModel, table=True):
+    """Progress and outcome of one bulk catalog push to Zid."""
+
+    __tablename__ = "zid_sync_runs"
+    __table_args__ = (
+        # At most one run is ``running`` at a time, whichever process started it.
+        Index(
+            "ix_zid_sync_runs_running",
+            "status",
+            unique=True,
+            sqlite_where=text("status = 'RUNNING'"),
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+
+    id: str = Field(primary_key=True, max_length=32)
+    status: ZidSyncStatus = Field(default=ZidSyncStatus.RUNNING)
+    created_by: int | None = Field(default=None, foreign_key="users.id")
+    # The ``zid.catalog_sync`` job carrying the run; its lease is the run's lease.
+    job_id: int | None = Field(default=None)
+    # Highest product id fully handled; a resumed run continues after it.
+    checkpoint: int = Field(default=0)
+    processed: int = Field(default=0)
+    pushed: int = Field(default=0)
+    skipped: int = Field(default=0)
+    failed: int = Field(default=0)
+    failures: list[dict] | None = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: str | None = None
+    started_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: datetime | None = None
+
+
+class ZidChunkStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class ZidVoucherExport(TimestampedModel, table=True):
+    """A batch of vouchers being uploaded to Zid in chunks."""
+
+    __tablename__ = "zid_voucher_exports"
+
+    id: str = Field(primary_key=True, max_length=32)
+    product_id: int = Field(foreign_key="products.id", index=True)
+    status: ZidSyncStatus = Field(default=ZidSyncStatus.RUNNING)
+    created_by: int | None = Field(default=None, foreign_key="users.id")
+    total_codes: int = Field(default=0)
+    chunk_size: int
+    chunks_total: int = Field(default=0)
+    chunks_sent: int = Field(default=0)
+    chunks_failed: int = Field(default=0)
+    finished_at: datetime | None = None
+
+
+class ZidVoucherChunk(TimestampedModel, table=True):
+    """One request's worth of an export; codes are re-read from ``vouchers`` by id."""
+
+    __tablename__ = "zid_voucher_chunks"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    export_id: str = Field(foreign_key="zid_voucher_exports.id", index=True, max_length=32)
+    seq: int
+    status: ZidChunkStatus = Field(default=ZidChunkStatus.PENDING)
+    voucher_ids: list[int] = Field(sa_column=Column(JSON, nullable=False))
+    attempts: int = Field(default=0)
+    error: str | None = None
+
+
+class ZidPullCursor(SQLModel, table=True):
+    """High-water mark of the last completed catalog pull for one Zid store."""
+
+    __tablename__ = "zid_pull_cursors"
+
+    store: str = Field(primary_key=True, max_length=64)
+    updated_since: datetime | None = None
+    last_run_at: datetime | None = None
+    last_report: dict | None = Field(default=None, sa_column=Column(JSON, nullable=True))
+
+
+class ZidWebhookStatus(str, Enum):
+    RECEIVED = "received"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    IGNORED = "ignored"
+    FAILED = "failed"
+
+
+class ZidWebhookEvent(TimestampedModel, table=True):
+    """A verified Zid webhook delivery, stored as received and processed later."""
+
+    __tablename__ = "zid_webhook_events"
+    __table_args__ = (
+        Index("ix_zid_webhook_events_status_id", "status", "id"),
+        Index("ix_zid_webhook_events_order_key_id", "order_key", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    event_id: str = Field(unique=True, max_length=128)
+    event_type: str = Field(max_length=64)
+    # Events sharing a key (one Zid order) are applied strictly one after another.
+    order_key: str | None = Field(default=None, max_length=64)
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    status: ZidWebhookStatus = Field(default=ZidWebhookStatus.RECEIVED)
+    attempts: int = Field(default=0)
+    lease_until: datetime | None = None
+    error: str | None = None
+    processed_at: datetime | None = None
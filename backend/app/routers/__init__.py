@@ -2,12 +2,14 @@ from . import (
     ai,
     auth,
     chat,
+    jobs,
     logs,
     products,
     settings,
     system,
     users,
     vouchers,
+    webhooks,
     whatsapp,
 )
 
@@ -15,11 +17,13 @@ __all__ = [
     "ai",
     "auth",
     "chat",
+    "jobs",
     "logs",
     "products",
     "settings",
     "system",
     "users",
     "vouchers",
+    "webhooks",
     "whatsapp",
 ]
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
-from ..dependencies.auth import get_current_user
-from ..models import User
-from ..services import ai, audit
+from ..db.session import get_read_session, get_session, session_scope
+from ..dependencies.auth import get_current_admin, get_current_user
+from ..models import AIDescriptionRun, User
+from ..schemas import AIDescriptionRunRead
+from ..services import ai, ai_batch, audit
+from ..utils.sse import format_event
 
 router = APIRouter(prefix="/api/v1/ai", tags=["ai"])
 
@@ -15,12 +20,20 @@ router = APIRouter(prefix="/api/v1/ai", tags=["ai"])
 class DescriptionRequest(BaseModel):
     name_ar: str
     hints: str | None = None
+    bypass_cache: bool = False
 
 
 class ImageRequest(BaseModel):
     prompt: str
 
 
+class DescriptionRunRequest(BaseModel):
+    only_missing: bool = Field(default=True, description="المنتجات التي لا تملك وصفًا فقط")
+    product_ids: list[int] | None = None
+    is_active: bool | None = None
+    hints: str | None = None
+
+
 @router.post("/description")
 async def generate_description(
     payload: DescriptionRequest,
@@ -28,7 +41,9 @@ async def generate_description(
     current_user: User = Depends(get_current_user),
 ) -> dict[str, str]:
     try:
-        description = await ai.generate_product_description(payload.name_ar, payload.hints)
+        description = await ai.generate_product_description(
+            payload.name_ar, payload.hints, bypass_cache=payload.bypass_cache
+        )
     except Exception as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
     await audit.log_action(
@@ -40,6 +55,47 @@ async def generate_description(
     return {"description": description}
 
 
+async def _description_events(
+    payload: DescriptionRequest, user_id: int | None
+) -> AsyncIterator[str]:
+    # Opened here rather than in the endpoint: a client that disconnects before the body
+    # is sent never iterates this generator, so an upstream opened earlier would leak.
+    stream = ai.stream_product_description(
+        payload.name_ar, payload.hints, bypass_cache=payload.bypass_cache
+    )
+    parts: list[str] = []
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            yield format_event("token", {"text": delta})
+    except Exception as exc:
+        yield format_event("error", {"detail": str(exc)})
+        return
+    finally:
+        await stream.aclose()
+    # The request's session is already closed once the body is being streamed.
+    async with session_scope() as session:
+        await audit.log_action(
+            session,
+            action="ai.description",
+            user_id=user_id,
+            details={"name_ar": payload.name_ar, "stream": True},
+        )
+    yield format_event("done", {"description": "".join(parts).strip()})
+
+
+@router.post("/description/stream")
+async def stream_description(
+    payload: DescriptionRequest,
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    return StreamingResponse(
+        _description_events(payload, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/image")
 async def generate_image(
     payload: ImageRequest,
@@ -57,3 +113,84 @@ async def generate_image(
         details={"prompt": payload.prompt[:80]},
     )
     return {"url": url}
+
+
+@router.post(
+    "/description-runs",
+    response_model=AIDescriptionRunRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def start_description_run(
+    payload: DescriptionRunRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> AIDescriptionRun:
+    try:
+        run = await ai_batch.start_run(
+            session, options=payload.model_dump(), user_id=current_user.id
+        )
+    except ai_batch.BatchError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="توجد عملية توليد أوصاف قيد التنفيذ"
+        ) from exc
+    await audit.log_action(
+        session,
+        action="ai.description_batch.start",
+        user_id=current_user.id,
+        details={"run_id": run.id, "total": run.total},
+    )
+    return run
+
+
+async def _get_run(session: AsyncSession, run_id: str) -> AIDescriptionRun:
+    run = await session.get(AIDescriptionRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="العملية غير موجودة")
+    return run
+
+
+@router.get("/description-runs/{run_id}", response_model=AIDescriptionRunRead)
+async def get_description_run(
+    run_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_admin),
+) -> AIDescriptionRun:
+    return await _get_run(session, run_id)
+
+
+@router.post(
+    "/description-runs/{run_id}/resume",
+    response_model=AIDescriptionRunRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_description_run(
+    run_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> AIDescriptionRun:
+    run = await _get_run(session, run_id)
+    try:
+        run = await ai_batch.resume_run(session, run)
+    except ai_batch.BatchError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="ai.description_batch.resume",
+        user_id=current_user.id,
+        details={"run_id": run.id, "checkpoint": run.checkpoint},
+    )
+    return run
+
+
+@router.get("/description-runs/{run_id}/events")
+async def description_run_events(
+    run_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_admin),
+) -> StreamingResponse:
+    await _get_run(session, run_id)
+    return StreamingResponse(
+        ai_batch.stream(run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
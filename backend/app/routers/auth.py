@@ -7,9 +7,9 @@ from pydantic import BaseModel
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..core.security import create_access_token, verify_password
+from ..core.security import create_access_token, password_hasher
 from ..db.session import get_session
-from ..dependencies.auth import get_current_user
+from ..dependencies.auth import get_current_user, invalidate_user
 from ..models import User
 from ..schemas import Token
 from ..services import audit
@@ -29,8 +29,15 @@ async def login(
 ) -> Token:
     result = await session.exec(select(User).where(User.username == payload.username))
     user = result.one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="بيانات الدخول غير صحيحة")
+    valid, new_hash = await password_hasher.verify_and_update(payload.password, user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="بيانات الدخول غير صحيحة")
+    if new_hash:
+        user.password_hash = new_hash
+        await session.commit()
+        invalidate_user(user.username)
     token = create_access_token(subject=user.username, expires_delta=timedelta(minutes=60 * 12))
     await audit.log_action(
         session,
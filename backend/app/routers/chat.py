@@ -7,8 +7,8 @@ from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
-from ..dependencies.auth import get_current_user
+from ..db.session import get_read_session, get_session
+from ..dependencies.auth import get_current_user, load_user
 from ..models import ChatMessage, User
 from ..schemas import ChatMessageRead
 from ..services import audit
@@ -65,8 +65,7 @@ async def websocket_endpoint(
     except Exception:
         await websocket.close()
         return
-    result = await session.exec(select(User).where(User.username == username))
-    user = result.one_or_none()
+    user = await load_user(session, username)
     if not user:
         await websocket.close()
         return
@@ -152,7 +151,7 @@ async def public_websocket(
 @router.get("/history", response_model=list[ChatMessageRead])
 async def chat_history(
     limit: int = 50,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     _: User = Depends(get_current_user),
 ) -> list[ChatMessage]:
     result = await session.exec(
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db.session import get_read_session, get_session
+from ..dependencies.auth import get_current_admin
+from ..models import Job, JobStatus, User
+from ..schemas import JobRead
+from ..services import audit, jobs
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+
+@router.get("")
+async def job_status(
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_admin),
+) -> dict[str, Any]:
+    result = await session.exec(
+        select(Job.type, Job.status, func.count()).group_by(Job.type, Job.status)
+    )
+    counts: dict[str, dict[str, int]] = {}
+    for job_type, job_status, count in result.all():
+        counts.setdefault(job_type, {})[JobStatus(job_status).value] = count
+    oldest = await session.exec(
+        select(func.min(Job.run_after)).where(Job.status == JobStatus.PENDING)
+    )
+    oldest_pending = oldest.one()
+    return {
+        "counts": counts,
+        "oldest_pending_run_after": oldest_pending.isoformat() if oldest_pending else None,
+        "worker": jobs.worker.stats(),
+    }
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_admin),
+) -> Job:
+    job = await session.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="المهمة غير موجودة")
+    return job
+
+
+@router.post("/{job_id}/retry", response_model=JobRead)
+async def retry_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> Job:
+    job = await session.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="المهمة غير موجودة")
+    try:
+        job = await jobs.retry(session, job)
+    except jobs.JobError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="لا يمكن إعادة المحاولة إلا للمهام المتوقفة",
+        ) from exc
+    await audit.log_action(
+        session,
+        action="jobs.retry",
+        user_id=current_user.id,
+        details={"job_id": job.id, "type": job.type},
+    )
+    return job
@@ -1,33 +1,227 @@
 from __future__ import annotations
 
-from datetime import datetime
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Literal
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_, text
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
-from ..dependencies.auth import get_current_user
-from ..models import AuditLog, User
-from ..schemas import AuditLogRead
+from ..db.session import get_read_session, get_session, read_engine
+from ..dependencies.auth import get_current_admin, get_current_user
+from ..models import AuditLog, AuditLogRollup, User
+from ..schemas import AuditLogPage, AuditLogRollupRead
+from ..services import audit, audit_retention
+from ..utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/v1/logs", tags=["logs"])
 
+MAX_PAGE_SIZE = 500
+# Counting stops here; larger totals are reported as estimates.
+COUNT_CAP = 10_000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ("id", "user_id", "action", "details", "created_at")
 
-@router.get("", response_model=list[AuditLogRead])
+
+async def _estimate_total(session: AsyncSession, filters: list) -> tuple[int, bool]:
+    """Return an approximate number of matching rows without scanning the whole table."""
+
+    bind = session.get_bind()
+    if not filters and bind.dialect.name == "postgresql":
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'audit_logs'")
+        )
+        estimate = result.scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+    capped = select(AuditLog.id).where(*filters).limit(COUNT_CAP + 1).subquery()
+    result = await session.exec(select(func.count()).select_from(capped))
+    count = result.one()
+    return min(count, COUNT_CAP), count > COUNT_CAP
+
+
+def _filters(
+    user_id: int | None, action: str | None, since: datetime | None, until: datetime | None = None
+) -> list:
+    filters = []
+    if user_id is not None:
+        filters.append(AuditLog.user_id == user_id)
+    if action:
+        filters.append(AuditLog.action == action)
+    if since:
+        filters.append(AuditLog.created_at >= since)
+    if until:
+        filters.append(AuditLog.created_at < until)
+    return filters
+
+
+@router.get("", response_model=AuditLogPage)
 async def list_logs(
     user_id: int | None = Query(default=None),
     action: str | None = Query(default=None),
     since: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="مؤشر الصفحة التالية"),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = Query(default=False),
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_user),
+) -> AuditLogPage:
+    filters = _filters(user_id, action, since)
+    query = select(AuditLog).where(*filters)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="مؤشر الصفحة غير صالح"
+            ) from exc
+        query = query.where(
+            or_(
+                AuditLog.created_at < cursor_created_at,
+                and_(AuditLog.created_at == cursor_created_at, AuditLog.id < cursor_id),
+            )
+        )
+    result = await session.exec(
+        query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)
+    )
+    rows = list(result.all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    page = AuditLogPage(items=rows, next_cursor=next_cursor)
+    if include_total:
+        page.total, page.total_is_estimate = await _estimate_total(session, filters)
+    return page
+
+
+def _format_rows(rows: list, fmt: str) -> str:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(
+                [
+                    row.id,
+                    row.user_id if row.user_id is not None else "",
+                    row.action,
+                    json.dumps(row.details or {}, ensure_ascii=False),
+                    row.created_at.isoformat(),
+                ]
+            )
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(
+            {
+                "id": row.id,
+                "user_id": row.user_id,
+                "action": row.action,
+                "details": row.details,
+                "created_at": row.created_at.isoformat(),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+async def _export_chunks(filters: list, fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    """Stream matching rows from a server-side cursor, one batch at a time."""
+
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def encode(chunk: str) -> bytes:
+        data = chunk.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        yield encode(",".join(EXPORT_COLUMNS) + "\r\n")
+    table = AuditLog.__table__
+    query = (
+        select(*(table.c[name] for name in EXPORT_COLUMNS))
+        .where(*filters)
+        .order_by(table.c.created_at, table.c.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    # The request-scoped session is closed before the body streams, so use our own connection.
+    async with read_engine.connect() as conn:
+        result = await conn.stream(query)
+        async for rows in result.partitions(EXPORT_BATCH_SIZE):
+            chunk = encode(_format_rows(rows, fmt))
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get("/export")
+async def export_logs(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    gzip: bool = Query(default=False),
+    user_id: int | None = Query(default=None),
+    action: str | None = Query(default=None),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
     session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> StreamingResponse:
+    filters = _filters(user_id, action, since, until)
+    await audit.log_action(
+        session,
+        action="logs.export",
+        user_id=current_user.id,
+        details={"format": fmt, "gzip": gzip, "action": action, "user_id": user_id},
+    )
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"audit-logs.{fmt}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        media_type = "application/gzip"
+    return StreamingResponse(
+        _export_chunks(filters, fmt, gzip), media_type=media_type, headers=headers
+    )
+
+
+@router.get("/rollups", response_model=list[AuditLogRollupRead])
+async def list_rollups(
+    action: str | None = Query(default=None),
+    user_id: int | None = Query(default=None),
+    since: date | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session),
     _: User = Depends(get_current_user),
-) -> list[AuditLog]:
-    query = select(AuditLog)
-    if user_id is not None:
-        query = query.where(AuditLog.user_id == user_id)
+) -> list[AuditLogRollup]:
+    query = select(AuditLogRollup)
     if action:
-        query = query.where(AuditLog.action == action)
+        query = query.where(AuditLogRollup.action == action)
+    if user_id is not None:
+        query = query.where(AuditLogRollup.user_id == user_id)
     if since:
-        query = query.where(AuditLog.created_at >= since)
-    result = await session.exec(query.order_by(AuditLog.created_at.desc()))
+        query = query.where(AuditLogRollup.day >= since)
+    result = await session.exec(
+        query.order_by(AuditLogRollup.day.desc(), AuditLogRollup.action).limit(limit)
+    )
     return result.all()
+
+
+@router.post("/retention/run")
+async def run_retention(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, object]:
+    report = await audit_retention.apply_retention()
+    await audit.log_action(
+        session,
+        action="logs.retention",
+        user_id=current_user.id,
+        details={"purged": sum(item["purged"] for item in report)},
+    )
+    return {"policies": report}
@@ -6,11 +6,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
+from ..db.session import get_read_session, get_session
 from ..dependencies.auth import get_current_user, get_current_admin
-from ..models import Product, User
-from ..schemas import ProductCreate, ProductRead, ProductUpdate
-from ..services import audit, zid
+from ..models import Product, User, ZidSyncRun
+from ..schemas import ProductCreate, ProductRead, ProductUpdate, ZidSyncRunRead
+from ..services import audit, jobs, zid, zid_pull, zid_sync
 
 router = APIRouter(prefix="/api/v1/products", tags=["products"])
 
@@ -19,7 +19,7 @@ DEFAULT_DENOMS = ["2$", "5$", "10$", "25$", "50$", "100$"]
 
 @router.get("", response_model=list[ProductRead])
 async def list_products(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     _: User = Depends(get_current_user),
 ) -> list[Product]:
     result = await session.exec(select(Product).order_by(Product.created_at.desc()))
@@ -38,23 +38,21 @@ async def create_product(
     if auto_categories and not product.categories:
         product.categories = DEFAULT_DENOMS.copy()
     session.add(product)
+    job = None
+    if push_to_zid:
+        # Same transaction as the product, so the push job exists iff the product does.
+        await session.flush()
+        job = jobs.enqueue(session, "zid.create_product", {"product_id": product.id})
     await session.commit()
     await session.refresh(product)
-
-    zid_id: str | None = None
-    if push_to_zid:
-        zid_id = await zid.create_product(session, product)
-        if zid_id:
-            product.zid_product_id = zid_id
-            product.last_synced_at = datetime.utcnow()
-            await session.commit()
-            await session.refresh(product)
+    if job is not None:
+        jobs.worker.notify()
 
     await audit.log_action(
         session,
         action="products.create",
         user_id=current_user.id,
-        details={"product_id": product.id, "zid_id": zid_id},
+        details={"product_id": product.id, "zid_job_id": job.id if job else None},
     )
     return product
 
@@ -105,3 +103,68 @@ async def push_product(
         details={"product_id": product.id},
     )
     return product
+
+
+@router.post(
+    "/zid-sync", response_model=ZidSyncRunRead, status_code=status.HTTP_202_ACCEPTED
+)
+async def start_zid_sync(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> ZidSyncRun:
+    try:
+        return await zid_sync.start_push(session, current_user.id)
+    except zid_sync.SyncError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+async def _get_sync_run(session: AsyncSession, run_id: str) -> ZidSyncRun:
+    run = await session.get(ZidSyncRun, run_id)
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="عملية المزامنة غير موجودة")
+    return run
+
+
+@router.get("/zid-sync/{run_id}", response_model=ZidSyncRunRead)
+async def read_zid_sync(
+    run_id: str,
+    session: AsyncSession = Depends(get_session),
+    _: User = Depends(get_current_admin),
+) -> ZidSyncRun:
+    return await _get_sync_run(session, run_id)
+
+
+@router.post(
+    "/zid-sync/{run_id}/resume",
+    response_model=ZidSyncRunRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_zid_sync(
+    run_id: str,
+    session: AsyncSession = Depends(get_session),
+    _: User = Depends(get_current_admin),
+) -> ZidSyncRun:
+    run = await _get_sync_run(session, run_id)
+    try:
+        return await zid_sync.resume_push(session, run)
+    except zid_sync.SyncError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@router.post("/zid-pull")
+async def pull_zid_catalog(
+    full: bool = Query(default=False, description="تجاهل آخر نقطة مزامنة وجلب الكتالوج كاملًا"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, object]:
+    try:
+        report = await zid_pull.pull_catalog(full=full)
+    except zid.ZidError as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="تعذر جلب كتالوج زد") from exc
+    await audit.log_action(
+        session,
+        action="zid.catalog_pull",
+        user_id=current_user.id,
+        details=report,
+    )
+    return report
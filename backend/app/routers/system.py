@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
-from ..dependencies.auth import get_current_user
+from ..core.security import password_hasher, token_cache
+from ..db.session import get_session, pool_status
+from ..dependencies.auth import get_current_admin, get_current_user, user_cache
 from ..models import User
-from ..services import audit
+from ..services import ai_cache, audit, http_clients, zid_scheduler
 from ..services.integration_checks import collect_status
 
 router = APIRouter(prefix="/api/v1/system", tags=["system"])
@@ -25,3 +26,44 @@ async def system_status(
         details={"checks": [status["name"] for status in statuses]},
     )
     return {"services": statuses}
+
+
+@router.get("/db-pool")
+async def database_pool(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return {"engines": pool_status()}
+
+
+@router.get("/audit-queue")
+async def audit_queue(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return audit.writer.stats()
+
+
+@router.get("/caches")
+async def cache_stats(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return {
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "ai_completions": ai_cache.cache.stats(),
+    }
+
+
+@router.get("/http-clients")
+async def http_client_pools(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return http_clients.registry.stats()
+
+
+@router.get("/zid-scheduler")
+async def zid_scheduler_stats(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return {"tokens": zid_scheduler.stats()}
+
+
+@router.get("/password-hashing")
+async def password_hashing(_: User = Depends(get_current_admin)) -> dict[str, object]:
+    return password_hasher.stats()
+
+
+@router.get("/startup")
+async def startup_timings(
+    request: Request, _: User = Depends(get_current_admin)
+) -> dict[str, object]:
+    return {"phases_ms": getattr(request.app.state, "startup_timings", {})}
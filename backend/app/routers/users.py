@@ -4,9 +4,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..core.security import get_password_hash
+from ..core.security import password_hasher
 from ..db.session import get_session
-from ..dependencies.auth import get_current_admin
+from ..dependencies.auth import get_current_admin, invalidate_user
 from ..models import User, UserCreate, UserRead, UserUpdate
 from ..services import audit
 
@@ -33,7 +33,7 @@ async def create_user(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="المستخدم موجود مسبقًا")
     user = User(
         username=payload.username,
-        password_hash=get_password_hash(payload.password),
+        password_hash=await password_hasher.hash(payload.password),
         role=payload.role,
         theme_preference=payload.theme_preference,
     )
@@ -61,13 +61,14 @@ async def update_user(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="المستخدم غير موجود")
     if payload.password:
-        user.password_hash = get_password_hash(payload.password)
+        user.password_hash = await password_hasher.hash(payload.password)
     if payload.role:
         user.role = payload.role
     if payload.theme_preference:
         user.theme_preference = payload.theme_preference
     await session.commit()
     await session.refresh(user)
+    invalidate_user(user.username)
     await audit.log_action(
         session,
         action="users.update",
@@ -1,59 +1,499 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from collections import Counter
+from datetime import datetime
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from sqlalchemy import and_, func, or_
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db.session import get_session
+from ..db.session import get_read_session, get_session
 from ..dependencies.auth import get_current_user, get_current_admin
-from ..models import Product, User, Voucher
-from ..schemas import VoucherImport, VoucherRead
-from ..services import audit, zid
+from ..models import (
+    Product,
+    ProductInventory,
+    User,
+    UserRole,
+    Voucher,
+    VoucherReservation,
+    VoucherUpload,
+    ZidVoucherExport,
+)
+from ..schemas import (
+    ProductInventoryRead,
+    VoucherAllocationRead,
+    VoucherAllocationRequest,
+    VoucherCodeCheck,
+    VoucherImport,
+    VoucherLockRequest,
+    VoucherPage,
+    VoucherRead,
+    VoucherRedactedRead,
+    VoucherReservationRead,
+    VoucherUploadRead,
+    VoucherVerifyRequest,
+    VoucherVerifyResult,
+    ZidVoucherExportRead,
+)
+from ..services import audit, inventory, voucher_uploads, vouchers as voucher_service, zid
+from ..utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/v1/vouchers", tags=["vouchers"])
 
+MAX_PAGE_SIZE = 500
+
+
+def _filters(
+    product_id: int | None,
+    status_filter: voucher_service.VoucherStatus | None,
+    since: datetime | None,
+    until: datetime | None,
+) -> list:
+    table = Voucher.__table__
+    filters = []
+    if product_id is not None:
+        filters.append(table.c.product_id == product_id)
+    if status_filter:
+        filters.append(voucher_service.status_condition(status_filter))
+    if since:
+        filters.append(table.c.created_at >= since)
+    if until:
+        filters.append(table.c.created_at < until)
+    return filters
+
 
-@router.get("", response_model=list[VoucherRead])
+async def _count(
+    session: AsyncSession,
+    product_id: int | None,
+    status_filter: voucher_service.VoucherStatus | None,
+    filters: list,
+    by_date: bool,
+) -> int:
+    """Count matching vouchers, from the inventory counters when they can answer."""
+
+    if product_id is not None and not by_date:
+        counters = await session.get(ProductInventory, product_id)
+        if counters is None:
+            return 0
+        if status_filter:
+            return getattr(counters, status_filter)
+        return sum(getattr(counters, name) for name in inventory.COUNTERS)
+    result = await session.exec(select(func.count()).select_from(Voucher).where(*filters))
+    return result.one()
+
+
+@router.get("", response_model=VoucherPage)
 async def list_vouchers(
+    product_id: int | None = Query(default=None),
+    status_filter: voucher_service.VoucherStatus | None = Query(default=None, alias="status"),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="مؤشر الصفحة التالية"),
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    count_only: bool = Query(default=False),
+    include_total: bool = Query(default=False),
+    redacted: bool = Query(default=True, description="إخفاء الأكواد وإظهار آخر أحرفها فقط"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+) -> VoucherPage:
+    filters = _filters(product_id, status_filter, since, until)
+    by_date = since is not None or until is not None
+    if count_only:
+        total = await _count(session, product_id, status_filter, filters, by_date)
+        return VoucherPage(total=total)
+    if not redacted and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="عرض الأكواد كاملة متاح للمسؤول فقط"
+        )
+
+    table = Voucher.__table__
+    columns = [
+        table.c.id,
+        table.c.product_id,
+        table.c.is_redeemed,
+        table.c.is_locked,
+        table.c.redeemed_at,
+        table.c.reserved_until,
+        table.c.created_at,
+        voucher_service.code_suffix() if redacted else table.c.code,
+    ]
+    query = select(*columns).where(*filters)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="مؤشر الصفحة غير صالح"
+            ) from exc
+        query = query.where(
+            or_(
+                table.c.created_at < cursor_created_at,
+                and_(table.c.created_at == cursor_created_at, table.c.id < cursor_id),
+            )
+        )
+    result = await session.exec(
+        query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    item_schema = VoucherRedactedRead if redacted else VoucherRead
+    page = VoucherPage(
+        items=[item_schema.model_validate(row) for row in rows], next_cursor=next_cursor
+    )
+    if include_total:
+        page.total = await _count(session, product_id, status_filter, filters, by_date)
+    return page
+
+
+@router.get("/inventory", response_model=list[ProductInventoryRead])
+async def read_inventory(
     product_id: int | None = None,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     _: User = Depends(get_current_user),
-) -> list[Voucher]:
-    query = select(Voucher)
-    if product_id:
-        query = query.where(Voucher.product_id == product_id)
-    result = await session.exec(query)
+) -> list[ProductInventory]:
+    query = select(ProductInventory)
+    if product_id is not None:
+        query = query.where(ProductInventory.product_id == product_id)
+    result = await session.exec(query.order_by(ProductInventory.product_id))
     return result.all()
 
 
+@router.post("/inventory/recount")
+async def recount_inventory(
+    product_id: int | None = None,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, int]:
+    products = await inventory.recount(session, product_id)
+    await audit.log_action(
+        session,
+        action="vouchers.inventory_recount",
+        user_id=current_user.id,
+        details={"product_id": product_id, "products": products},
+    )
+    return {"products": products}
+
+
+@router.post("/verify", response_model=VoucherVerifyResult)
+async def verify_vouchers(
+    payload: VoucherVerifyRequest,
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_user),
+) -> VoucherVerifyResult:
+    checks = await voucher_service.verify_codes(session, payload.codes)
+    summary = Counter(check.status for check in checks)
+    return VoucherVerifyResult(
+        results=[VoucherCodeCheck.model_validate(check) for check in checks],
+        summary=dict(summary),
+    )
+
+
 @router.post("/import", status_code=status.HTTP_201_CREATED)
 async def import_vouchers(
     payload: VoucherImport,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_admin),
-) -> dict[str, int]:
+) -> dict[str, int | str | None]:
     result = await session.exec(select(Product).where(Product.id == payload.product_id))
     product = result.one_or_none()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="المنتج غير موجود")
-    created = 0
-    vouchers: list[Voucher] = []
-    for code in payload.codes:
-        voucher = Voucher(product_id=payload.product_id, code=code, notes=payload.notes)
-        session.add(voucher)
-        vouchers.append(voucher)
-        created += 1
+    push_to_zid = bool(payload.also_push_to_zid and product.zid_product_id)
+    outcome = await voucher_service.bulk_import(
+        session,
+        product_id=product.id,
+        codes=payload.codes,
+        notes=payload.notes,
+        collect_codes=push_to_zid,
+    )
+
+    export_id: str | None = None
+    if push_to_zid and outcome.inserted_codes:
+        export = await zid.import_vouchers(
+            session, product=product, codes=outcome.inserted_codes, user_id=current_user.id
+        )
+        export_id = export.id
+
+    await audit.log_action(
+        session,
+        action="vouchers.import",
+        user_id=current_user.id,
+        details={
+            "product_id": product.id,
+            "count": outcome.inserted,
+            "duplicates": outcome.duplicates,
+            "invalid": outcome.invalid,
+        },
+    )
+    return {
+        "imported": outcome.inserted,
+        "duplicates": outcome.duplicates,
+        "invalid": outcome.invalid,
+        "zid_export_id": export_id,
+    }
+
+
+async def _get_export(session: AsyncSession, export_id: str) -> ZidVoucherExport:
+    export = await session.get(ZidVoucherExport, export_id)
+    if not export:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="عملية الرفع غير موجودة")
+    return export
+
+
+@router.get("/zid-exports/{export_id}", response_model=ZidVoucherExportRead)
+async def read_zid_export(
+    export_id: str,
+    session: AsyncSession = Depends(get_session),
+    _: User = Depends(get_current_admin),
+) -> ZidVoucherExport:
+    return await _get_export(session, export_id)
+
+
+@router.post(
+    "/zid-exports/{export_id}/retry",
+    response_model=ZidVoucherExportRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def retry_zid_export(
+    export_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> ZidVoucherExport:
+    export = await _get_export(session, export_id)
+    try:
+        export = await zid.retry_export(session, export)
+    except zid.ZidError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="zid.import_vouchers.retry",
+        user_id=current_user.id,
+        details={"export_id": export.id, "failed_chunks": export.chunks_failed},
+    )
+    return export
+
+
+async def _get_upload(session: AsyncSession, upload_id: str) -> VoucherUpload:
+    result = await session.exec(select(VoucherUpload).where(VoucherUpload.id == upload_id))
+    upload = result.one_or_none()
+    if not upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="الملف غير موجود")
+    return upload
+
+
+@router.post("/uploads", response_model=VoucherUploadRead, status_code=status.HTTP_201_CREATED)
+async def upload_vouchers(
+    product_id: int = Form(...),
+    notes: str | None = Form(default=None),
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> VoucherUpload:
+    result = await session.exec(select(Product).where(Product.id == product_id))
+    if not result.one_or_none():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="المنتج غير موجود")
+    try:
+        kind = voucher_uploads.upload_kind(file.filename)
+    except voucher_uploads.UploadError as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc)) from exc
+
+    upload = VoucherUpload(
+        id=uuid4().hex,
+        product_id=product_id,
+        filename=file.filename or "upload",
+        notes=notes,
+        created_by=current_user.id,
+    )
+    session.add(upload)
     await session.commit()
-    for voucher in vouchers:
-        await session.refresh(voucher)
+    try:
+        upload = await voucher_uploads.stage_upload(session, upload, file.file, kind)
+    except voucher_uploads.UploadError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="vouchers.upload",
+        user_id=current_user.id,
+        details={"upload_id": upload.id, "product_id": product_id, "valid": upload.valid},
+    )
+    return upload
+
+
+@router.get("/uploads/{upload_id}", response_model=VoucherUploadRead)
+async def read_upload(
+    upload_id: str,
+    session: AsyncSession = Depends(get_session),
+    _: User = Depends(get_current_admin),
+) -> VoucherUpload:
+    return await _get_upload(session, upload_id)
 
-    if payload.also_push_to_zid and product.zid_product_id:
-        await zid.import_vouchers(session, product=product, codes=[v.code for v in vouchers])
+
+@router.post("/uploads/{upload_id}/commit")
+async def commit_upload(
+    upload_id: str,
+    also_push_to_zid: bool = False,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, int | str | None]:
+    upload = await _get_upload(session, upload_id)
+    result = await session.exec(select(Product).where(Product.id == upload.product_id))
+    product = result.one()
+    push_to_zid = bool(also_push_to_zid and product.zid_product_id)
+    try:
+        outcome = await voucher_uploads.commit_upload(session, upload, collect_codes=push_to_zid)
+    except voucher_uploads.UploadError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    export_id: str | None = None
+    if push_to_zid and outcome.inserted_codes:
+        export = await zid.import_vouchers(
+            session, product=product, codes=outcome.inserted_codes, user_id=current_user.id
+        )
+        export_id = export.id
 
     await audit.log_action(
         session,
         action="vouchers.import",
         user_id=current_user.id,
-        details={"product_id": product.id, "count": created},
+        details={
+            "product_id": product.id,
+            "upload_id": upload.id,
+            "count": outcome.inserted,
+            "duplicates": outcome.duplicates,
+        },
+    )
+    return {
+        "imported": outcome.inserted,
+        "duplicates": outcome.duplicates,
+        "zid_export_id": export_id,
+    }
+
+
+@router.delete(
+    "/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None
+)
+async def discard_upload(
+    upload_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> None:
+    upload = await _get_upload(session, upload_id)
+    try:
+        await voucher_uploads.discard_upload(session, upload)
+    except voucher_uploads.UploadError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="vouchers.upload_discarded",
+        user_id=current_user.id,
+        details={"upload_id": upload.id},
     )
-    return {"imported": created}
+
+
+@router.post("/allocate", response_model=VoucherAllocationRead, status_code=status.HTTP_201_CREATED)
+async def allocate_vouchers(
+    payload: VoucherAllocationRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> VoucherAllocationRead:
+    try:
+        allocation = await voucher_service.allocate(
+            session,
+            product_id=payload.product_id,
+            quantity=payload.quantity,
+            ttl_seconds=payload.ttl_seconds,
+            reference=payload.reference,
+            user_id=current_user.id,
+        )
+    except voucher_service.InsufficientStockError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="المخزون غير كافٍ") from exc
+    await audit.log_action(
+        session,
+        action="vouchers.allocate",
+        user_id=current_user.id,
+        details={
+            "reservation_id": allocation.reservation.id,
+            "product_id": payload.product_id,
+            "quantity": payload.quantity,
+            "reference": payload.reference,
+        },
+    )
+    return VoucherAllocationRead(
+        reservation=VoucherReservationRead.model_validate(allocation.reservation),
+        codes=allocation.codes,
+    )
+
+
+@router.post("/reservations/{reservation_id}/confirm", response_model=VoucherReservationRead)
+async def confirm_reservation(
+    reservation_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> VoucherReservation:
+    try:
+        reservation = await voucher_service.confirm_reservation(session, reservation_id)
+    except voucher_service.ReservationError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="vouchers.redeem",
+        user_id=current_user.id,
+        details={"reservation_id": reservation_id, "quantity": reservation.quantity},
+    )
+    return reservation
+
+
+@router.post("/reservations/{reservation_id}/release", response_model=VoucherReservationRead)
+async def release_reservation(
+    reservation_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> VoucherReservation:
+    try:
+        reservation = await voucher_service.release_reservation(session, reservation_id)
+    except voucher_service.ReservationError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await audit.log_action(
+        session,
+        action="vouchers.release",
+        user_id=current_user.id,
+        details={"reservation_id": reservation_id},
+    )
+    return reservation
+
+
+async def _set_locked(
+    payload: VoucherLockRequest, locked: bool, session: AsyncSession, current_user: User
+) -> dict[str, int]:
+    changed = await voucher_service.set_locked(session, payload.voucher_ids, locked)
+    await audit.log_action(
+        session,
+        action="vouchers.lock" if locked else "vouchers.unlock",
+        user_id=current_user.id,
+        details={"voucher_ids": payload.voucher_ids, "changed": changed},
+    )
+    return {"changed": changed}
+
+
+@router.post("/lock")
+async def lock_vouchers(
+    payload: VoucherLockRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, int]:
+    return await _set_locked(payload, True, session, current_user)
+
+
+@router.post("/unlock")
+async def unlock_vouchers(
+    payload: VoucherLockRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_admin),
+) -> dict[str, int]:
+    return await _set_locked(payload, False, session, current_user)
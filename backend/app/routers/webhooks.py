@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import get_read_session, get_session
+from ..dependencies.auth import get_current_admin
+from ..models import User
+from ..services import zid_webhooks
+
+router = APIRouter(prefix="/api/v1/webhooks", tags=["webhooks"])
+
+
+@router.post("/zid", status_code=status.HTTP_202_ACCEPTED)
+async def receive_zid_webhook(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+) -> dict[str, Any]:
+    if not settings.zid_webhook_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="لم يتم إعداد سر استقبال أحداث زد",
+        )
+    body = await request.body()
+    if not zid_webhooks.verify_signature(body, request.headers.get("x-zid-signature")):
+        zid_webhooks.processor.count("rejected")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توقيع غير صالح")
+    try:
+        payload = zid_webhooks.parse_body(body)
+    except zid_webhooks.WebhookError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    event_id, event_type = zid_webhooks.event_identity(body, payload, request.headers)
+    stored = await zid_webhooks.record(
+        session, event_id=event_id, event_type=event_type, payload=payload
+    )
+    return {"event_id": event_id, "duplicate": not stored}
+
+
+@router.get("/zid/stats")
+async def zid_webhook_stats(
+    session: AsyncSession = Depends(get_read_session),
+    _: User = Depends(get_current_admin),
+) -> dict[str, Any]:
+    return await zid_webhooks.processor.metrics(session)
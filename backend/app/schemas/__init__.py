@@ -1,9 +1,25 @@
 from .auth import Token, TokenPayload
 from .product import ProductBase, ProductCreate, ProductRead, ProductUpdate
-from .voucher import VoucherImport, VoucherRead
+from .voucher import (
+    VoucherAllocationRead,
+    VoucherAllocationRequest,
+    VoucherCodeCheck,
+    VoucherImport,
+    VoucherPage,
+    VoucherRead,
+    VoucherRedactedRead,
+    VoucherReservationRead,
+    VoucherUploadRead,
+    VoucherVerifyRequest,
+    VoucherVerifyResult,
+)
+from .inventory import ProductInventoryRead, VoucherLockRequest
 from .setting import SettingItem, SettingsPayload
-from .audit import AuditLogRead
+from .audit import AuditLogPage, AuditLogRead, AuditLogRollupRead
 from .chat import ChatMessageRead
+from .zid import ZidSyncRunRead, ZidVoucherExportRead
+from .job import JobRead
+from .ai import AIDescriptionRunRead
 
 __all__ = [
     "Token",
@@ -12,10 +28,27 @@ __all__ = [
     "ProductCreate",
     "ProductRead",
     "ProductUpdate",
+    "VoucherAllocationRead",
+    "VoucherAllocationRequest",
+    "VoucherCodeCheck",
     "VoucherImport",
+    "VoucherPage",
     "VoucherRead",
+    "VoucherRedactedRead",
+    "VoucherReservationRead",
+    "VoucherUploadRead",
+    "VoucherVerifyRequest",
+    "VoucherVerifyResult",
+    "ProductInventoryRead",
+    "VoucherLockRequest",
     "SettingItem",
     "SettingsPayload",
+    "AuditLogPage",
     "AuditLogRead",
+    "AuditLogRollupRead",
     "ChatMessageRead",
+    "ZidSyncRunRead",
+    "ZidVoucherExportRead",
+    "JobRead",
+    "AIDescriptionRunRead",
 ]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from ..models.ai import AIRunStatus
+
+
+class AIDescriptionRunRead(BaseModel):
+    id: str
+    status: AIRunStatus
+    options: dict
+    total: int
+    processed: int
+    succeeded: int
+    cached: int
+    failed: int
+    tokens_used: int
+    failures: list[dict] | None
+    error: str | None
+    started_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -14,3 +14,22 @@ class AuditLogRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AuditLogRollupRead(BaseModel):
+    day: date
+    action: str
+    user_id: int | None
+    count: int
+    first_at: datetime
+    last_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogPage(BaseModel):
+    items: list[AuditLogRead]
+    next_cursor: str | None = None
+    total: int | None = None
+    total_is_estimate: bool = False
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ProductInventoryRead(BaseModel):
+    product_id: int
+    available: int
+    reserved: int
+    redeemed: int
+    locked: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class VoucherLockRequest(BaseModel):
+    voucher_ids: list[int] = Field(min_length=1, max_length=1000)
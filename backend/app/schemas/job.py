@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from ..models.job import JobStatus
+
+
+class JobRead(BaseModel):
+    id: int
+    type: str
+    payload: dict
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    lease_until: datetime | None
+    last_error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Iterable
+from typing import Iterable, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from ..models.voucher import ReservationStatus, VoucherUploadStatus
 
 
 class VoucherImport(BaseModel):
@@ -18,7 +20,93 @@ class VoucherRead(BaseModel):
     product_id: int
     code: str
     is_redeemed: bool
+    is_locked: bool
+    redeemed_at: datetime | None
+    reserved_until: datetime | None = None
+    created_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class VoucherRedactedRead(BaseModel):
+    """A voucher without its code; only the last characters are exposed."""
+
+    id: int
+    product_id: int
+    code_suffix: str
+    is_redeemed: bool
+    is_locked: bool
     redeemed_at: datetime | None
+    reserved_until: datetime | None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class VoucherPage(BaseModel):
+    items: list[VoucherRedactedRead] | list[VoucherRead] = Field(default_factory=list)
+    next_cursor: str | None = None
+    total: int | None = None
+
+
+class VoucherUploadRead(BaseModel):
+    id: str
+    product_id: int
+    filename: str
+    status: VoucherUploadStatus
+    rows_processed: int
+    valid: int
+    invalid: int
+    duplicates_in_file: int
+    existing: int
+    inserted: int
+    report: dict | None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class VoucherAllocationRequest(BaseModel):
+    product_id: int
+    quantity: int = Field(default=1, ge=1, le=1000)
+    ttl_seconds: int | None = Field(default=None, ge=30, le=24 * 60 * 60)
+    reference: str | None = Field(default=None, max_length=120)
+
+
+class VoucherReservationRead(BaseModel):
+    id: str
+    product_id: int
+    quantity: int
+    status: ReservationStatus
+    expires_at: datetime
+    reference: str | None
+
+    class Config:
+        from_attributes = True
+
+
+class VoucherAllocationRead(BaseModel):
+    reservation: VoucherReservationRead
+    codes: list[str]
+
+
+class VoucherVerifyRequest(BaseModel):
+    codes: list[str] = Field(min_length=1, max_length=10_000)
+
+
+class VoucherCodeCheck(BaseModel):
+    code: str
+    status: Literal["available", "reserved", "redeemed", "locked", "unknown", "invalid"]
+    voucher_id: int | None = None
+    product_id: int | None = None
 
     class Config:
         from_attributes = True
+
+
+class VoucherVerifyResult(BaseModel):
+    results: list[VoucherCodeCheck]
+    summary: dict[str, int]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel, computed_field
+
+from ..models.zid import ZidSyncStatus
+
+
+class ZidSyncRunRead(BaseModel):
+    id: str
+    status: ZidSyncStatus
+    checkpoint: int
+    processed: int
+    pushed: int
+    skipped: int
+    failed: int
+    failures: list[dict] | None
+    error: str | None
+    started_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def products_per_second(self) -> float:
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return round(self.processed / elapsed, 2) if elapsed > 0 else 0.0
+
+
+class ZidVoucherExportRead(BaseModel):
+    id: str
+    product_id: int
+    status: ZidSyncStatus
+    total_codes: int
+    chunk_size: int
+    chunks_total: int
+    chunks_sent: int
+    chunks_failed: int
+    created_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
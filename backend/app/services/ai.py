@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from typing import Any
-
-import httpx
+import json
+from typing import Any, AsyncIterator
 
 from ..core.config import settings
+from .ai_cache import cache, cache_key
+from .http_clients import get_client
 
 OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
 OPENAI_IMAGE_URL = "https://api.openai.com/v1/images/generations"
 
+DESCRIPTION_MODEL = "gpt-4o-mini"
+# Caps each completion, which also bounds a request's cost for budgeting.
+DESCRIPTION_MAX_COMPLETION_TOKENS = 400
+DESCRIPTION_SYSTEM_PROMPT = "أنت مساعد خبير في كتابة وصف المنتجات الرقمية باللهجة العربية الرسمية."
+
 
 class AIServiceError(RuntimeError):
     pass
@@ -23,27 +29,108 @@ def _headers() -> dict[str, str]:
     }
 
 
-async def generate_product_description(name_ar: str, hints: str | None = None) -> str:
-    payload: dict[str, Any] = {
-        "model": "gpt-4o-mini",
+def _description_prompt(name_ar: str, hints: str | None) -> str:
+    return f"اكتب وصفًا تسويقيًا قصيرًا للمنتج: {name_ar}. {hints or ''}"
+
+
+def _description_payload(name_ar: str, hints: str | None) -> dict[str, Any]:
+    return {
+        "model": DESCRIPTION_MODEL,
+        "max_tokens": DESCRIPTION_MAX_COMPLETION_TOKENS,
         "messages": [
-            {
-                "role": "system",
-                "content": "أنت مساعد خبير في كتابة وصف المنتجات الرقمية باللهجة العربية الرسمية.",
-            },
-            {
-                "role": "user",
-                "content": f"اكتب وصفًا تسويقيًا قصيرًا للمنتج: {name_ar}. {hints or ''}",
-            },
+            {"role": "system", "content": DESCRIPTION_SYSTEM_PROMPT},
+            {"role": "user", "content": _description_prompt(name_ar, hints)},
         ],
     }
-    async with httpx.AsyncClient(timeout=40) as client:
-        response = await client.post(OPENAI_CHAT_URL, json=payload, headers=_headers())
-        data = response.json()
+
+
+async def request_description(name_ar: str, hints: str | None) -> tuple[str, int]:
+    """Call OpenAI directly; returns the description and the tokens it used."""
+
+    response = await get_client("openai").post(
+        OPENAI_CHAT_URL, json=_description_payload(name_ar, hints), headers=_headers(), timeout=40
+    )
+    data = response.json()
+    if response.status_code >= 400:
+        raise AIServiceError(data)
+    message = data["choices"][0]["message"]["content"].strip()
+    return message, int((data.get("usage") or {}).get("total_tokens") or 0)
+
+
+def estimate_description_tokens(name_ar: str, hints: str | None) -> int:
+    """Upper bound used to budget a request before its real usage is known."""
+
+    prompt = DESCRIPTION_SYSTEM_PROMPT + _description_prompt(name_ar, hints)
+    return len(prompt) // 2 + DESCRIPTION_MAX_COMPLETION_TOKENS
+
+
+def description_cache_key(name_ar: str, hints: str | None) -> str:
+    """Digest of the whole request, so changing any of its parameters misses the cache."""
+
+    payload = _description_payload(name_ar, hints)
+    return cache_key(payload["model"], json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+
+async def generate_product_description(
+    name_ar: str, hints: str | None = None, *, bypass_cache: bool = False
+) -> str:
+    """Return a marketing description, reusing a cached one for the same inputs."""
+
+    async def create() -> str:
+        content, _ = await request_description(name_ar, hints)
+        return content
+
+    return await cache.get_or_create(
+        description_cache_key(name_ar, hints), DESCRIPTION_MODEL, create, bypass=bypass_cache
+    )
+
+
+async def stream_product_description(
+    name_ar: str, hints: str | None = None, *, bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """Yield the description as it is generated and cache it once complete.
+
+    A cached description is yielded in one piece. If the consumer stops early the
+    partial text is discarded rather than cached.
+    """
+
+    key = description_cache_key(name_ar, hints)
+    if bypass_cache:
+        cache.count("bypassed")
+    else:
+        cached = await cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    payload = {**_description_payload(name_ar, hints), "stream": True}
+    parts: list[str] = []
+    async with get_client("openai").stream(
+        "POST", OPENAI_CHAT_URL, json=payload, headers=_headers(), timeout=40
+    ) as response:
         if response.status_code >= 400:
-            raise AIServiceError(data)
-        message = data["choices"][0]["message"]["content"].strip()
-        return message
+            await response.aread()
+            raise AIServiceError(response.json())
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if not delta:
+                continue
+            # Leading whitespace is trimmed as in the non-streaming response.
+            if not parts:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            parts.append(delta)
+            yield delta
+    content = "".join(parts).strip()
+    if content:
+        await cache.set(key, DESCRIPTION_MODEL, content)
 
 
 async def generate_product_image(prompt: str) -> str:
@@ -52,9 +139,8 @@ async def generate_product_image(prompt: str) -> str:
         "prompt": prompt,
         "size": "1024x1024",
     }
-    async with httpx.AsyncClient(timeout=60) as client:
-        response = await client.post(OPENAI_IMAGE_URL, json=payload, headers=_headers())
-        data = response.json()
-        if response.status_code >= 400:
-            raise AIServiceError(data)
-        return data["data"][0]["url"]
+    response = await get_client("openai").post(OPENAI_IMAGE_URL, json=payload, headers=_headers())
+    data = response.json()
+    if response.status_code >= 400:
+        raise AIServiceError(data)
+    return data["data"][0]["url"]
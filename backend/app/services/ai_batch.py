@@ -0,0 +1,376 @@
+"""Bulk generation of product descriptions.
+
+A run walks the products matching its filter in id order, one batch at a time.
+Descriptions are requested concurrently (``AI_BATCH_CONCURRENCY``) within a shared
+tokens-per-minute budget, written back to ``products`` once per batch, and every item
+is published to subscribers of the run as it finishes (served over SSE).
+
+Runs execute as ``ai.description_batch`` jobs, so the job lease decides which worker
+process owns a run and a crashed worker's run continues from its checkpoint. Item
+events only reach subscribers connected to that worker; every other worker follows
+the run by polling its row.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator
+from uuid import uuid4
+
+from sqlalchemy import bindparam, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import session_scope
+from ..models import AIDescriptionRun, AIRunStatus, Product
+from ..utils.sse import KEEPALIVE, format_event
+from . import ai, audit, jobs
+from .ai_cache import cache
+from .zid_scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Failures kept on the run row; the counters stay exact beyond this.
+MAX_REPORTED_FAILURES = 200
+# Idle SSE connections get a comment this often so proxies keep them open.
+KEEPALIVE_SECONDS = 15.0
+# How often a stream re-reads the run row for progress made on another worker.
+POLL_SECONDS = 2.0
+
+_products = Product.__table__
+_runs = AIDescriptionRun.__table__
+_subscribers: dict[str, set[asyncio.Queue[tuple[str, dict[str, Any]]]]] = {}
+
+
+class BatchError(RuntimeError):
+    pass
+
+
+@dataclass
+class _Item:
+    product_id: int
+    name_ar: str
+    description: str | None = None
+    tokens: int = 0
+    # Served from the description cache; items that shared an in-flight request are not.
+    cached: bool = False
+    error: str | None = None
+
+
+class TokenBudget:
+    """Tokens-per-minute limit shared by all requests of a run."""
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        self.bucket = TokenBucket(tokens_per_minute, 60.0)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: int) -> None:
+        # One waiter at a time, so a large request is not starved by smaller ones.
+        async with self._lock:
+            while (delay := self.bucket.take(amount)) > 0:
+                await asyncio.sleep(delay)
+
+    def settle(self, estimated: int, used: int) -> None:
+        self.bucket.charge(used - estimated)
+
+
+def product_conditions(options: dict[str, Any]) -> list[Any]:
+    conditions: list[Any] = []
+    if options.get("only_missing", True):
+        conditions.append(or_(Product.description_ar.is_(None), Product.description_ar == ""))
+    if options.get("product_ids"):
+        conditions.append(Product.id.in_(options["product_ids"]))
+    if options.get("is_active") is not None:
+        conditions.append(Product.is_active == options["is_active"])
+    return conditions
+
+
+def snapshot(run: AIDescriptionRun) -> dict[str, Any]:
+    return {
+        "id": run.id,
+        "status": run.status.value,
+        "total": run.total,
+        "processed": run.processed,
+        "succeeded": run.succeeded,
+        "cached": run.cached,
+        "failed": run.failed,
+        "tokens_used": run.tokens_used,
+    }
+
+
+def _publish(run_id: str, event: str, data: dict[str, Any]) -> None:
+    for queue in _subscribers.get(run_id, ()):
+        queue.put_nowait((event, data))
+
+
+async def _describe(
+    run_id: str,
+    item: _Item,
+    hints: str | None,
+    semaphore: asyncio.Semaphore,
+    budget: TokenBudget,
+) -> _Item:
+    async def create() -> str:
+        estimated = ai.estimate_description_tokens(item.name_ar, hints)
+        await budget.acquire(estimated)
+        content, used = await ai.request_description(item.name_ar, hints)
+        if used:
+            budget.settle(estimated, used)
+        item.tokens = used or estimated
+        return content
+
+    async with semaphore:
+        try:
+            item.description, item.cached = await cache.resolve(
+                ai.description_cache_key(item.name_ar, hints), ai.DESCRIPTION_MODEL, create
+            )
+        except Exception as exc:
+            item.error = str(exc)[:500]
+    _publish(
+        run_id,
+        "item",
+        {
+            "product_id": item.product_id,
+            "status": "failed" if item.error else "ok",
+            "cached": item.cached and item.error is None,
+            "tokens": item.tokens,
+            "error": item.error,
+        },
+    )
+    return item
+
+
+async def _record_batch(
+    session: AsyncSession, run: AIDescriptionRun, items: list[_Item]
+) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"b_id": item.product_id, "b_description": item.description}
+        for item in items
+        if item.description
+    ]
+    if rows:
+        statement = (
+            update(_products)
+            .where(_products.c.id == bindparam("b_id"))
+            .values(description_ar=bindparam("b_description"), updated_at=now)
+        )
+        if run.options.get("only_missing", True):
+            # Never overwrite a description someone wrote while the run was going.
+            statement = statement.where(
+                or_(_products.c.description_ar.is_(None), _products.c.description_ar == "")
+            )
+        await session.execute(statement, rows)
+
+    failures = list(run.failures or [])
+    for item in items:
+        run.processed += 1
+        run.tokens_used += item.tokens
+        if item.error is not None:
+            run.failed += 1
+            if len(failures) < MAX_REPORTED_FAILURES:
+                failures.append({"product_id": item.product_id, "error": item.error})
+            continue
+        run.succeeded += 1
+        if item.cached:
+            run.cached += 1
+    run.failures = failures
+    run.checkpoint = max(item.product_id for item in items)
+    run.updated_at = now
+    await session.commit()
+
+
+async def run_batch(run_id: str) -> None:
+    """Describe every matching product after the run's checkpoint, batch by batch."""
+
+    semaphore = asyncio.Semaphore(settings.ai_batch_concurrency)
+    budget = TokenBudget(settings.ai_tokens_per_minute)
+    async with session_scope() as session:
+        run = await session.get(AIDescriptionRun, run_id)
+        if run is None or run.status != AIRunStatus.RUNNING:
+            return
+        hints = run.options.get("hints")
+        conditions = product_conditions(run.options)
+        try:
+            while True:
+                result = await session.exec(
+                    select(Product.id, Product.name_ar)
+                    .where(*conditions, Product.id > run.checkpoint)
+                    .order_by(Product.id)
+                    .limit(settings.ai_batch_size)
+                )
+                items = [_Item(product_id, name_ar) for product_id, name_ar in result.all()]
+                if not items:
+                    break
+                await asyncio.gather(
+                    *(_describe(run_id, item, hints, semaphore, budget) for item in items)
+                )
+                await _record_batch(session, run, items)
+                _publish(run_id, "progress", snapshot(run))
+            run.status = AIRunStatus.COMPLETED
+        except Exception as exc:
+            logger.exception("Description run %s failed", run_id)
+            await session.rollback()
+            run = await session.get(AIDescriptionRun, run_id)
+            run.status = AIRunStatus.FAILED
+            run.error = str(exc)[:500]
+        run.finished_at = datetime.utcnow()
+        await session.commit()
+        _publish(run_id, "done", snapshot(run))
+        await audit.log_action(
+            session,
+            action="ai.description_batch",
+            user_id=run.created_by,
+            details={
+                "run_id": run.id,
+                "status": run.status.value,
+                "succeeded": run.succeeded,
+                "failed": run.failed,
+                "tokens_used": run.tokens_used,
+            },
+        )
+
+
+@jobs.handler("ai.description_batch")
+async def description_batch(payload: dict[str, Any]) -> None:
+    """Job handler: run (or continue) a description run."""
+
+    await run_batch(payload["run_id"])
+
+
+async def mark_interrupted(session: AsyncSession) -> int:
+    """Flag ``running`` runs whose job is gone (dead or deleted) so they can be resumed."""
+
+    result = await session.execute(
+        update(_runs)
+        .where(_runs.c.status == AIRunStatus.RUNNING, ~jobs.is_active(_runs.c.job_id))
+        .values(status=AIRunStatus.INTERRUPTED, updated_at=datetime.utcnow())
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def _queue(session: AsyncSession, run: AIDescriptionRun) -> AIDescriptionRun:
+    """Commit ``run`` as running together with the job that executes it."""
+
+    try:
+        await session.flush()
+        job = jobs.enqueue(session, "ai.description_batch", {"run_id": run.id})
+        await session.flush()
+        run.job_id = job.id
+        await session.commit()
+    except IntegrityError as exc:
+        # The partial unique index on running runs: another worker got there first.
+        await session.rollback()
+        raise BatchError("A description run is already in progress") from exc
+    await session.refresh(run)
+    jobs.worker.notify()
+    return run
+
+
+async def start_run(
+    session: AsyncSession, *, options: dict[str, Any], user_id: int | None
+) -> AIDescriptionRun:
+    await mark_interrupted(session)
+    result = await session.exec(
+        select(func.count()).select_from(Product).where(*product_conditions(options))
+    )
+    run = AIDescriptionRun(
+        id=uuid4().hex, created_by=user_id, options=options, total=result.one()
+    )
+    session.add(run)
+    return await _queue(session, run)
+
+
+async def resume_run(session: AsyncSession, run: AIDescriptionRun) -> AIDescriptionRun:
+    """Continue a failed or interrupted run after its checkpoint."""
+
+    await mark_interrupted(session)
+    # Conditional, so two concurrent resumes cannot both queue the run.
+    statement = (
+        update(_runs)
+        .where(
+            _runs.c.id == run.id,
+            _runs.c.status.in_([AIRunStatus.FAILED, AIRunStatus.INTERRUPTED]),
+        )
+        .values(
+            status=AIRunStatus.RUNNING, error=None, finished_at=None, updated_at=datetime.utcnow()
+        )
+    )
+    try:
+        result = await session.execute(statement)
+    except IntegrityError as exc:
+        await session.rollback()
+        raise BatchError("A description run is already in progress") from exc
+    if result.rowcount != 1:
+        await session.rollback()
+        await session.refresh(run)
+        raise BatchError(f"Run is {run.status.value} and cannot be resumed")
+    await session.refresh(run)
+    return await _queue(session, run)
+
+
+async def _load_snapshot(run_id: str) -> tuple[AIRunStatus, dict[str, Any]] | None:
+    async with session_scope() as session:
+        run = await session.get(AIDescriptionRun, run_id)
+        return None if run is None else (run.status, snapshot(run))
+
+
+async def stream(run_id: str) -> AsyncIterator[str]:
+    """Server-sent events for a run: a snapshot, progress as it is made, then ``done``.
+
+    Works on any worker: item events come from the process running the batch, and
+    progress is also read back from the run row every ``POLL_SECONDS``.
+    """
+
+    queue: asyncio.Queue[tuple[str, dict[str, Any]]] = asyncio.Queue()
+    # Subscribe before reading the snapshot so no event falls in between.
+    _subscribers.setdefault(run_id, set()).add(queue)
+    try:
+        loaded = await _load_snapshot(run_id)
+        if loaded is None:
+            return
+        run_status, last = loaded
+        yield format_event("progress", last)
+        if run_status != AIRunStatus.RUNNING:
+            yield format_event("done", last)
+            return
+        idle = 0.0
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                loaded = await _load_snapshot(run_id)
+                if loaded is None:
+                    return
+                run_status, current = loaded
+                if run_status != AIRunStatus.RUNNING:
+                    yield format_event("done", current)
+                    return
+                if current != last:
+                    last = current
+                    idle = 0.0
+                    yield format_event("progress", current)
+                    continue
+                idle += POLL_SECONDS
+                if idle >= KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield KEEPALIVE
+                continue
+            idle = 0.0
+            if event == "progress":
+                last = data
+            yield format_event(event, data)
+            if event == "done":
+                return
+    finally:
+        subscribers = _subscribers.get(run_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del _subscribers[run_id]
@@ -0,0 +1,218 @@
+"""Content-addressed cache for AI completions.
+
+Entries are keyed by a SHA-256 digest of the model and every prompt part, so a changed
+system prompt or model never serves a stale answer. Lookups go through an in-process
+LRU tier first and fall back to the ``ai_cache_entries`` table, which is shared by all
+workers and survives restarts. Failing to store an entry is logged and never fails
+the request that produced it; expired rows are purged periodically.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..core.config import settings
+from ..db.session import session_scope
+from ..models import AICacheEntry
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "memory_hits",
+    "db_hits",
+    "misses",
+    "bypassed",
+    "stored",
+    "coalesced",
+    "write_errors",
+    "purged",
+)
+
+_entries = AICacheEntry.__table__
+
+
+def cache_key(model: str, *parts: str | None) -> str:
+    """Digest of the model and prompt parts; ``None`` and empty parts are equivalent."""
+
+    material = json.dumps([model, *((part or "").strip() for part in parts)], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Two-tier (memory, then database) cache with per-key request coalescing."""
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.ttl = ttl
+        self.memory: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counts: Counter[str] = Counter()
+        self._pending: dict[str, asyncio.Future[str]] = {}
+
+    def count(self, name: str) -> None:
+        self._counts[name] += 1
+
+    async def get(self, key: str) -> str | None:
+        content = self.memory.get(key)
+        if content is not None:
+            self._counts["memory_hits"] += 1
+            return content
+        now = datetime.utcnow()
+        async with session_scope() as session:
+            entry = await session.get(AICacheEntry, key)
+            if entry is None or entry.expires_at <= now:
+                self._counts["misses"] += 1
+                if entry is not None:
+                    await session.execute(delete(_entries).where(_entries.c.key == key))
+                    await session.commit()
+                return None
+            await session.execute(
+                update(_entries).where(_entries.c.key == key).values(hits=_entries.c.hits + 1)
+            )
+            await session.commit()
+        self._counts["db_hits"] += 1
+        self.memory.set(key, entry.content, ttl=(entry.expires_at - now).total_seconds())
+        return entry.content
+
+    async def set(self, key: str, model: str, content: str) -> None:
+        """Store ``content`` in both tiers; a database failure only costs the shared copy."""
+
+        now = datetime.utcnow()
+        self.memory.set(key, content)
+        values = {
+            "key": key,
+            "model": model,
+            "content": content,
+            "hits": 0,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl),
+        }
+        try:
+            async with session_scope() as session:
+                dialect = session.get_bind().dialect.name
+                if dialect in ("postgresql", "sqlite"):
+                    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                    statement = dialect_insert(_entries).values(values)
+                    await session.execute(
+                        statement.on_conflict_do_update(
+                            index_elements=[_entries.c.key],
+                            set_={
+                                name: statement.excluded[name]
+                                for name in ("model", "content", "hits", "created_at", "expires_at")
+                            },
+                        )
+                    )
+                else:
+                    await session.merge(AICacheEntry(**values))
+                await session.commit()
+        except Exception:
+            self._counts["write_errors"] += 1
+            logger.exception("Could not store AI cache entry %s", key)
+            return
+        self._counts["stored"] += 1
+
+    async def purge(self) -> int:
+        """Delete expired rows from the shared table and return how many went."""
+
+        async with session_scope() as session:
+            result = await session.execute(
+                delete(_entries).where(_entries.c.expires_at <= datetime.utcnow())
+            )
+            await session.commit()
+        self._counts["purged"] += result.rowcount
+        return result.rowcount
+
+    async def get_or_create(
+        self,
+        key: str,
+        model: str,
+        create: Callable[[], Awaitable[str]],
+        *,
+        bypass: bool = False,
+    ) -> str:
+        """Return the cached content for ``key`` or create and store it.
+
+        With ``bypass`` the lookup is skipped but the fresh result still replaces the
+        stored one. Concurrent misses for the same key share a single ``create`` call.
+        """
+
+        content, _ = await self.resolve(key, model, create, bypass=bypass)
+        return content
+
+    async def resolve(
+        self,
+        key: str,
+        model: str,
+        create: Callable[[], Awaitable[str]],
+        *,
+        bypass: bool = False,
+    ) -> tuple[str, bool]:
+        """Like :meth:`get_or_create`, also telling whether the content was already stored.
+
+        A caller that joined an in-flight ``create`` gets ``False``: nothing was stored yet.
+        """
+
+        if bypass:
+            self.count("bypassed")
+        else:
+            cached = await self.get(key)
+            if cached is not None:
+                return cached, True
+            pending = self._pending.get(key)
+            if pending is not None:
+                self._counts["coalesced"] += 1
+                return await asyncio.shield(pending), False
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            content = await create()
+            await self.set(key, model, content)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; this keeps an unobserved exception from being logged.
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(content)
+            return content, False
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def stats(self) -> dict[str, Any]:
+        hits = self._counts["memory_hits"] + self._counts["db_hits"]
+        lookups = hits + self._counts["misses"]
+        return {
+            "memory": self.memory.stats(),
+            "ttl_seconds": self.ttl,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            **{name: self._counts[name] for name in COUNTERS},
+        }
+
+
+cache = CompletionCache(maxsize=settings.ai_cache_size, ttl=settings.ai_cache_ttl)
+
+
+async def run_purge_periodically(interval: float) -> None:
+    """Purge expired cache rows every ``interval`` seconds until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await cache.purge()
+            if purged:
+                logger.info("Purged %s expired AI cache entries", purged)
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("AI cache purge failed")
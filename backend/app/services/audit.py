@@ -1,11 +1,119 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+from datetime import datetime
 from typing import Any
 
+from sqlalchemy import insert
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ..core.config import settings
+from ..db.session import engine
 from ..models import AuditLog
 
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """Background task that flushes queued audit entries with multi-row inserts."""
+
+    def __init__(self, *, batch_size: int, flush_interval: float, max_queue: int) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.written = 0
+        self.failed = 0
+        self._queue: asyncio.Queue[dict[str, Any] | None] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Stop the writer and flush everything still queued."""
+
+        if self._task is None or self._queue is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        await self._flush([entry for entry in self._drain(self._queue.qsize()) if entry])
+
+    async def enqueue(self, entry: dict[str, Any]) -> None:
+        """Queue an entry; waits only when the queue is full (backpressure)."""
+
+        assert self._queue is not None
+        await self._queue.put(entry)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    def _drain(self, limit: int) -> list[dict[str, Any] | None]:
+        assert self._queue is not None
+        batch: list[dict[str, Any] | None] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    closing = True
+                    break
+                batch.append(entry)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start : start + self.batch_size]
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(AuditLog), chunk)
+                self.written += len(chunk)
+            except Exception:  # pragma: no cover - keep the writer alive
+                self.failed += len(chunk)
+                logger.exception("Failed to write %d audit entries", len(chunk))
+
+
+writer = AuditWriter(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval,
+    max_queue=settings.audit_queue_size,
+)
+
 
 async def log_action(
     session: AsyncSession,
@@ -13,11 +121,29 @@ async def log_action(
     action: str,
     user_id: int | None = None,
     details: dict[str, Any] | None = None,
-) -> AuditLog:
-    """Persist an audit log entry."""
-
-    entry = AuditLog(user_id=user_id, action=action, details=details or {})
-    session.add(entry)
-    await session.commit()
-    await session.refresh(entry)
-    return entry
+    immediate: bool = False,
+) -> AuditLog | None:
+    """Record an audit log entry.
+
+    Entries are handed to the background writer unless ``immediate`` is set or the
+    writer is not running, in which case the row is committed through ``session``
+    and returned with its id.
+    """
+
+    if immediate or not writer.running:
+        entry = AuditLog(user_id=user_id, action=action, details=details or {})
+        session.add(entry)
+        await session.commit()
+        await session.refresh(entry)
+        return entry
+    now = datetime.utcnow()
+    await writer.enqueue(
+        {
+            "user_id": user_id,
+            "action": action,
+            "details": details or {},
+            "created_at": now,
+            "updated_at": now,
+        }
+    )
+    return None
@@ -0,0 +1,240 @@
+"""Audit log retention: roll old rows up per day, archive them, then purge them.
+
+Policies map an action pattern to a number of days to keep raw rows. A pattern is an
+exact action (``system.status_checked``), a prefix ending in ``*`` (``chat.*``) or a
+bare ``*`` for everything else. When several patterns match, the most specific wins.
+
+Run once with ``python -m app.services.audit_retention``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import (
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal_column,
+    not_,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..core.config import settings
+from ..db.session import engine
+from ..models import AuditLog, AuditLogRollup
+
+logger = logging.getLogger(__name__)
+
+_logs = AuditLog.__table__
+_rollups = AuditLogRollup.__table__
+
+
+def _specificity(pattern: str) -> tuple[int, int]:
+    if pattern == "*":
+        return (0, 0)
+    if pattern.endswith("*"):
+        return (1, len(pattern))
+    return (2, len(pattern))
+
+
+def _matches(pattern: str):
+    if pattern == "*":
+        return _logs.c.action.isnot(None)
+    if pattern.endswith("*"):
+        prefix = pattern[:-1].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return _logs.c.action.like(prefix + "%", escape="\\")
+    return _logs.c.action == pattern
+
+
+def _policy_conditions(policies: dict[str, int]) -> list[tuple[str, int, Any]]:
+    """Resolve overlapping patterns so each row is governed by its most specific policy."""
+
+    ordered = sorted(policies, key=_specificity, reverse=True)
+    resolved = []
+    for index, pattern in enumerate(ordered):
+        condition = _matches(pattern)
+        more_specific = [_matches(other) for other in ordered[:index]]
+        if more_specific:
+            condition = and_(condition, not_(or_(*more_specific)))
+        resolved.append((pattern, policies[pattern], condition))
+    return resolved
+
+
+def _archive_path(pattern: str, started: datetime) -> Path:
+    slug = pattern.replace("*", "all").replace("/", "_") or "all"
+    return Path(settings.audit_archive_dir) / f"audit-{slug}-{started:%Y%m%dT%H%M%S}.ndjson.gz"
+
+
+def _append_archive(path: Path, rows: list[Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as handle:
+        for row in rows:
+            record = {
+                "id": row.id,
+                "user_id": row.user_id,
+                "action": row.action,
+                "details": row.details,
+                "created_at": row.created_at.isoformat(),
+            }
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _bucket_key() -> list[Any]:
+    """Columns of the unique rollup index, as the upsert's conflict target."""
+
+    return [
+        _rollups.c.day,
+        _rollups.c.action,
+        func.coalesce(_rollups.c.user_id, literal_column("0")),
+    ]
+
+
+async def _merge_rollups(conn: AsyncConnection, rows: list[Any]) -> None:
+    buckets: dict[tuple[date, str, int | None], list[datetime]] = defaultdict(list)
+    for row in rows:
+        buckets[(row.created_at.date(), row.action, row.user_id)].append(row.created_at)
+    values = [
+        {
+            "day": day,
+            "action": action,
+            "user_id": user_id,
+            "count": len(stamps),
+            "first_at": min(stamps),
+            "last_at": max(stamps),
+        }
+        for (day, action, user_id), stamps in buckets.items()
+    ]
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(_rollups).values(values)
+        excluded = statement.excluded
+        await conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=_bucket_key(),
+                set_={
+                    "count": _rollups.c.count + excluded.count,
+                    "first_at": case(
+                        (excluded.first_at < _rollups.c.first_at, excluded.first_at),
+                        else_=_rollups.c.first_at,
+                    ),
+                    "last_at": case(
+                        (excluded.last_at > _rollups.c.last_at, excluded.last_at),
+                        else_=_rollups.c.last_at,
+                    ),
+                },
+            )
+        )
+        return
+
+    for value in values:
+        user_filter = (
+            _rollups.c.user_id.is_(None)
+            if value["user_id"] is None
+            else _rollups.c.user_id == value["user_id"]
+        )
+        existing = (
+            await conn.execute(
+                select(_rollups.c.id, _rollups.c.first_at, _rollups.c.last_at).where(
+                    _rollups.c.day == value["day"],
+                    _rollups.c.action == value["action"],
+                    user_filter,
+                )
+            )
+        ).first()
+        if existing is None:
+            await conn.execute(insert(_rollups).values(value))
+        else:
+            await conn.execute(
+                update(_rollups)
+                .where(_rollups.c.id == existing.id)
+                .values(
+                    count=_rollups.c.count + value["count"],
+                    first_at=min(existing.first_at, value["first_at"]),
+                    last_at=max(existing.last_at, value["last_at"]),
+                )
+            )
+
+
+async def apply_retention(now: datetime | None = None) -> list[dict[str, Any]]:
+    """Apply every configured policy and return per-policy counts of purged rows."""
+
+    started = now or datetime.utcnow()
+    batch_size = settings.audit_retention_batch_size
+    report: list[dict[str, Any]] = []
+    for pattern, days, condition in _policy_conditions(settings.audit_retention_policies):
+        cutoff = started - timedelta(days=days)
+        path = _archive_path(pattern, started)
+        purged = 0
+        while True:
+            batch = (
+                select(_logs.c.id)
+                .where(condition, _logs.c.created_at < cutoff)
+                .order_by(_logs.c.id)
+                .limit(batch_size)
+            )
+            if engine.dialect.name == "postgresql":
+                # Concurrent runs take disjoint batches instead of waiting on each other.
+                batch = batch.with_for_update(skip_locked=True)
+            async with engine.begin() as conn:
+                # Deleting first claims the rows: a concurrent run cannot read, count
+                # and archive them too. A failed archive write rolls the delete back.
+                result = await conn.execute(
+                    delete(_logs)
+                    .where(_logs.c.id.in_(batch.scalar_subquery()))
+                    .returning(*_logs.c)
+                )
+                rows = sorted(result.all(), key=lambda row: row.id)
+                if not rows:
+                    break
+                await asyncio.to_thread(_append_archive, path, rows)
+                await _merge_rollups(conn, rows)
+            purged += len(rows)
+        report.append(
+            {
+                "policy": pattern,
+                "retention_days": days,
+                "cutoff": cutoff.isoformat(),
+                "purged": purged,
+                "archive": str(path) if purged else None,
+            }
+        )
+    return report
+
+
+async def run_periodically(interval: float) -> None:
+    """Apply retention every ``interval`` seconds until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await apply_retention()
+            logger.info("Audit retention applied: %s", report)
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("Audit retention run failed")
+
+
+if __name__ == "__main__":
+
+    async def _main() -> None:
+        try:
+            for item in await apply_retention():
+                print(json.dumps(item, ensure_ascii=False))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_main())
@@ -0,0 +1,140 @@
+"""One pooled ``httpx.AsyncClient`` per outbound provider.
+
+Clients are created on first use and closed on application shutdown, so connections
+(and their TLS sessions) are reused across requests. Tests can route every provider
+through ``httpx.MockTransport`` with :meth:`ClientRegistry.use_transport`.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    timeout: float
+    max_connections: int
+    max_keepalive: int
+
+
+# Overridable per provider through HTTP_TIMEOUTS / HTTP_MAX_CONNECTIONS.
+PROVIDERS: dict[str, ProviderConfig] = {
+    "zid": ProviderConfig(timeout=30.0, max_connections=20, max_keepalive=10),
+    "openai": ProviderConfig(timeout=60.0, max_connections=10, max_keepalive=5),
+    "whatsapp": ProviderConfig(timeout=30.0, max_connections=10, max_keepalive=5),
+}
+DEFAULT_PROVIDER = ProviderConfig(timeout=10.0, max_connections=5, max_keepalive=2)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ClientRegistry:
+    """Lazily built, long-lived clients keyed by provider name."""
+
+    def __init__(self) -> None:
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._transports: dict[str, httpx.AsyncBaseTransport] = {}
+        self._requests: Counter[str] = Counter()
+        self._responses: dict[str, Counter[str]] = {}
+
+    def config(self, provider: str) -> ProviderConfig:
+        base = PROVIDERS.get(provider, DEFAULT_PROVIDER)
+        max_connections = settings.http_max_connections.get(provider, base.max_connections)
+        return ProviderConfig(
+            timeout=settings.http_timeouts.get(provider, base.timeout),
+            max_connections=max_connections,
+            max_keepalive=min(base.max_keepalive, max_connections),
+        )
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._build(provider)
+            self._clients[provider] = client
+        return client
+
+    def _build(self, provider: str) -> httpx.AsyncClient:
+        config = self.config(provider)
+        limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        http2 = settings.http_http2
+        if http2 and not _http2_available():
+            logger.warning("HTTP_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+            http2 = False
+        transport = self._transports.get(provider) or self._transports.get("*")
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=1)
+        responses = self._responses.setdefault(provider, Counter())
+
+        async def on_request(request: httpx.Request) -> None:
+            self._requests[provider] += 1
+
+        async def on_response(response: httpx.Response) -> None:
+            responses[f"{response.status_code // 100}xx"] += 1
+
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=config.timeout,
+            event_hooks={"request": [on_request], "response": [on_response]},
+        )
+
+    async def use_transport(
+        self, transport: httpx.AsyncBaseTransport, provider: str = "*"
+    ) -> None:
+        """Route ``provider`` (or every provider) through ``transport``, e.g. a MockTransport."""
+
+        self._transports[provider] = transport
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        providers: dict[str, Any] = {}
+        for provider in sorted(set(self._clients) | set(self._requests)):
+            config = self.config(provider)
+            entry: dict[str, Any] = {
+                "open": provider in self._clients and not self._clients[provider].is_closed,
+                "timeout": config.timeout,
+                "max_connections": config.max_connections,
+                "requests": self._requests[provider],
+                "responses": dict(self._responses.get(provider, {})),
+            }
+            entry.update(_pool_usage(self._clients.get(provider)))
+            providers[provider] = entry
+        return {"http2": settings.http_http2 and _http2_available(), "providers": providers}
+
+
+def _pool_usage(client: httpx.AsyncClient | None) -> dict[str, int]:
+    # httpcore does not expose pool counters publicly; read them defensively.
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+registry = ClientRegistry()
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    return registry.get(provider)
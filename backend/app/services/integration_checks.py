@@ -4,9 +4,10 @@ import asyncio
 from datetime import datetime
 from typing import Any
 
-import httpx
-
 from ..core.config import settings
+from .http_clients import get_client
+
+CHECK_TIMEOUT = 10.0
 
 
 class IntegrationStatus:
@@ -27,10 +28,11 @@ class IntegrationStatus:
         }
 
 
-async def _http_check(url: str, headers: dict[str, str] | None = None) -> tuple[bool, str]:
+async def _http_check(
+    provider: str, url: str, headers: dict[str, str] | None = None
+) -> tuple[bool, str]:
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(url, headers=headers)
+        response = await get_client(provider).get(url, headers=headers, timeout=CHECK_TIMEOUT)
         if response.status_code < 400:
             return True, "نجح الاتصال التجريبي"
         return False, f"خطأ HTTP {response.status_code}: {response.text[:120]}"
@@ -43,6 +45,7 @@ async def check_zid() -> IntegrationStatus:
     if not token:
         return IntegrationStatus("zid", False, False, "لم يتم ضبط مفتاح زد بعد")
     ok, message = await _http_check(
+        "zid",
         "https://api.zid.sa/v1/products",
         headers={"Authorization": f"Bearer {token}"},
     )
@@ -54,6 +57,7 @@ async def check_openai() -> IntegrationStatus:
     if not token:
         return IntegrationStatus("openai", False, False, "مفتاح OpenAI غير متوفر")
     ok, message = await _http_check(
+        "openai",
         "https://api.openai.com/v1/models",
         headers={"Authorization": f"Bearer {token}"},
     )
@@ -61,8 +65,8 @@ async def check_openai() -> IntegrationStatus:
 
 
 async def check_whatsapp() -> IntegrationStatus:
-    token = settings.wa_token
-    phone_id = settings.wa_phone_id
+    token = settings.whatsapp_token
+    phone_id = settings.whatsapp_phone_id
     if not token or not phone_id:
         return IntegrationStatus(
             "whatsapp",
@@ -71,7 +75,7 @@ async def check_whatsapp() -> IntegrationStatus:
             "بيانات واتساب ناقصة (الرمز أو معرف الرقم)",
         )
     url = f"https://graph.facebook.com/v17.0/{phone_id}/message_templates"
-    ok, message = await _http_check(url, headers={"Authorization": f"Bearer {token}"})
+    ok, message = await _http_check("whatsapp", url, headers={"Authorization": f"Bearer {token}"})
     return IntegrationStatus("whatsapp", True, ok, message)
 
 
@@ -0,0 +1,127 @@
+"""Per-product voucher counters kept in ``product_inventory``.
+
+Every write path that changes a voucher's state calls :func:`adjust` inside its own
+transaction, so stock can be read in O(1) without scanning ``vouchers``.
+
+Counter definitions (all exclude redeemed codes except ``redeemed``):
+
+* ``available`` – not locked and not held by any reservation
+* ``reserved`` – held by a reservation, including expired holds not yet swept
+* ``locked`` – locked by an admin
+
+Listing and verifying codes by status use the same definitions
+(:func:`app.services.vouchers.status_condition`), so a count and the rows behind it
+agree until the next sweep releases lapsed holds.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..models import ProductInventory, Voucher
+
+COUNTERS = ("available", "reserved", "redeemed", "locked")
+
+_inventory = ProductInventory.__table__
+_vouchers = Voucher.__table__
+
+
+async def adjust(session: AsyncSession, product_id: int, **deltas: int) -> None:
+    """Add ``deltas`` to a product's counters, creating the row on first use."""
+
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown inventory counters: {sorted(unknown)}")
+    now = datetime.utcnow()
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(_inventory).values(
+            product_id=product_id, updated_at=now, **deltas
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={
+                **{name: _inventory.c[name] + statement.excluded[name] for name in deltas},
+                "updated_at": now,
+            },
+        )
+        await session.execute(statement)
+        return
+
+    result = await session.execute(
+        update(_inventory)
+        .where(_inventory.c.product_id == product_id)
+        .values(
+            updated_at=now,
+            **{name: _inventory.c[name] + value for name, value in deltas.items()},
+        )
+    )
+    if result.rowcount == 0:
+        await session.execute(
+            insert(_inventory).values(product_id=product_id, updated_at=now, **deltas)
+        )
+
+
+def recount_query(product_id: int | None = None):
+    """Aggregate the true counters from ``vouchers``."""
+
+    open_code = _vouchers.c.is_redeemed.is_(False)
+    held = _vouchers.c.reservation_id.isnot(None)
+    is_locked = _vouchers.c.is_locked.is_(True)
+
+    def total(condition: Any):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    query = select(
+        _vouchers.c.product_id,
+        total(open_code & ~held & ~is_locked).label("available"),
+        total(open_code & held).label("reserved"),
+        total(_vouchers.c.is_redeemed.is_(True)).label("redeemed"),
+        total(open_code & ~held & is_locked).label("locked"),
+    ).group_by(_vouchers.c.product_id)
+    if product_id is not None:
+        query = query.where(_vouchers.c.product_id == product_id)
+    return query
+
+
+def _replace_statements(rows: list[Any], product_id: int | None) -> list[Any]:
+    now = datetime.utcnow()
+    statements: list[Any] = [
+        _inventory.delete()
+        if product_id is None
+        else _inventory.delete().where(_inventory.c.product_id == product_id)
+    ]
+    if rows:
+        statements.append(
+            insert(_inventory).values(
+                [
+                    {
+                        **{name: getattr(row, name) for name in COUNTERS},
+                        "product_id": row.product_id,
+                        "updated_at": now,
+                    }
+                    for row in rows
+                ]
+            )
+        )
+    return statements
+
+
+async def recount(session: AsyncSession, product_id: int | None = None) -> int:
+    """Rebuild counters from ``vouchers`` for one product or all of them."""
+
+    rows = (await session.execute(recount_query(product_id))).all()
+    for statement in _replace_statements(rows, product_id):
+        await session.execute(statement)
+    await session.commit()
+    return len(rows)
+
@@ -0,0 +1,295 @@
+"""Durable background jobs (transactional outbox).
+
+Callers add a job with :func:`enqueue` inside the transaction that makes the change,
+so the job exists if and only if the change was committed. The :class:`JobWorker`
+claims due jobs with a time-limited lease, runs the registered handler, and either
+marks the job done, schedules a retry with backoff, or moves it to ``dead`` once
+its attempts are exhausted. A crashed worker's jobs become claimable again when
+their lease expires.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import socket
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import engine
+from ..models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+_jobs = Job.__table__
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class JobError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class _Registration:
+    func: JobHandler
+    concurrency: int
+
+
+HANDLERS: dict[str, _Registration] = {}
+
+
+def handler(job_type: str, *, concurrency: int = 1) -> Callable[[JobHandler], JobHandler]:
+    """Register the decorated coroutine as the handler for ``job_type``."""
+
+    def decorator(func: JobHandler) -> JobHandler:
+        HANDLERS[job_type] = _Registration(func, concurrency)
+        return func
+
+    return decorator
+
+
+def enqueue(
+    session: AsyncSession,
+    job_type: str,
+    payload: dict[str, Any],
+    *,
+    delay: float = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    """Add a job to ``session``; it is persisted by the caller's commit."""
+
+    job = Job(
+        type=job_type,
+        payload=payload,
+        max_attempts=max_attempts or settings.job_max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    session.add(job)
+    return job
+
+
+def is_active(job_id: Any) -> Any:
+    """SQL condition: the job ``job_id`` refers to is still queued or being worked on."""
+
+    return exists().where(
+        _jobs.c.id == job_id, _jobs.c.status.in_([JobStatus.PENDING, JobStatus.RUNNING])
+    )
+
+
+def _backoff(attempts: int) -> float:
+    ceiling = min(settings.job_backoff_max, settings.job_backoff_base * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class JobWorker:
+    """Polls the jobs table and runs handlers within per-type concurrency limits."""
+
+    def __init__(self, *, poll_interval: float, lease_seconds: float) -> None:
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self._running: dict[int, asyncio.Task[None]] = {}
+        self._running_by_type: Counter[str] = Counter()
+        self._counts: Counter[str] = Counter()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def concurrency(self, job_type: str) -> int:
+        return settings.job_concurrency.get(job_type, HANDLERS[job_type].concurrency)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="job-worker")
+
+    async def stop(self) -> None:
+        """Stop polling, cancel jobs in flight and hand them back to the queue."""
+
+        if self._task is None:
+            return
+        in_flight = list(self._running)
+        tasks = [self._task, *self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if in_flight:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    update(_jobs)
+                    .where(_jobs.c.id.in_(in_flight), _jobs.c.locked_by == self.worker_id)
+                    .values(status=JobStatus.PENDING, lease_until=None, locked_by=None)
+                )
+
+    def notify(self) -> None:
+        """Poll now instead of waiting for the next interval, e.g. right after enqueueing."""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await self._renew_leases()
+                await self._claim_and_dispatch()
+            except Exception:  # pragma: no cover - keep polling
+                logger.exception("Job worker poll failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _renew_leases(self) -> None:
+        if not self._running:
+            return
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(_jobs)
+                .where(_jobs.c.id.in_(list(self._running)), _jobs.c.locked_by == self.worker_id)
+                .values(lease_until=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+            )
+
+    async def _claim(self, job_type: str, limit: int) -> list[Any]:
+        now = datetime.utcnow()
+        due = or_(
+            and_(_jobs.c.status == JobStatus.PENDING, _jobs.c.run_after <= now),
+            and_(_jobs.c.status == JobStatus.RUNNING, _jobs.c.lease_until < now),
+        )
+        candidates = (
+            select(_jobs.c.id)
+            .where(_jobs.c.type == job_type, due)
+            .order_by(_jobs.c.run_after, _jobs.c.id)
+            .limit(limit)
+        )
+        if engine.dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                update(_jobs)
+                .where(_jobs.c.id.in_(candidates.scalar_subquery()), due)
+                .values(
+                    status=JobStatus.RUNNING,
+                    attempts=_jobs.c.attempts + 1,
+                    lease_until=now + timedelta(seconds=self.lease_seconds),
+                    locked_by=self.worker_id,
+                    updated_at=now,
+                )
+                .returning(
+                    _jobs.c.id,
+                    _jobs.c.type,
+                    _jobs.c.payload,
+                    _jobs.c.attempts,
+                    _jobs.c.max_attempts,
+                )
+            )
+            return result.all()
+
+    async def _claim_and_dispatch(self) -> None:
+        for job_type in HANDLERS:
+            free = self.concurrency(job_type) - self._running_by_type[job_type]
+            if free <= 0:
+                continue
+            for job in await self._claim(job_type, free):
+                self._running_by_type[job_type] += 1
+                task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+                self._running[job.id] = task
+
+    async def _execute(self, job: Any) -> None:
+        try:
+            await HANDLERS[job.type].func(job.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            finished = datetime.utcnow()
+            dead = job.attempts >= job.max_attempts
+            self._counts["dead" if dead else "retried"] += 1
+            logger.warning(
+                "Job %s (%s) failed on attempt %s: %s", job.id, job.type, job.attempts, exc
+            )
+            values: dict[str, Any] = {"last_error": str(exc)[:1000], "updated_at": finished}
+            if dead:
+                values.update(status=JobStatus.DEAD, finished_at=finished)
+            else:
+                values.update(
+                    status=JobStatus.PENDING,
+                    run_after=finished + timedelta(seconds=_backoff(job.attempts)),
+                )
+            await self._finish(job.id, values)
+        else:
+            finished = datetime.utcnow()
+            self._counts["succeeded"] += 1
+            await self._finish(
+                job.id,
+                {"status": JobStatus.SUCCEEDED, "finished_at": finished, "updated_at": finished},
+            )
+        finally:
+            self._running.pop(job.id, None)
+            self._running_by_type[job.type] -= 1
+
+    async def _finish(self, job_id: int, values: dict[str, Any]) -> None:
+        async with engine.begin() as conn:
+            # Only the lease holder may settle the job; an expired lease may have moved on.
+            await conn.execute(
+                update(_jobs)
+                .where(_jobs.c.id == job_id, _jobs.c.locked_by == self.worker_id)
+                .values(lease_until=None, locked_by=None, **values)
+            )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "worker_id": self.worker_id,
+            "types": {
+                job_type: {
+                    "in_flight": self._running_by_type[job_type],
+                    "concurrency": self.concurrency(job_type),
+                }
+                for job_type in HANDLERS
+            },
+            **{name: self._counts[name] for name in ("succeeded", "retried", "dead")},
+        }
+
+
+worker = JobWorker(
+    poll_interval=settings.job_poll_interval, lease_seconds=settings.job_lease_seconds
+)
+
+
+async def retry(session: AsyncSession, job: Job) -> Job:
+    """Put a dead job back in the queue with a fresh set of attempts.
+
+    Conditional on the job still being dead, so two concurrent retries queue it once.
+    """
+
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(_jobs)
+        .where(_jobs.c.id == job.id, _jobs.c.status == JobStatus.DEAD)
+        .values(
+            status=JobStatus.PENDING, attempts=0, run_after=now, finished_at=None, updated_at=now
+        )
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        raise JobError("Only dead jobs can be retried")
+    await session.commit()
+    await session.refresh(job)
+    worker.notify()
+    return job
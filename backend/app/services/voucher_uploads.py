@@ -0,0 +1,257 @@
+"""Staged voucher file uploads.
+
+A CSV or XLSX file is parsed incrementally, validated and deduplicated into a staging
+file on disk, and a report is returned. Nothing reaches ``vouchers`` until the upload
+is explicitly committed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..models import Voucher, VoucherUpload, VoucherUploadStatus
+from ..utils.encryption import hash_code
+from .vouchers import ImportResult, bulk_import, normalize_code
+
+HEADER_NAMES = {"code", "codes", "voucher", "voucher_code", "كود", "الكود", "الرمز"}
+BATCH_SIZE = 1000
+PROGRESS_EVERY = 5000
+MAX_REPORTED_ERRORS = 50
+
+
+class UploadError(ValueError):
+    pass
+
+
+def upload_kind(filename: str | None) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    if suffix == ".xlsx":
+        return "xlsx"
+    raise UploadError("Unsupported file type; upload a .csv or .xlsx file")
+
+
+def _code_column(row: list[Any]) -> int | None:
+    for index, cell in enumerate(row):
+        if isinstance(cell, str) and cell.strip().lower() in HEADER_NAMES:
+            return index
+    return None
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _iter_rows(rows: Iterator[list[Any]]) -> Iterator[tuple[int, str]]:
+    column = 0
+    for line_no, row in enumerate(rows, start=1):
+        row = list(row or [])
+        if line_no == 1:
+            header_column = _code_column(row)
+            if header_column is not None:
+                column = header_column
+                continue
+        if not any(_cell_text(cell).strip() for cell in row):
+            continue
+        yield line_no, _cell_text(row[column]) if column < len(row) else ""
+
+
+def _iter_csv(fileobj: IO[bytes]) -> Iterator[tuple[int, str]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        yield from _iter_rows(csv.reader(text))
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(fileobj: IO[bytes]) -> Iterator[tuple[int, str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise UploadError("XLSX uploads require the optional 'openpyxl' package") from exc
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        yield from _iter_rows(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def _fingerprint(code: str) -> int:
+    """64-bit digest used for in-file deduplication instead of keeping every code string."""
+
+    return int.from_bytes(hashlib.blake2b(code.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _staged_path(upload_id: str) -> Path:
+    return Path(settings.voucher_upload_dir) / f"{upload_id}.txt"
+
+
+async def stage_upload(
+    session: AsyncSession, upload: VoucherUpload, fileobj: IO[bytes], kind: str
+) -> VoucherUpload:
+    """Parse ``fileobj`` into a staging file and fill in the upload's pre-commit report."""
+
+    rows = _iter_xlsx(fileobj) if kind == "xlsx" else _iter_csv(fileobj)
+    path = _staged_path(upload.id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    seen: set[int] = set()
+    errors: list[dict[str, Any]] = []
+    next_progress = PROGRESS_EVERY
+    upload.staged_path = str(path)
+
+    try:
+        with path.open("w", encoding="utf-8") as staged:
+            while True:
+                batch = await asyncio.to_thread(lambda: list(itertools.islice(rows, BATCH_SIZE)))
+                if not batch:
+                    break
+                upload.rows_processed += len(batch)
+                if upload.rows_processed > settings.voucher_upload_max_rows:
+                    raise UploadError(
+                        f"File exceeds the limit of {settings.voucher_upload_max_rows} rows"
+                    )
+                candidates: list[str] = []
+                for line_no, raw in batch:
+                    code = normalize_code(raw)
+                    if code is None:
+                        upload.invalid += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append(
+                                {"line": line_no, "value": raw[:80], "reason": "invalid"}
+                            )
+                        continue
+                    fingerprint = _fingerprint(code)
+                    if fingerprint in seen:
+                        upload.duplicates_in_file += 1
+                        continue
+                    seen.add(fingerprint)
+                    candidates.append(code)
+                if candidates:
+                    digests = {hash_code(code): code for code in candidates}
+                    result = await session.exec(
+                        select(Voucher.code_hash).where(Voucher.code_hash.in_(list(digests)))
+                    )
+                    existing = {digests[digest] for digest in result.all()}
+                    upload.existing += len(existing)
+                    fresh = [code for code in candidates if code not in existing]
+                    upload.valid += len(fresh)
+                    staged.writelines(code + "\n" for code in fresh)
+                if upload.rows_processed >= next_progress:
+                    next_progress += PROGRESS_EVERY
+                    await session.commit()
+    except Exception as exc:
+        upload.status = VoucherUploadStatus.FAILED
+        upload.report = {"errors": errors, "failure": str(exc)}
+        path.unlink(missing_ok=True)
+        upload.staged_path = None
+        await session.commit()
+        raise UploadError(str(exc)) from exc
+
+    upload.status = VoucherUploadStatus.STAGED
+    upload.report = {"errors": errors, "errors_truncated": upload.invalid > len(errors)}
+    await session.commit()
+    await session.refresh(upload)
+    return upload
+
+
+def _iter_staged(path: str) -> Iterator[str]:
+    with Path(path).open(encoding="utf-8") as staged:
+        for line in staged:
+            yield line.rstrip("\n")
+
+
+async def _claim(
+    session: AsyncSession,
+    upload: VoucherUpload,
+    status: VoucherUploadStatus,
+    allowed: tuple[VoucherUploadStatus, ...],
+    message: str,
+) -> None:
+    """Move ``upload`` to ``status`` unless a concurrent request already closed it."""
+
+    uploads = VoucherUpload.__table__
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(uploads)
+        .where(uploads.c.id == upload.id, uploads.c.status.in_(allowed))
+        .values(status=status, updated_at=now)
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        raise UploadError(message)
+    upload.status = status
+    upload.updated_at = now
+    await session.commit()
+
+
+async def commit_upload(
+    session: AsyncSession, upload: VoucherUpload, *, collect_codes: bool = False
+) -> ImportResult:
+    """Insert the staged codes of an accepted upload."""
+
+    staged_path = upload.staged_path
+    if not staged_path:
+        raise UploadError("Upload is not awaiting approval")
+    await _claim(
+        session,
+        upload,
+        VoucherUploadStatus.COMMITTED,
+        (VoucherUploadStatus.STAGED,),
+        "Upload is not awaiting approval",
+    )
+    try:
+        # Staging already removed in-file duplicates, so skip the in-memory set.
+        result = await bulk_import(
+            session,
+            product_id=upload.product_id,
+            codes=_iter_staged(staged_path),
+            notes=upload.notes,
+            collect_codes=collect_codes,
+            dedupe=False,
+        )
+    except Exception as exc:
+        await session.rollback()
+        upload.status = VoucherUploadStatus.FAILED
+        upload.report = {**(upload.report or {}), "failure": str(exc)}
+        _remove_staged(upload)
+        await session.commit()
+        raise
+    _remove_staged(upload)
+    upload.inserted = result.inserted
+    await session.commit()
+    return result
+
+
+async def discard_upload(session: AsyncSession, upload: VoucherUpload) -> None:
+    await _claim(
+        session,
+        upload,
+        VoucherUploadStatus.DISCARDED,
+        (VoucherUploadStatus.PARSING, VoucherUploadStatus.STAGED, VoucherUploadStatus.FAILED),
+        "Upload is already closed",
+    )
+    _remove_staged(upload)
+    await session.commit()
+
+
+def _remove_staged(upload: VoucherUpload) -> None:
+    if upload.staged_path:
+        Path(upload.staged_path).unlink(missing_ok=True)
+    upload.staged_path = None
@@ -0,0 +1,501 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Literal
+from uuid import uuid4
+
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import session_scope
+from ..models import ReservationStatus, Voucher, VoucherReservation
+from ..utils.encryption import hash_code
+from . import inventory
+
+logger = logging.getLogger(__name__)
+
+MAX_CODE_LENGTH = 255
+# Characters of a code shown in redacted listings.
+VISIBLE_SUFFIX = 4
+# Hashes per IN (...) lookup; stays well under SQLite's and PostgreSQL's bind limits.
+LOOKUP_BATCH_SIZE = 5000
+
+VoucherStatus = Literal["available", "reserved", "redeemed", "locked"]
+
+_vouchers = Voucher.__table__
+# SQLite has a single writer; serialising allocations in-process avoids "database is locked".
+_sqlite_allocation_lock = asyncio.Lock()
+
+
+class VoucherError(RuntimeError):
+    pass
+
+
+class InsufficientStockError(VoucherError):
+    pass
+
+
+class ReservationError(VoucherError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    inserted_codes: list[str] = field(default_factory=list)
+
+
+def normalize_code(raw: str) -> str | None:
+    """Return the canonical form of a voucher code, or ``None`` if it is not valid."""
+
+    code = raw.strip() if isinstance(raw, str) else ""
+    if not code or len(code) > MAX_CODE_LENGTH or any(char.isspace() for char in code):
+        return None
+    return code
+
+
+async def _insert_chunk(session: AsyncSession, rows: list[dict]) -> list[str]:
+    """Insert ``rows`` skipping codes that already exist; return the codes written."""
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = (
+            dialect_insert(_vouchers)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["code"])
+            .returning(_vouchers.c.code)
+        )
+        result = await session.execute(statement)
+        return list(result.scalars())
+
+    existing = await session.execute(
+        select(_vouchers.c.code_hash).where(
+            _vouchers.c.code_hash.in_([row["code_hash"] for row in rows])
+        )
+    )
+    taken = set(existing.scalars())
+    fresh = [row for row in rows if row["code_hash"] not in taken]
+    if fresh:
+        await session.execute(insert(_vouchers), fresh)
+    return [row["code"] for row in fresh]
+
+
+async def bulk_import(
+    session: AsyncSession,
+    *,
+    product_id: int,
+    codes: Iterable[str],
+    notes: str | None = None,
+    collect_codes: bool = False,
+    dedupe: bool = True,
+) -> ImportResult:
+    """Insert voucher codes in chunked multi-row statements without loading ORM objects.
+
+    Each chunk commits on its own, so a large import makes steady progress and a
+    failure only rolls back the chunk in flight. Pass ``dedupe=False`` for codes that
+    are already unique; the database still rejects codes that exist.
+    """
+
+    result = ImportResult()
+    chunk_size = settings.voucher_import_chunk_size
+    seen: set[str] = set()
+    chunk: list[dict] = []
+
+    async def flush() -> None:
+        written = await _insert_chunk(session, chunk)
+        await inventory.adjust(session, product_id, available=len(written))
+        await session.commit()
+        result.inserted += len(written)
+        result.duplicates += len(chunk) - len(written)
+        if collect_codes:
+            result.inserted_codes.extend(written)
+        chunk.clear()
+
+    now = datetime.utcnow()
+    for raw in codes:
+        code = normalize_code(raw)
+        if code is None:
+            result.invalid += 1
+            continue
+        if dedupe:
+            if code in seen:
+                result.duplicates += 1
+                continue
+            seen.add(code)
+        chunk.append(
+            {
+                "product_id": product_id,
+                "code": code,
+                "code_hash": hash_code(code),
+                "is_redeemed": False,
+                "is_locked": False,
+                "notes": notes,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+    return result
+
+
+@dataclass
+class CodeCheck:
+    code: str
+    status: VoucherStatus | Literal["unknown", "invalid"]
+    voucher_id: int | None = None
+    product_id: int | None = None
+
+
+def _row_status(row) -> VoucherStatus:
+    """Python twin of :func:`status_condition`."""
+
+    if row.is_redeemed:
+        return "redeemed"
+    if row.reserved_until is not None:
+        return "reserved"
+    if row.is_locked:
+        return "locked"
+    return "available"
+
+
+async def verify_codes(session: AsyncSession, codes: Iterable[str]) -> list[CodeCheck]:
+    """Report the state of each code using set-based lookups on ``code_hash``.
+
+    Results follow the input order; codes that are malformed or absent are reported
+    as ``invalid`` and ``unknown``.
+    """
+
+    checks: list[CodeCheck] = []
+    pending: dict[str, list[CodeCheck]] = {}
+    for raw in codes:
+        code = normalize_code(raw)
+        if code is None:
+            checks.append(CodeCheck(code=str(raw), status="invalid"))
+            continue
+        check = CodeCheck(code=code, status="unknown")
+        checks.append(check)
+        pending.setdefault(hash_code(code), []).append(check)
+
+    digests = list(pending)
+    for start in range(0, len(digests), LOOKUP_BATCH_SIZE):
+        batch = digests[start : start + LOOKUP_BATCH_SIZE]
+        result = await session.execute(
+            select(
+                _vouchers.c.id,
+                _vouchers.c.product_id,
+                _vouchers.c.code_hash,
+                _vouchers.c.is_redeemed,
+                _vouchers.c.is_locked,
+                _vouchers.c.reserved_until,
+            ).where(_vouchers.c.code_hash.in_(batch))
+        )
+        for row in result:
+            for check in pending[row.code_hash]:
+                check.status = _row_status(row)
+                check.voucher_id = row.id
+                check.product_id = row.product_id
+    return checks
+
+
+@dataclass
+class Allocation:
+    reservation: VoucherReservation
+    codes: list[str]
+
+
+def available_condition(now: datetime):
+    """SQL condition for vouchers that can be handed out at ``now``."""
+
+    return and_(
+        _vouchers.c.is_redeemed.is_(False),
+        _vouchers.c.is_locked.is_(False),
+        or_(_vouchers.c.reserved_until.is_(None), _vouchers.c.reserved_until < now),
+    )
+
+
+def status_condition(status: VoucherStatus):
+    """SQL condition selecting vouchers in ``status``, as counted in ``product_inventory``.
+
+    A lapsed hold stays ``reserved`` until the sweeper releases it, so listings and
+    verification agree with the counters instead of with the clock.
+    """
+
+    open_code = _vouchers.c.is_redeemed.is_(False)
+    # Open codes carry ``reserved_until`` exactly while a reservation holds them.
+    held = _vouchers.c.reserved_until.isnot(None)
+    if status == "available":
+        return and_(open_code, ~held, _vouchers.c.is_locked.is_(False))
+    if status == "reserved":
+        return and_(open_code, held)
+    if status == "redeemed":
+        return _vouchers.c.is_redeemed.is_(True)
+    return and_(open_code, ~held, _vouchers.c.is_locked.is_(True))
+
+
+def code_suffix():
+    """SQL expression for the visible tail of a code; short codes are hidden entirely."""
+
+    length = func.length(_vouchers.c.code)
+    return case(
+        (length > VISIBLE_SUFFIX, func.substr(_vouchers.c.code, length - VISIBLE_SUFFIX + 1)),
+        else_=literal(""),
+    ).label("code_suffix")
+
+
+async def _claim(
+    session: AsyncSession,
+    *,
+    product_id: int,
+    quantity: int,
+    reservation_id: str,
+    expires_at: datetime,
+) -> list[str]:
+    now = datetime.utcnow()
+    candidates = (
+        select(_vouchers.c.id, _vouchers.c.reservation_id)
+        .where(_vouchers.c.product_id == product_id, available_condition(now))
+        .order_by(_vouchers.c.id)
+        .limit(quantity)
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        # Concurrent allocators skip each other's locked rows instead of queueing on them.
+        candidates = candidates.with_for_update(skip_locked=True)
+    rows = (await session.execute(candidates)).all()
+    if len(rows) < quantity:
+        return []
+    result = await session.execute(
+        update(_vouchers)
+        .where(_vouchers.c.id.in_([row.id for row in rows]))
+        .values(reservation_id=reservation_id, reserved_until=expires_at, updated_at=now)
+        .returning(_vouchers.c.code)
+    )
+    # Codes taken over from expired, unswept holds are already counted as reserved.
+    fresh = sum(1 for row in rows if row.reservation_id is None)
+    await inventory.adjust(session, product_id, available=-fresh, reserved=fresh)
+    return list(result.scalars())
+
+
+async def allocate(
+    session: AsyncSession,
+    *,
+    product_id: int,
+    quantity: int,
+    ttl_seconds: int | None = None,
+    reference: str | None = None,
+    user_id: int | None = None,
+) -> Allocation:
+    """Atomically reserve ``quantity`` unsold codes of a product, or none at all."""
+
+    reservation_id = uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(
+        seconds=ttl_seconds or settings.voucher_reservation_ttl
+    )
+    is_sqlite = session.get_bind().dialect.name == "sqlite"
+    if is_sqlite:
+        await _sqlite_allocation_lock.acquire()
+    try:
+        codes = await _claim(
+            session,
+            product_id=product_id,
+            quantity=quantity,
+            reservation_id=reservation_id,
+            expires_at=expires_at,
+        )
+        if len(codes) < quantity:
+            await session.rollback()
+            raise InsufficientStockError(
+                f"Only {len(codes)} of {quantity} requested codes are available"
+            )
+        reservation = VoucherReservation(
+            id=reservation_id,
+            product_id=product_id,
+            quantity=quantity,
+            expires_at=expires_at,
+            reference=reference,
+            created_by=user_id,
+        )
+        session.add(reservation)
+        await session.commit()
+    finally:
+        if is_sqlite:
+            _sqlite_allocation_lock.release()
+    return Allocation(reservation=reservation, codes=codes)
+
+
+async def _get_active_reservation(
+    session: AsyncSession, reservation_id: str
+) -> VoucherReservation:
+    reservation = await session.get(VoucherReservation, reservation_id)
+    if reservation is None:
+        raise ReservationError("Reservation not found")
+    if reservation.status != ReservationStatus.ACTIVE:
+        raise ReservationError(f"Reservation is already {reservation.status.value}")
+    return reservation
+
+
+async def _settle(
+    session: AsyncSession,
+    reservation: VoucherReservation,
+    status: ReservationStatus,
+    now: datetime,
+    *conditions,
+) -> None:
+    """Move an active reservation to ``status``, or raise if another caller got there first.
+
+    The conditional update is the first write of the transaction, so a concurrent
+    confirm or release waits on the row and then matches nothing.
+    """
+
+    reservations = VoucherReservation.__table__
+    result = await session.execute(
+        update(reservations)
+        .where(
+            reservations.c.id == reservation.id,
+            reservations.c.status == ReservationStatus.ACTIVE,
+            *conditions,
+        )
+        .values(status=status, updated_at=now)
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        raise ReservationError("Reservation is no longer active")
+    reservation.status = status
+    reservation.updated_at = now
+
+
+async def confirm_reservation(session: AsyncSession, reservation_id: str) -> VoucherReservation:
+    """Mark every code held by an unexpired reservation as redeemed."""
+
+    reservation = await _get_active_reservation(session, reservation_id)
+    now = datetime.utcnow()
+    if reservation.expires_at < now:
+        raise ReservationError("Reservation has expired")
+    reservations = VoucherReservation.__table__
+    await _settle(
+        session, reservation, ReservationStatus.CONFIRMED, now, reservations.c.expires_at >= now
+    )
+    result = await session.execute(
+        update(_vouchers)
+        .where(_vouchers.c.reservation_id == reservation_id, _vouchers.c.is_redeemed.is_(False))
+        .values(is_redeemed=True, redeemed_at=now, reserved_until=None, updated_at=now)
+    )
+    if result.rowcount != reservation.quantity:
+        await session.rollback()
+        raise ReservationError("Reservation no longer holds all of its codes")
+    await inventory.adjust(
+        session, reservation.product_id, reserved=-result.rowcount, redeemed=result.rowcount
+    )
+    await session.commit()
+    return reservation
+
+
+async def release_reservation(session: AsyncSession, reservation_id: str) -> VoucherReservation:
+    """Return the codes of a reservation to the available pool."""
+
+    reservation = await _get_active_reservation(session, reservation_id)
+    now = datetime.utcnow()
+    await _settle(session, reservation, ReservationStatus.RELEASED, now)
+    result = await session.execute(
+        update(_vouchers)
+        .where(_vouchers.c.reservation_id == reservation_id, _vouchers.c.is_redeemed.is_(False))
+        .values(reservation_id=None, reserved_until=None, updated_at=now)
+    )
+    await inventory.adjust(
+        session, reservation.product_id, reserved=-result.rowcount, available=result.rowcount
+    )
+    await session.commit()
+    return reservation
+
+
+async def _apply_per_product(session: AsyncSession, statement, **signs: int) -> int:
+    """Run an UPDATE returning ``product_id`` and move the counts between counters."""
+
+    result = await session.execute(statement.returning(_vouchers.c.product_id))
+    per_product = Counter(result.scalars())
+    for product_id, count in per_product.items():
+        await inventory.adjust(
+            session, product_id, **{name: sign * count for name, sign in signs.items()}
+        )
+    return sum(per_product.values())
+
+
+async def set_locked(session: AsyncSession, voucher_ids: list[int], locked: bool) -> int:
+    """Lock or unlock unsold, unreserved codes; return how many changed."""
+
+    now = datetime.utcnow()
+    statement = (
+        update(_vouchers)
+        .where(
+            _vouchers.c.id.in_(voucher_ids),
+            _vouchers.c.is_locked.is_(not locked),
+            _vouchers.c.is_redeemed.is_(False),
+            _vouchers.c.reservation_id.is_(None),
+        )
+        .values(is_locked=locked, updated_at=now)
+    )
+    sign = 1 if locked else -1
+    changed = await _apply_per_product(session, statement, locked=sign, available=-sign)
+    await session.commit()
+    return changed
+
+
+async def expire_reservations(session: AsyncSession) -> int:
+    """Return the codes of lapsed reservations to stock; return how many were freed."""
+
+    now = datetime.utcnow()
+    is_sqlite = session.get_bind().dialect.name == "sqlite"
+    if is_sqlite:
+        await _sqlite_allocation_lock.acquire()
+    try:
+        freed = await _apply_per_product(
+            session,
+            update(_vouchers)
+            .where(
+                _vouchers.c.reservation_id.isnot(None),
+                _vouchers.c.is_redeemed.is_(False),
+                _vouchers.c.reserved_until < now,
+            )
+            .values(reservation_id=None, reserved_until=None, updated_at=now),
+            reserved=-1,
+            available=1,
+        )
+        reservations = VoucherReservation.__table__
+        await session.execute(
+            update(reservations)
+            .where(
+                reservations.c.status == ReservationStatus.ACTIVE,
+                reservations.c.expires_at < now,
+            )
+            .values(status=ReservationStatus.EXPIRED, updated_at=now)
+        )
+        await session.commit()
+    finally:
+        if is_sqlite:
+            _sqlite_allocation_lock.release()
+    return freed
+
+
+async def run_sweeper_periodically(interval: float) -> None:
+    """Expire lapsed reservations every ``interval`` seconds until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_scope() as session:
+                freed = await expire_reservations(session)
+            if freed:
+                logger.info("Released %s codes from expired reservations", freed)
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("Reservation sweep failed")
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
-import httpx
-
 from ..core.config import settings
+from .http_clients import get_client
 
 WHATSAPP_API_URL = "https://graph.facebook.com/v19.0"
 
@@ -39,13 +38,12 @@ async def send_template(
     }
     if components:
         payload["template"]["components"] = components
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            f"{WHATSAPP_API_URL}/{settings.whatsapp_phone_id}/messages",
-            json=payload,
-            headers=_headers(),
-        )
-        data = response.json()
-        if response.status_code >= 400:
-            raise WhatsAppError(data)
-        return data
+    response = await get_client("whatsapp").post(
+        f"{WHATSAPP_API_URL}/{settings.whatsapp_phone_id}/messages",
+        json=payload,
+        headers=_headers(),
+    )
+    data = response.json()
+    if response.status_code >= 400:
+        raise WhatsAppError(data)
+    return data
@@ -1,17 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 from datetime import datetime
 from typing import Any
+from uuid import uuid4
 
-import httpx
+from sqlalchemy import func, update
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..core.config import settings
-from ..models import Product
-from . import audit
+from ..db.session import session_scope
+from ..models import (
+    Product,
+    ProductInventory,
+    Voucher,
+    ZidChunkStatus,
+    ZidSyncStatus,
+    ZidVoucherChunk,
+    ZidVoucherExport,
+)
+from ..utils.encryption import hash_code
+from . import audit, jobs
+from .http_clients import get_client
+from .vouchers import LOOKUP_BATCH_SIZE
+from .zid_scheduler import Priority, scheduler_for
 
 ZID_BASE_URL = "https://api.zid.store/v1"
 
+_vouchers = Voucher.__table__
+_exports = ZidVoucherExport.__table__
+
 
 class ZidError(RuntimeError):
     pass
@@ -35,53 +56,190 @@ def to_zid_product_payload(product: Product) -> dict[str, Any]:
     }
 
 
+def _localized(value: Any, language: str) -> str | None:
+    if isinstance(value, dict):
+        return value.get(language)
+    return value if language == "ar" else None
+
+
+def from_zid_product(item: dict[str, Any]) -> dict[str, Any]:
+    """Map a Zid catalog item onto ``Product`` fields (the inverse of the push payload)."""
+
+    metadata = item.get("metadata") or {}
+    images = item.get("images") or []
+    image = images[0] if images else None
+    if isinstance(image, dict):
+        image = image.get("url") or (image.get("image") or {}).get("full_size")
+    return {
+        "zid_product_id": str(item["id"]),
+        "name_ar": _localized(item.get("name"), "ar") or str(item.get("name") or item["id"]),
+        "name_en": _localized(item.get("name"), "en") or metadata.get("name_en"),
+        "description_ar": _localized(item.get("description"), "ar") or None,
+        "description_en": _localized(item.get("description"), "en")
+        or metadata.get("description_en"),
+        "sku": item.get("sku") or None,
+        "price": float(item.get("price") or 0),
+        "is_active": bool(item.get("is_published", item.get("is_active", True))),
+        "image_url": image,
+        "categories": metadata.get("categories") or None,
+    }
+
+
+def payload_hash(payload: dict[str, Any]) -> str:
+    """Stable digest of a Zid payload, independent of key order."""
+
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 def _auth_headers() -> dict[str, str]:
     if not settings.zid_token:
         raise ZidError("ZID token is not configured")
     return {"Authorization": f"Bearer {settings.zid_token}"}
 
 
-async def _request(method: str, endpoint: str, payload: dict[str, Any]) -> dict[str, Any]:
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.request(
-            method,
-            f"{ZID_BASE_URL}{endpoint}",
-            json=payload,
-            headers=_auth_headers(),
-        )
-        data = response.json()
-        if response.status_code >= 400:
-            raise ZidError(data)
-        return data
+async def _request(
+    method: str,
+    endpoint: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    params: dict[str, Any] | None = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> dict[str, Any]:
+    headers = _auth_headers()
+    client = get_client("zid")
+    response = await scheduler_for(settings.zid_token).send(
+        lambda: client.request(
+            method, f"{ZID_BASE_URL}{endpoint}", json=payload, params=params, headers=headers
+        ),
+        priority,
+        method=method,
+    )
+    data = response.json()
+    if response.status_code >= 400:
+        raise ZidError(data)
+    return data
 
 
-async def create_product(session: AsyncSession, product: Product) -> str | None:
-    try:
-        data = await _request("POST", "/products", to_zid_product_payload(product))
-        zid_id = data.get("data", {}).get("id") or data.get("id")
+async def push_product(
+    product: Product,
+    payload: dict[str, Any],
+    *,
+    priority: Priority = Priority.INTERACTIVE,
+) -> str | None:
+    """Create or update ``product`` on Zid and return its Zid id; raises on failure.
+
+    A product not linked yet is first looked up by SKU, so retrying a create is safe.
+    """
+
+    zid_id = product.zid_product_id
+    if not zid_id and product.sku:
+        # A retry after a create whose response was lost must not create it twice.
+        zid_id = await find_product_by_sku(product.sku, priority=priority)
+    if zid_id:
+        await _request("PUT", f"/products/{zid_id}", payload, priority=priority)
+        return zid_id
+    data = await _request("POST", "/products", payload, priority=priority)
+    zid_id = data.get("data", {}).get("id") or data.get("id")
+    return str(zid_id) if zid_id else None
+
+
+async def find_product_by_sku(
+    sku: str, *, priority: Priority = Priority.INTERACTIVE
+) -> str | None:
+    """Return the id of the Zid product with exactly this SKU, if there is one."""
+
+    data = await _request(
+        "GET", "/products", params={"sku": sku, "page": 1, "per_page": 10}, priority=priority
+    )
+    items = data.get("results") or data.get("data") or data.get("products") or []
+    for item in items:
+        if isinstance(item, dict) and item.get("sku") == sku and item.get("id") is not None:
+            return str(item["id"])
+    return None
+
+
+async def fetch_products(
+    *,
+    page: int,
+    page_size: int,
+    updated_since: datetime | None = None,
+    priority: Priority = Priority.BACKGROUND,
+) -> tuple[list[dict[str, Any]], bool]:
+    """Fetch one page of the Zid catalog; returns the items and whether more pages follow."""
+
+    params: dict[str, Any] = {"page": page, "per_page": page_size}
+    if updated_since is not None:
+        params["updated_since"] = updated_since.isoformat()
+    data = await _request("GET", "/products", params=params, priority=priority)
+    items = data.get("results") or data.get("data") or data.get("products") or []
+    pagination = data.get("pagination") or {}
+    if "next" in data:
+        has_more = bool(data["next"])
+    elif pagination.get("last_page"):
+        has_more = page < int(pagination["last_page"])
+    else:
+        has_more = len(items) >= page_size
+    return items, has_more
+
+
+@jobs.handler("zid.create_product", concurrency=2)
+async def create_product(payload: dict[str, Any]) -> None:
+    """Job handler: push a newly created product to Zid; raising lets the job retry."""
+
+    async with session_scope() as session:
+        product = await session.get(Product, payload["product_id"])
+        if product is None or product.zid_product_id:
+            return
+        zid_payload = to_zid_product_payload(product)
+        read_at = product.updated_at
+        try:
+            zid_id = await push_product(product, zid_payload, priority=Priority.BACKGROUND)
+        except Exception as exc:
+            await audit.log_action(
+                session,
+                action="zid.create_product.error",
+                details={"product_id": product.id, "error": str(exc)},
+            )
+            raise
+        product.zid_product_id = zid_id
+        # Edits made while the request was in flight stay pending for the next push.
+        product.last_synced_at = read_at
+        product.zid_payload_hash = payload_hash(zid_payload)
+        await session.commit()
         await audit.log_action(
             session,
             action="zid.create_product",
-            details={"payload": to_zid_product_payload(product), "response": data},
+            details={"product_id": product.id, "zid_id": zid_id},
         )
-        return str(zid_id) if zid_id else None
-    except Exception as exc:
-        await audit.log_action(
-            session,
-            action="zid.create_product.error",
-            details={"error": str(exc)},
+
+
+@jobs.handler("zid.update_stock", concurrency=2)
+async def update_stock(payload: dict[str, Any]) -> None:
+    """Job handler: set a product's Zid quantity to its current count of available codes."""
+
+    async with session_scope() as session:
+        product = await session.get(Product, payload["product_id"])
+        if product is None or not product.zid_product_id:
+            return
+        counts = await session.get(ProductInventory, product.id)
+        quantity = counts.available if counts else 0
+        await _request(
+            "PUT",
+            f"/products/{product.zid_product_id}",
+            {"quantity": quantity},
+            priority=Priority.BACKGROUND,
         )
-        return None
 
 
 async def update_product(session: AsyncSession, product: Product) -> bool:
     if not product.zid_product_id:
         raise ZidError("Product has not been pushed to Zid yet")
     try:
-        data = await _request(
-            "PUT", f"/products/{product.zid_product_id}", to_zid_product_payload(product)
-        )
+        payload = to_zid_product_payload(product)
+        data = await _request("PUT", f"/products/{product.zid_product_id}", payload)
         product.last_synced_at = datetime.utcnow()
+        product.zid_payload_hash = payload_hash(payload)
         await session.commit()
         await audit.log_action(
             session,
@@ -99,21 +257,163 @@ async def update_product(session: AsyncSession, product: Product) -> bool:
 
 
 async def import_vouchers(
-    session: AsyncSession, *, product: Product, codes: list[str]
-) -> bool:
-    try:
-        payload = {"product_id": product.zid_product_id, "codes": codes}
-        data = await _request("POST", "/vouchers/import", payload)
-        await audit.log_action(
-            session,
-            action="zid.import_vouchers",
-            details={"product_id": product.id, "response": data},
+    session: AsyncSession,
+    *,
+    product: Product,
+    codes: list[str],
+    user_id: int | None = None,
+) -> ZidVoucherExport:
+    """Persist ``codes`` as a chunked export to Zid and queue its upload as a job.
+
+    Chunks store voucher ids rather than codes; each is sent on its own and marked
+    ``sent`` or ``failed``, so retries and restarts never resend accepted chunks. The
+    job's lease guarantees a single worker process runs an export at a time.
+    """
+
+    digests = [hash_code(code) for code in codes]
+    voucher_ids: list[int] = []
+    for start in range(0, len(digests), LOOKUP_BATCH_SIZE):
+        result = await session.execute(
+            select(_vouchers.c.id).where(
+                _vouchers.c.code_hash.in_(digests[start : start + LOOKUP_BATCH_SIZE])
+            )
         )
-        return True
-    except Exception as exc:
+        voucher_ids.extend(result.scalars())
+    voucher_ids.sort()
+
+    chunk_size = settings.zid_voucher_chunk_size
+    export = ZidVoucherExport(
+        id=uuid4().hex,
+        product_id=product.id,
+        created_by=user_id,
+        total_codes=len(voucher_ids),
+        chunk_size=chunk_size,
+        chunks_total=-(-len(voucher_ids) // chunk_size),
+    )
+    session.add(export)
+    for seq, start in enumerate(range(0, len(voucher_ids), chunk_size)):
+        session.add(
+            ZidVoucherChunk(
+                export_id=export.id, seq=seq, voucher_ids=voucher_ids[start : start + chunk_size]
+            )
+        )
+    jobs.enqueue(session, "zid.export_vouchers", {"export_id": export.id})
+    await session.commit()
+    jobs.worker.notify()
+    return export
+
+
+async def _send_chunk(chunk_id: int, zid_product_id: str, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        async with session_scope() as session:
+            chunk = await session.get(ZidVoucherChunk, chunk_id)
+            result = await session.execute(
+                select(_vouchers.c.code)
+                .where(_vouchers.c.id.in_(chunk.voucher_ids))
+                .order_by(_vouchers.c.id)
+            )
+            codes = list(result.scalars())
+        error: str | None = None
+        try:
+            await _request(
+                "POST",
+                "/vouchers/import",
+                {"product_id": zid_product_id, "codes": codes},
+                priority=Priority.BACKGROUND,
+            )
+        except Exception as exc:
+            error = str(exc)[:500]
+        async with session_scope() as session:
+            chunk = await session.get(ZidVoucherChunk, chunk_id)
+            chunk.attempts += 1
+            chunk.status = ZidChunkStatus.FAILED if error else ZidChunkStatus.SENT
+            chunk.error = error
+            chunk.updated_at = datetime.utcnow()
+            await session.commit()
+
+
+async def run_export(export_id: str) -> None:
+    """Send every chunk of an export that has not been accepted yet."""
+
+    async with session_scope() as session:
+        export = await session.get(ZidVoucherExport, export_id)
+        product = await session.get(Product, export.product_id) if export else None
+        # A job re-run after its export finished (e.g. a lease lost at the very end).
+        if export is None or product is None or export.status != ZidSyncStatus.RUNNING:
+            return
+        result = await session.exec(
+            select(ZidVoucherChunk.id)
+            .where(
+                ZidVoucherChunk.export_id == export_id,
+                ZidVoucherChunk.status != ZidChunkStatus.SENT,
+            )
+            .order_by(ZidVoucherChunk.seq)
+        )
+        pending = list(result.all())
+        zid_product_id = product.zid_product_id
+
+    semaphore = asyncio.Semaphore(settings.zid_voucher_concurrency)
+    await asyncio.gather(
+        *(_send_chunk(chunk_id, zid_product_id, semaphore) for chunk_id in pending)
+    )
+
+    async with session_scope() as session:
+        export = await session.get(ZidVoucherExport, export_id)
+        result = await session.exec(
+            select(ZidVoucherChunk.status, func.count())
+            .where(ZidVoucherChunk.export_id == export_id)
+            .group_by(ZidVoucherChunk.status)
+        )
+        counts = dict(result.all())
+        export.chunks_sent = counts.get(ZidChunkStatus.SENT, 0)
+        export.chunks_failed = counts.get(ZidChunkStatus.FAILED, 0)
+        export.status = ZidSyncStatus.FAILED if export.chunks_failed else ZidSyncStatus.COMPLETED
+        export.finished_at = export.updated_at = datetime.utcnow()
+        await session.commit()
         await audit.log_action(
             session,
-            action="zid.import_vouchers.error",
-            details={"product_id": product.id, "error": str(exc)},
+            action="zid.import_vouchers.error" if export.chunks_failed else "zid.import_vouchers",
+            user_id=export.created_by,
+            details={
+                "product_id": export.product_id,
+                "export_id": export.id,
+                "codes": export.total_codes,
+                "chunks_sent": export.chunks_sent,
+                "chunks_failed": export.chunks_failed,
+            },
         )
-        return False
+
+
+@jobs.handler("zid.export_vouchers")
+async def export_vouchers(payload: dict[str, Any]) -> None:
+    """Job handler: upload the pending chunks of an export."""
+
+    await run_export(payload["export_id"])
+
+
+async def retry_export(session: AsyncSession, export: ZidVoucherExport) -> ZidVoucherExport:
+    """Resend only the failed chunks of a finished export."""
+
+    now = datetime.utcnow()
+    # Conditional, so two concurrent retries cannot queue the same export twice.
+    result = await session.execute(
+        update(_exports)
+        .where(_exports.c.id == export.id, _exports.c.status != ZidSyncStatus.RUNNING)
+        .values(status=ZidSyncStatus.RUNNING, finished_at=None, updated_at=now)
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        raise ZidError("Export is still running")
+    await session.execute(
+        update(ZidVoucherChunk.__table__)
+        .where(
+            ZidVoucherChunk.__table__.c.export_id == export.id,
+            ZidVoucherChunk.__table__.c.status == ZidChunkStatus.FAILED,
+        )
+        .values(status=ZidChunkStatus.PENDING)
+    )
+    jobs.enqueue(session, "zid.export_vouchers", {"export_id": export.id})
+    await session.commit()
+    await session.refresh(export)
+    jobs.worker.notify()
+    return export
@@ -0,0 +1,233 @@
+"""Incremental pull of the Zid catalog into ``products``.
+
+Pages are fetched one at a time and upserted by ``zid_product_id`` (falling back to a
+matching SKU for products created locally). Products edited here and not pushed yet
+keep their local version, and an item whose SKU belongs to another product is listed
+in the report instead of failing the pull. The newest ``updated_at`` seen is stored
+per store once a pull completes, so the next pull only asks for changed items.
+
+Run once with ``python -m app.services.zid_pull``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import engine, session_scope
+from ..models import Product, ZidPullCursor
+from . import zid
+
+logger = logging.getLogger(__name__)
+
+# Zid caps page numbers well below this; it only guards against a server that never ends.
+MAX_PAGES = 10_000
+# SKU conflicts listed in the report; the ``conflicts`` counter stays exact beyond this.
+MAX_REPORTED_CONFLICTS = 200
+
+_products = Product.__table__
+
+
+def store_key() -> str:
+    return settings.zid_store_id or "default"
+
+
+def _parse_timestamp(value: Any) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _has_local_changes(product: Product) -> bool:
+    """Whether ``product`` was edited here since it was last in sync with Zid."""
+
+    return product.last_synced_at is None or product.updated_at > product.last_synced_at
+
+
+def _report_conflict(report: dict[str, Any], row: dict[str, Any], product_id: int | None) -> None:
+    report["conflicts"] += 1
+    if len(report["conflict_items"]) < MAX_REPORTED_CONFLICTS:
+        report["conflict_items"].append(
+            {"zid_product_id": row["zid_product_id"], "sku": row["sku"], "product_id": product_id}
+        )
+
+
+async def _insert(session: AsyncSession, row: dict[str, Any], now: datetime) -> int | None:
+    """Insert a pulled product unless its Zid id or SKU already exists; return its id."""
+
+    values = {**row, "created_at": now, "updated_at": now, "last_synced_at": now}
+    values["zid_payload_hash"] = zid.payload_hash(zid.to_zid_product_payload(Product(**values)))
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        result = await session.execute(
+            dialect_insert(_products)
+            .values(values)
+            .on_conflict_do_nothing()
+            .returning(_products.c.id)
+        )
+        return result.scalar_one_or_none()
+
+    taken = [_products.c.zid_product_id == values["zid_product_id"]]
+    if values.get("sku"):
+        taken.append(_products.c.sku == values["sku"])
+    if await session.scalar(select(_products.c.id).where(or_(*taken))) is not None:
+        return None
+    try:
+        async with session.begin_nested():
+            result = await session.execute(insert(_products).values(values))
+    except IntegrityError:
+        # Inserted by a concurrent pull after the check above.
+        return None
+    return result.inserted_primary_key[0]
+
+
+async def _upsert_page(
+    session: AsyncSession, items: list[dict[str, Any]], report: dict[str, Any]
+) -> None:
+    # A Zid product listed twice in a page is applied once, with its last version.
+    pulled = {
+        row["zid_product_id"]: row
+        for row in (zid.from_zid_product(item) for item in items if item.get("id") is not None)
+    }
+    rows = list(pulled.values())
+    if not rows:
+        return
+    result = await session.exec(select(Product).where(Product.zid_product_id.in_(pulled)))
+    by_zid_id = {product.zid_product_id: product for product in result.all()}
+    skus = {row["sku"] for row in rows if row["sku"]}
+    by_sku: dict[str, Product] = {}
+    if skus:
+        result = await session.exec(select(Product).where(Product.sku.in_(skus)))
+        by_sku = {product.sku: product for product in result.all()}
+
+    now = datetime.utcnow()
+    claimed: dict[str, str] = {}
+    for row in rows:
+        zid_id, sku = row["zid_product_id"], row["sku"]
+        product = by_zid_id.get(zid_id)
+        owner = by_sku.get(sku) if sku else None
+        if product is None and owner is not None and owner.zid_product_id is None:
+            product = owner
+        if sku and (
+            (owner is not None and owner is not product) or claimed.get(sku, zid_id) != zid_id
+        ):
+            # The SKU is taken by another product here; leave both untouched.
+            _report_conflict(report, row, owner.id if owner is not None else None)
+            continue
+        if sku:
+            claimed[sku] = zid_id
+
+        if product is None:
+            if await _insert(session, row, now) is not None:
+                report["created"] += 1
+            elif await session.scalar(
+                select(Product.id).where(Product.zid_product_id == zid_id)
+            ):
+                # Another pull inserted it a moment ago from the same Zid data.
+                report["updated"] += 1
+            else:
+                _report_conflict(report, row, None)
+            continue
+        if product.zid_product_id is None:
+            # A local product with the same SKU: link it and let the next push send our
+            # version, since nothing of it has reached Zid yet.
+            product.zid_product_id = zid_id
+            by_zid_id[zid_id] = product
+            report["linked"] += 1
+            continue
+        if _has_local_changes(product):
+            # Edited here and not pushed yet; the push job will send it to Zid.
+            report["kept_local"] += 1
+            continue
+        for field, value in row.items():
+            setattr(product, field, value)
+        # Pulled data is by definition in sync, so the push job must not send it back.
+        product.updated_at = product.last_synced_at = now
+        product.zid_payload_hash = zid.payload_hash(zid.to_zid_product_payload(product))
+        report["updated"] += 1
+    await session.commit()
+    session.expunge_all()
+
+
+async def pull_catalog(*, full: bool = False) -> dict[str, Any]:
+    """Pull changed Zid products page by page and advance the store's cursor."""
+
+    started = datetime.utcnow()
+    report: dict[str, Any] = {
+        "pages": 0,
+        "items": 0,
+        "created": 0,
+        "updated": 0,
+        "linked": 0,
+        "kept_local": 0,
+        "conflicts": 0,
+        "conflict_items": [],
+    }
+    async with session_scope() as session:
+        cursor = await session.get(ZidPullCursor, store_key())
+        since = None if full or cursor is None else cursor.updated_since
+        high_water = since
+        for page in range(1, MAX_PAGES + 1):
+            items, has_more = await zid.fetch_products(
+                page=page, page_size=settings.zid_pull_page_size, updated_since=since
+            )
+            report["pages"] += 1
+            report["items"] += len(items)
+            for item in items:
+                stamp = _parse_timestamp(item.get("updated_at"))
+                if stamp is not None and (high_water is None or stamp > high_water):
+                    high_water = stamp
+            await _upsert_page(session, items, report)
+            if not has_more or not items:
+                break
+
+        cursor = await session.get(ZidPullCursor, store_key())
+        if cursor is None:
+            cursor = ZidPullCursor(store=store_key())
+            session.add(cursor)
+        cursor.updated_since = high_water
+        cursor.last_run_at = started
+        cursor.last_report = report
+        await session.commit()
+    report["updated_since"] = high_water.isoformat() if high_water else None
+    return report
+
+
+async def run_periodically(interval: float) -> None:
+    """Pull the catalog every ``interval`` seconds until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await pull_catalog()
+            logger.info("Zid catalog pulled: %s", report)
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("Zid catalog pull failed")
+
+
+if __name__ == "__main__":
+
+    async def _main() -> None:
+        try:
+            print(json.dumps(await pull_catalog(), ensure_ascii=False))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_main())
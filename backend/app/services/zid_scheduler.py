@@ -0,0 +1,238 @@
+"""Rate-limit-aware scheduling of Zid API calls.
+
+Each Zid token gets its own :class:`ZidScheduler`. Requests take a slot from a token
+bucket whose size and refill rate are learned from Zid's ``X-RateLimit-*`` headers,
+interactive calls always go ahead of queued background (sync) calls, and throttled or
+failed attempts are retried with ``Retry-After`` or jittered exponential backoff. A POST
+is only resent when Zid cannot have acted on it: a 429 or a failure to connect.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("requests", "retries", "throttled", "server_errors", "transport_errors")
+# Methods that are safe to resend after a 5xx or a dropped response.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Raised before the request is sent, so retrying cannot duplicate it.
+PRE_SEND_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+def _header_number(headers: httpx.Headers, *names: str) -> float | None:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+def retry_after_seconds(headers: httpx.Headers) -> float | None:
+    """Parse ``Retry-After`` given either as seconds or as an HTTP date."""
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose capacity and refill rate adapt to the server's limits."""
+
+    def __init__(self, capacity: float, window: float) -> None:
+        self.capacity = capacity
+        self.window = window
+        self.tokens = capacity
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.window
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float = 1.0) -> float:
+        """Consume ``amount`` tokens and return 0, or the seconds until they are available."""
+
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        # A request larger than the bucket would never fit; let it through once it is full.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def charge(self, amount: float) -> None:
+        """Correct an earlier estimate; a negative ``amount`` gives tokens back."""
+
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def learn(self, headers: httpx.Headers) -> None:
+        limit = _header_number(headers, "x-ratelimit-limit", "ratelimit-limit")
+        remaining = _header_number(headers, "x-ratelimit-remaining", "ratelimit-remaining")
+        if limit and limit > 0:
+            self.capacity = limit
+        if remaining is not None:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0:
+                reset = _header_number(headers, "x-ratelimit-reset", "ratelimit-reset")
+                if reset is not None:
+                    # Either seconds until reset or an epoch timestamp.
+                    self.pause(reset - time.time() if reset > 1e9 else reset)
+
+
+class ZidScheduler:
+    """Admits requests for one token according to its bucket and priority lanes."""
+
+    def __init__(self) -> None:
+        self.bucket = TokenBucket(settings.zid_rate_limit, settings.zid_rate_limit_window)
+        self._cond = asyncio.Condition()
+        self._waiting: Counter[Priority] = Counter()
+        self._in_flight = 0
+        self._counts: Counter[str] = Counter()
+
+    def _blocked_by_higher_lane(self, priority: Priority) -> bool:
+        return any(self._waiting[lane] for lane in Priority if lane < priority)
+
+    async def _acquire(self, priority: Priority) -> None:
+        async with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    if self._blocked_by_higher_lane(priority):
+                        await self._cond.wait()
+                        continue
+                    delay = self.bucket.take()
+                    if delay <= 0:
+                        return
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(settings.zid_backoff_max, settings.zid_backoff_base * 2**attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    async def send(
+        self,
+        call: Callable[[], Awaitable[httpx.Response]],
+        priority: Priority = Priority.INTERACTIVE,
+        *,
+        method: str = "GET",
+    ) -> httpx.Response:
+        """Run ``call`` when admitted, retrying throttled and (if safe) failed attempts."""
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempts = settings.zid_max_retries + 1
+        for attempt in range(attempts):
+            await self._acquire(priority)
+            self._in_flight += 1
+            self._counts["requests"] += 1
+            try:
+                response = await call()
+            except httpx.TransportError as exc:
+                self._counts["transport_errors"] += 1
+                if attempt == attempts - 1 or not (idempotent or isinstance(exc, PRE_SEND_ERRORS)):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            finally:
+                self._in_flight -= 1
+
+            self.bucket.learn(response.headers)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            retry_after = retry_after_seconds(response.headers)
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if response.status_code == 429:
+                # Throttling applies to the whole token, so every queued caller waits.
+                self._counts["throttled"] += 1
+                self.bucket.pause(delay)
+            else:
+                self._counts["server_errors"] += 1
+                if not idempotent:
+                    # The request may have been applied; let the caller decide.
+                    return response
+            if attempt == attempts - 1:
+                return response
+            self._counts["retries"] += 1
+            logger.info("Zid returned %s, retrying in %.2fs", response.status_code, delay)
+            if response.status_code != 429:
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "queued": {lane.name.lower(): self._waiting[lane] for lane in Priority},
+            "in_flight": self._in_flight,
+            "limit": self.bucket.capacity,
+            "window_seconds": self.bucket.window,
+            "tokens": round(self.bucket.tokens, 2),
+            "paused_for": round(max(0.0, self.bucket.paused_until - now), 2),
+            **{name: self._counts[name] for name in COUNTERS},
+        }
+
+
+_schedulers: dict[str, ZidScheduler] = {}
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+
+
+def scheduler_for(token: str) -> ZidScheduler:
+    key = _token_key(token)
+    scheduler = _schedulers.get(key)
+    if scheduler is None:
+        scheduler = _schedulers[key] = ZidScheduler()
+    return scheduler
+
+
+def stats() -> dict[str, Any]:
+    return {key: scheduler.stats() for key, scheduler in _schedulers.items()}
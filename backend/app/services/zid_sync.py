@@ -0,0 +1,233 @@
+"""Bulk push of the product catalog to Zid.
+
+Only stale products (never synced, or edited since the last sync) are considered, and
+of those only the ones whose Zid payload actually changed are sent. Progress is
+checkpointed per batch in ``zid_sync_runs`` so an interrupted run can be resumed.
+
+A run executes as a ``zid.catalog_sync`` job, so the job lease decides which worker
+process owns it: a crashed worker's run is picked up again from its checkpoint, and a
+run only counts as interrupted once its job is no longer queued or running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import session_scope
+from ..models import Product, ZidSyncRun, ZidSyncStatus
+from . import audit, jobs, zid
+from .zid_scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+# Failures kept on the run row; the counters stay exact beyond this.
+MAX_REPORTED_FAILURES = 200
+
+_products = Product.__table__
+_runs = ZidSyncRun.__table__
+
+
+class SyncError(RuntimeError):
+    pass
+
+
+@dataclass
+class _Outcome:
+    product_id: int
+    # The ``updated_at`` the payload was built from; stored as ``last_synced_at``.
+    read_at: datetime
+    zid_id: str | None = None
+    digest: str | None = None
+    pushed: bool = False
+    error: str | None = None
+
+
+def stale_condition():
+    return or_(
+        Product.last_synced_at.is_(None),
+        Product.updated_at > Product.last_synced_at,
+    )
+
+
+async def _push_one(product: Product, semaphore: asyncio.Semaphore) -> _Outcome:
+    payload = zid.to_zid_product_payload(product)
+    digest = zid.payload_hash(payload)
+    outcome = _Outcome(
+        product_id=product.id,
+        read_at=product.updated_at,
+        zid_id=product.zid_product_id,
+        digest=digest,
+    )
+    if product.zid_product_id and digest == product.zid_payload_hash:
+        return outcome
+    async with semaphore:
+        try:
+            outcome.zid_id = await zid.push_product(
+                product, payload, priority=Priority.BACKGROUND
+            )
+            outcome.pushed = True
+        except Exception as exc:
+            outcome.error = str(exc)[:500]
+    return outcome
+
+
+async def _record_batch(session: AsyncSession, run: ZidSyncRun, outcomes: list[_Outcome]) -> None:
+    now = datetime.utcnow()
+    failures = list(run.failures or [])
+    for outcome in outcomes:
+        run.processed += 1
+        if outcome.error is not None:
+            run.failed += 1
+            if len(failures) < MAX_REPORTED_FAILURES:
+                failures.append({"product_id": outcome.product_id, "error": outcome.error})
+            continue
+        if outcome.pushed:
+            run.pushed += 1
+        else:
+            run.skipped += 1
+        # The version that was pushed, not the time it finished: an edit made while
+        # the batch was in flight has a later updated_at and stays stale.
+        await session.execute(
+            update(_products)
+            .where(_products.c.id == outcome.product_id)
+            .values(
+                zid_product_id=outcome.zid_id,
+                zid_payload_hash=outcome.digest,
+                last_synced_at=outcome.read_at,
+            )
+        )
+    run.failures = failures
+    run.checkpoint = max(outcome.product_id for outcome in outcomes)
+    run.updated_at = now
+    await session.commit()
+
+
+async def run_push(run_id: str) -> None:
+    """Push every stale product after the run's checkpoint, one batch at a time."""
+
+    semaphore = asyncio.Semaphore(settings.zid_sync_concurrency)
+    async with session_scope() as session:
+        run = await session.get(ZidSyncRun, run_id)
+        if run is None or run.status != ZidSyncStatus.RUNNING:
+            return
+        try:
+            while True:
+                result = await session.exec(
+                    select(Product)
+                    .where(stale_condition(), Product.id > run.checkpoint)
+                    .order_by(Product.id)
+                    .limit(settings.zid_sync_batch_size)
+                )
+                products = list(result.all())
+                if not products:
+                    break
+                outcomes = await asyncio.gather(
+                    *(_push_one(product, semaphore) for product in products)
+                )
+                await _record_batch(session, run, outcomes)
+                for product in products:
+                    session.expunge(product)
+            run.status = ZidSyncStatus.COMPLETED
+        except Exception as exc:
+            logger.exception("Zid catalog sync %s failed", run_id)
+            await session.rollback()
+            run = await session.get(ZidSyncRun, run_id)
+            run.status = ZidSyncStatus.FAILED
+            run.error = str(exc)[:500]
+        run.finished_at = datetime.utcnow()
+        await session.commit()
+        await audit.log_action(
+            session,
+            action="zid.catalog_sync",
+            user_id=run.created_by,
+            details={
+                "run_id": run.id,
+                "status": run.status.value,
+                "pushed": run.pushed,
+                "skipped": run.skipped,
+                "failed": run.failed,
+            },
+        )
+
+
+@jobs.handler("zid.catalog_sync")
+async def catalog_sync(payload: dict[str, Any]) -> None:
+    """Job handler: run (or continue) a catalog push."""
+
+    await run_push(payload["run_id"])
+
+
+async def mark_interrupted(session: AsyncSession) -> int:
+    """Flag ``running`` runs whose job is gone (dead or deleted) so they can be resumed."""
+
+    result = await session.execute(
+        update(_runs)
+        .where(_runs.c.status == ZidSyncStatus.RUNNING, ~jobs.is_active(_runs.c.job_id))
+        .values(status=ZidSyncStatus.INTERRUPTED, updated_at=datetime.utcnow())
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def _queue(session: AsyncSession, run: ZidSyncRun) -> ZidSyncRun:
+    """Commit ``run`` as running together with the job that executes it."""
+
+    try:
+        await session.flush()
+        job = jobs.enqueue(session, "zid.catalog_sync", {"run_id": run.id})
+        await session.flush()
+        run.job_id = job.id
+        await session.commit()
+    except IntegrityError as exc:
+        # The partial unique index on running runs: another worker got there first.
+        await session.rollback()
+        raise SyncError("A catalog sync is already running") from exc
+    await session.refresh(run)
+    jobs.worker.notify()
+    return run
+
+
+async def start_push(session: AsyncSession, user_id: int | None) -> ZidSyncRun:
+    await mark_interrupted(session)
+    run = ZidSyncRun(id=uuid4().hex, created_by=user_id)
+    session.add(run)
+    return await _queue(session, run)
+
+
+async def resume_push(session: AsyncSession, run: ZidSyncRun) -> ZidSyncRun:
+    """Continue a failed or interrupted run from its checkpoint."""
+
+    await mark_interrupted(session)
+    # Conditional, so two concurrent resumes cannot both queue the run.
+    statement = (
+        update(_runs)
+        .where(
+            _runs.c.id == run.id,
+            _runs.c.status.in_([ZidSyncStatus.FAILED, ZidSyncStatus.INTERRUPTED]),
+        )
+        .values(
+            status=ZidSyncStatus.RUNNING, error=None, finished_at=None, updated_at=datetime.utcnow()
+        )
+    )
+    try:
+        result = await session.execute(statement)
+    except IntegrityError as exc:
+        await session.rollback()
+        raise SyncError("A catalog sync is already running") from exc
+    if result.rowcount != 1:
+        await session.rollback()
+        await session.refresh(run)
+        raise SyncError(f"Run is {run.status.value} and cannot be resumed")
+    await session.refresh(run)
+    return await _queue(session, run)
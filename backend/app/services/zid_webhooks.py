@@ -0,0 +1,476 @@
+"""Inbound Zid webhooks.
+
+The receiver only verifies the signature and stores the raw event (duplicates are
+dropped by ``event_id``), so Zid gets its acknowledgement within milliseconds. The
+:class:`WebhookProcessor` then claims stored events in batches and applies them:
+order events reserve, confirm or release vouchers, and every product whose stock
+changed gets a ``zid.update_stock`` job so Zid shows the new quantity.
+
+Events about the same order are applied strictly in arrival order: an event is not
+claimed while an earlier one for its order is still pending, being processed by any
+worker, or waiting for a retry. Every order event carries the whole order, so once a
+newer event for the order has arrived an older one is skipped as superseded and only
+the latest state is applied.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Mapping
+
+from sqlalchemy import bindparam, exists, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+from ..db.session import engine, session_scope
+from ..models import (
+    Product,
+    ReservationStatus,
+    VoucherReservation,
+    ZidWebhookEvent,
+    ZidWebhookStatus,
+)
+from . import jobs
+from . import vouchers as voucher_service
+
+logger = logging.getLogger(__name__)
+
+# Zid order states that mean the codes must be delivered, or handed back.
+PAID_PAYMENT_STATUSES = {"paid"}
+FULFILLED_ORDER_STATUSES = {"preparing", "ready", "indelivery", "delivered", "completed"}
+CANCELLED_ORDER_STATUSES = {"cancelled", "canceled", "refunded", "reversed"}
+COUNTERS = (
+    "received",
+    "duplicates",
+    "rejected",
+    "processed",
+    "ignored",
+    "superseded",
+    "retried",
+    "failed",
+)
+# A claimed batch that is not settled within this time is picked up again.
+LEASE_SECONDS = 300
+# Failed events wait this long times their attempt count before the next try.
+RETRY_DELAY_SECONDS = 30
+
+_events = ZidWebhookEvent.__table__
+_UNSETTLED = (ZidWebhookStatus.RECEIVED, ZidWebhookStatus.PROCESSING)
+_OUTCOME_COUNTERS = {
+    ZidWebhookStatus.PROCESSED: "processed",
+    ZidWebhookStatus.IGNORED: "ignored",
+    ZidWebhookStatus.RECEIVED: "retried",
+    ZidWebhookStatus.FAILED: "failed",
+}
+
+
+class WebhookError(RuntimeError):
+    pass
+
+
+def verify_signature(body: bytes, signature: str | None) -> bool:
+    """Check an ``X-Zid-Signature`` header: hex HMAC-SHA256 of the raw body."""
+
+    if not settings.zid_webhook_secret or not signature:
+        return False
+    expected = hmac.new(
+        settings.zid_webhook_secret.encode("utf-8"), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256=").strip().lower())
+
+
+def event_identity(
+    body: bytes, payload: dict[str, Any], headers: Mapping[str, str]
+) -> tuple[str, str]:
+    """Return ``(event_id, event_type)``; the id falls back to a digest of the delivery."""
+
+    event_type = str(headers.get("x-zid-event") or payload.get("event") or "unknown")[:64]
+    event_id = headers.get("x-zid-event-id") or payload.get("event_id")
+    if not event_id:
+        # The body's own ``id`` is the order's, shared by every event about that order.
+        event_id = hashlib.sha256(event_type.encode("utf-8") + b"\n" + body).hexdigest()
+    return str(event_id)[:128], event_type
+
+
+def _order_of(payload: dict[str, Any]) -> dict[str, Any]:
+    for key in ("order", "data"):
+        if isinstance(payload.get(key), dict):
+            return payload[key]
+    return payload
+
+
+def order_key(event_type: str, payload: dict[str, Any]) -> str | None:
+    """Sequencing key of an order event; ``None`` for events that can run in any order."""
+
+    if not event_type.startswith("order."):
+        return None
+    order_id = _order_of(payload).get("id")
+    return None if order_id is None else _order_key_for(order_id)
+
+
+def _order_key_for(order_id: Any) -> str:
+    return f"order:{order_id}"[:64]
+
+
+async def record(
+    session: AsyncSession, *, event_id: str, event_type: str, payload: dict[str, Any]
+) -> bool:
+    """Store an event unless its id was seen before; returns ``False`` for duplicates."""
+
+    now = datetime.utcnow()
+    row = {
+        "event_id": event_id,
+        "event_type": event_type,
+        "order_key": order_key(event_type, payload),
+        "payload": payload,
+        "status": ZidWebhookStatus.RECEIVED,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        result = await session.execute(
+            dialect_insert(_events).values(row).on_conflict_do_nothing(index_elements=["event_id"])
+        )
+        stored = result.rowcount > 0
+    else:
+        existing = await session.execute(
+            select(_events.c.id).where(_events.c.event_id == event_id)
+        )
+        stored = existing.first() is None
+        if stored:
+            await session.execute(insert(_events).values(row))
+    await session.commit()
+    processor.count("received" if stored else "duplicates")
+    if stored:
+        processor.notify()
+    return stored
+
+
+def _state(value: Any) -> str:
+    if isinstance(value, dict):
+        value = value.get("code") or value.get("name")
+    return str(value or "").lower()
+
+
+async def _order_lines(session: AsyncSession, order: dict[str, Any]) -> dict[int, int]:
+    """Map the order's items onto local product ids (by Zid id, then SKU) and quantities."""
+
+    items = [item for item in order.get("products") or order.get("items") or [] if item]
+    zid_ids = {str(item["id"]) for item in items if item.get("id") is not None}
+    skus = {item["sku"] for item in items if item.get("sku")}
+    by_zid_id: dict[str, int] = {}
+    by_sku: dict[str, int] = {}
+    if zid_ids:
+        rows = await session.execute(
+            select(Product.id, Product.zid_product_id).where(Product.zid_product_id.in_(zid_ids))
+        )
+        by_zid_id = {zid_id: product_id for product_id, zid_id in rows.all()}
+    if skus:
+        rows = await session.execute(select(Product.id, Product.sku).where(Product.sku.in_(skus)))
+        by_sku = {sku: product_id for product_id, sku in rows.all()}
+
+    lines: dict[int, int] = {}
+    for item in items:
+        product_id = by_zid_id.get(str(item.get("id"))) or by_sku.get(item.get("sku"))
+        if product_id is None:
+            continue
+        lines[product_id] = lines.get(product_id, 0) + int(item.get("quantity") or 1)
+    return lines
+
+
+async def _was_cancelled(session: AsyncSession, order_id: Any) -> bool:
+    """Whether an already applied event for the order reported it cancelled."""
+
+    result = await session.execute(
+        select(_events.c.payload).where(
+            _events.c.order_key == _order_key_for(order_id),
+            _events.c.status == ZidWebhookStatus.PROCESSED,
+        )
+    )
+    return any(
+        _state(_order_of(payload).get("order_status") or _order_of(payload).get("status"))
+        in CANCELLED_ORDER_STATUSES
+        for payload in result.scalars()
+    )
+
+
+async def _handle_order(session: AsyncSession, payload: dict[str, Any]) -> set[int]:
+    """Reserve, confirm or release the order's codes; returns the products touched."""
+
+    order = _order_of(payload)
+    order_id = order.get("id")
+    if order_id is None:
+        raise WebhookError("Order event without an order id")
+    order_status = _state(order.get("order_status") or order.get("status"))
+    cancelled = order_status in CANCELLED_ORDER_STATUSES
+    paid = (
+        _state(order.get("payment_status")) in PAID_PAYMENT_STATUSES
+        or order_status in FULFILLED_ORDER_STATUSES
+    )
+    # A cancelled order never comes back, so an older event replayed late is a no-op.
+    if not cancelled and await _was_cancelled(session, order_id):
+        return set()
+    touched: set[int] = set()
+    now = datetime.utcnow()
+    for product_id, quantity in (await _order_lines(session, order)).items():
+        # Keyed per order and product, which makes redelivered or replayed events harmless.
+        reference = f"zid-order:{order_id}:{product_id}"
+        result = await session.execute(
+            select(VoucherReservation).where(VoucherReservation.reference == reference)
+        )
+        reservations = list(result.scalars())
+        active = [r for r in reservations if r.status == ReservationStatus.ACTIVE]
+        if cancelled:
+            for reservation in active:
+                await voucher_service.release_reservation(session, reservation.id)
+                touched.add(product_id)
+            continue
+        if any(r.status == ReservationStatus.CONFIRMED for r in reservations):
+            continue
+        holding = next((r for r in active if r.expires_at > now), None)
+        if holding is None:
+            allocation = await voucher_service.allocate(
+                session, product_id=product_id, quantity=quantity, reference=reference
+            )
+            holding = allocation.reservation
+            touched.add(product_id)
+        if paid:
+            await voucher_service.confirm_reservation(session, holding.id)
+            touched.add(product_id)
+    return touched
+
+
+EventHandler = Callable[[AsyncSession, dict[str, Any]], Awaitable[set[int]]]
+
+# Event type prefixes and their handlers; other events are stored and marked ignored.
+HANDLERS: dict[str, EventHandler] = {"order.": _handle_order}
+
+
+def _handler_for(event_type: str) -> EventHandler | None:
+    for prefix, event_handler in HANDLERS.items():
+        if event_type.startswith(prefix):
+            return event_handler
+    return None
+
+
+class WebhookProcessor:
+    """Claims stored events in batches and applies them in arrival order."""
+
+    def __init__(self, *, poll_interval: float, batch_size: int) -> None:
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._counts: Counter[str] = Counter()
+        self._last_lag: float | None = None
+        self._last_batch: datetime | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self._counts[name] += amount
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="zid-webhooks")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                # A short batch can still leave events that waited on an earlier one.
+                while await self.process_batch():
+                    pass
+            except Exception:  # pragma: no cover - keep polling
+                logger.exception("Zid webhook batch failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self) -> list[Any]:
+        now = datetime.utcnow()
+        # ``lease_until`` doubles as the retry time of a failed event.
+        due = _events.c.status.in_(_UNSETTLED) & or_(
+            _events.c.lease_until.is_(None), _events.c.lease_until < now
+        )
+        earlier = _events.alias("earlier")
+        # Only the oldest unsettled event of an order is ever claimable, so a second
+        # worker (or a later batch) cannot overtake it while it is leased or retrying.
+        blocked = exists().where(
+            earlier.c.order_key == _events.c.order_key,
+            earlier.c.id < _events.c.id,
+            earlier.c.status.in_(_UNSETTLED),
+        )
+        candidates = (
+            select(_events.c.id)
+            .where(due, ~blocked)
+            .order_by(_events.c.id)
+            .limit(self.batch_size)
+        )
+        if engine.dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                update(_events)
+                .where(_events.c.id.in_(candidates.scalar_subquery()), due)
+                .values(
+                    status=ZidWebhookStatus.PROCESSING,
+                    attempts=_events.c.attempts + 1,
+                    lease_until=now + timedelta(seconds=LEASE_SECONDS),
+                    updated_at=now,
+                )
+                .returning(
+                    _events.c.id,
+                    _events.c.event_type,
+                    _events.c.order_key,
+                    _events.c.payload,
+                    _events.c.attempts,
+                    _events.c.created_at,
+                )
+            )
+            # RETURNING order is unspecified; events must be applied as they arrived.
+            return sorted(result.all(), key=lambda row: row.id)
+
+    async def _latest_per_order(self, keys: set[str]) -> dict[str, int]:
+        if not keys:
+            return {}
+        async with session_scope() as session:
+            result = await session.execute(
+                select(_events.c.order_key, func.max(_events.c.id))
+                .where(_events.c.order_key.in_(keys))
+                .group_by(_events.c.order_key)
+            )
+            return {key: last_id for key, last_id in result.all()}
+
+    async def process_batch(self) -> int:
+        """Apply one batch of pending events; returns how many were claimed."""
+
+        events = await self._claim()
+        if not events:
+            return 0
+        latest = await self._latest_per_order({e.order_key for e in events if e.order_key})
+        outcomes: list[dict[str, Any]] = []
+        counters: list[str] = []
+        touched: set[int] = set()
+        for event in events:
+            outcome: dict[str, Any] = {
+                "b_id": event.id,
+                "status": ZidWebhookStatus.PROCESSED,
+                "error": None,
+                "retry_at": None,
+            }
+            event_handler = _handler_for(event.event_type)
+            if event_handler is None:
+                outcome["status"] = ZidWebhookStatus.IGNORED
+            elif event.order_key and latest.get(event.order_key, event.id) > event.id:
+                outcome["status"] = ZidWebhookStatus.IGNORED
+                outcome["error"] = "Superseded by a later event for this order"
+                counters.append("superseded")
+            else:
+                try:
+                    async with session_scope() as session:
+                        touched |= await event_handler(session, event.payload)
+                except Exception as exc:
+                    logger.warning("Zid webhook event %s failed: %s", event.id, exc)
+                    retry = event.attempts < settings.zid_webhook_max_attempts
+                    outcome["status"] = (
+                        ZidWebhookStatus.RECEIVED if retry else ZidWebhookStatus.FAILED
+                    )
+                    outcome["error"] = str(exc)[:1000]
+                    if retry:
+                        outcome["retry_at"] = datetime.utcnow() + timedelta(
+                            seconds=RETRY_DELAY_SECONDS * event.attempts
+                        )
+            if len(counters) == len(outcomes):
+                counters.append(_OUTCOME_COUNTERS[outcome["status"]])
+            outcomes.append(outcome)
+
+        now = datetime.utcnow()
+        for outcome in outcomes:
+            outcome["processed_at"] = None if outcome["retry_at"] else now
+        async with session_scope() as session:
+            await session.execute(
+                update(_events)
+                .where(_events.c.id == bindparam("b_id"))
+                .values(
+                    status=bindparam("status"),
+                    error=bindparam("error"),
+                    lease_until=bindparam("retry_at"),
+                    processed_at=bindparam("processed_at"),
+                    updated_at=now,
+                ),
+                outcomes,
+            )
+            for product_id in sorted(touched):
+                jobs.enqueue(session, "zid.update_stock", {"product_id": product_id})
+            await session.commit()
+        if touched:
+            jobs.worker.notify()
+
+        self._counts.update(counters)
+        self._last_lag = round((now - events[-1].created_at).total_seconds(), 3)
+        self._last_batch = now
+        return len(events)
+
+    async def metrics(self, session: AsyncSession) -> dict[str, Any]:
+        """Counters since startup plus the current backlog and its age."""
+
+        result = await session.execute(
+            select(func.count(), func.min(_events.c.created_at)).where(
+                _events.c.status.in_(_UNSETTLED)
+            )
+        )
+        backlog, oldest = result.one()
+        return {
+            "running": self.running,
+            "backlog": backlog,
+            "lag_seconds": (
+                round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0
+            ),
+            "last_batch_lag_seconds": self._last_lag,
+            "last_batch_at": self._last_batch.isoformat() if self._last_batch else None,
+            **{name: self._counts[name] for name in COUNTERS},
+        }
+
+
+processor = WebhookProcessor(
+    poll_interval=settings.zid_webhook_poll_interval,
+    batch_size=settings.zid_webhook_batch_size,
+)
+
+
+def parse_body(body: bytes) -> dict[str, Any]:
+    try:
+        payload = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise WebhookError("Webhook body is not valid JSON") from exc
+    if not isinstance(payload, dict):
+        raise WebhookError("Webhook body must be a JSON object")
+    return payload
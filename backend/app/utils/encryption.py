@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import hmac
 from typing import Final
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -15,6 +17,9 @@ def _get_fernet() -> Fernet:
 
 
 FERNET: Final[Fernet] = _get_fernet()
+_CODE_HASH_KEY: Final[bytes] = (
+    settings.voucher_code_hash_key or "voucher-code:" + settings.encryption_secret
+).encode("utf-8")
 
 
 def encrypt_value(value: str) -> str:
@@ -26,3 +31,9 @@ def decrypt_value(value_encrypted: str) -> str:
         return FERNET.decrypt(value_encrypted.encode("utf-8")).decode("utf-8")
     except InvalidToken as exc:  # pragma: no cover - indicates data tampering
         raise ValueError("Unable to decrypt value") from exc
+
+
+def hash_code(code: str) -> str:
+    """Keyed, fixed-width (64 hex chars) digest of a voucher code used for indexed lookups."""
+
+    return hmac.new(_CODE_HASH_KEY, code.encode("utf-8"), hashlib.sha256).hexdigest()
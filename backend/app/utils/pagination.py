@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+
+    raw = json.dumps({"t": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by :func:`encode_cursor`; raises ``ValueError`` if malformed."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data: dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), int(data["i"])
+    except (KeyError, TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
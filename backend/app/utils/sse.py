@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Sent on idle streams so proxies do not time the connection out.
+KEEPALIVE = ": keepalive\n\n"
+
+
+def format_event(event: str, data: dict[str, Any]) -> str:
+    """Encode one server-sent event with a JSON payload."""
+
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,54 @@
+"""Shared fixtures: each test gets a freshly migrated SQLite database."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+# The engine is created at import time, so point it at a scratch file before any app import.
+_SCRATCH = Path(tempfile.mkdtemp(prefix="twocards-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_SCRATCH / 'app.db'}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["AUDIT_ARCHIVE_DIR"] = str(_SCRATCH / "archive")
+
+import pytest  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine  # noqa: E402
+
+from app.db import migrations  # noqa: E402
+from app.db.session import engine, session_scope  # noqa: E402
+from app.models import Product  # noqa: E402
+from app.services import vouchers as voucher_service  # noqa: E402
+
+
+@pytest.fixture
+async def db() -> AsyncIterator[AsyncEngine]:
+    """The application engine on an empty database upgraded to the latest version."""
+
+    await engine.dispose()
+    Path(engine.url.database).unlink(missing_ok=True)
+    await migrations.upgrade(engine)
+    yield engine
+    # Pooled aiosqlite connections belong to this test's event loop.
+    await engine.dispose()
+
+
+@pytest.fixture
+def make_product(db: AsyncEngine) -> Callable[..., Awaitable[int]]:
+    """Factory creating a product with ``codes`` imported vouchers; returns its id."""
+
+    async def create(*, codes: int = 0, sku: str | None = None) -> int:
+        async with session_scope() as session:
+            product = Product(name_ar="بطاقة", sku=sku)
+            session.add(product)
+            await session.commit()
+            if codes:
+                await voucher_service.bulk_import(
+                    session,
+                    product_id=product.id,
+                    codes=[f"{sku or 'CODE'}-{index:04d}" for index in range(codes)],
+                )
+            return product.id
+
+    return create
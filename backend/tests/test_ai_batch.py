@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.session import session_scope
+from app.models import AIDescriptionRun, AIRunStatus, Product
+from app.services import ai, ai_batch
+from app.services.ai_cache import cache
+
+
+async def test_items_sharing_a_request_count_as_generated_not_cached(
+    db: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Unique names: the in-memory cache outlives each test's database.
+    stored, shared = f"stored-{uuid4().hex}", f"shared-{uuid4().hex}"
+    await cache.set(ai.description_cache_key(stored, None), ai.DESCRIPTION_MODEL, "من المخزن")
+    requests: list[str] = []
+
+    async def request_description(name_ar: str, hints: str | None) -> tuple[str, int]:
+        requests.append(name_ar)
+        await asyncio.sleep(0.05)
+        return f"وصف {name_ar}", 30
+
+    monkeypatch.setattr(ai, "request_description", request_description)
+    async with session_scope() as session:
+        session.add_all([Product(name_ar=name) for name in (stored, shared, shared, shared)])
+        run = AIDescriptionRun(id=uuid4().hex)
+        session.add(run)
+        await session.commit()
+
+    await ai_batch.run_batch(run.id)
+
+    async with session_scope() as session:
+        run = await session.get(AIDescriptionRun, run.id)
+    assert requests == [shared]
+    assert (run.status, run.succeeded, run.cached, run.tokens_used) == (
+        AIRunStatus.COMPLETED,
+        4,
+        1,
+        30,
+    )
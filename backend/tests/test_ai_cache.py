@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services import ai
+from app.services.ai_cache import CompletionCache, cache_key
+
+
+async def test_concurrent_misses_share_one_completion(db) -> None:
+    cache = CompletionCache(maxsize=16, ttl=60)
+    key = cache_key("model", "prompt")
+    calls = 0
+    release = asyncio.Event()
+
+    async def create() -> str:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "description"
+
+    waiters = [asyncio.create_task(cache.get_or_create(key, "model", create)) for _ in range(5)]
+    await asyncio.sleep(0.1)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["description"] * 5
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+    # Another process finds the stored completion in the shared table.
+    other = CompletionCache(maxsize=16, ttl=60)
+    assert await other.get_or_create(key, "model", create) == "description"
+    assert calls == 1
+    assert other.stats()["db_hits"] == 1
+
+
+async def test_failed_completion_reaches_every_waiter_and_is_not_cached(db) -> None:
+    cache = CompletionCache(maxsize=16, ttl=60)
+    key = cache_key("model", "failing prompt")
+    release = asyncio.Event()
+
+    async def create() -> str:
+        await release.wait()
+        raise RuntimeError("upstream failed")
+
+    waiters = [asyncio.create_task(cache.get_or_create(key, "model", create)) for _ in range(3)]
+    await asyncio.sleep(0.1)
+    release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [str(result) for result in results] == ["upstream failed"] * 3
+    assert await cache.get(key) is None
+
+
+async def test_expired_entries_are_purged(db) -> None:
+    stale = CompletionCache(maxsize=16, ttl=-1)
+    await stale.set(cache_key("model", "old"), "model", "old")
+    fresh = CompletionCache(maxsize=16, ttl=60)
+    await fresh.set(cache_key("model", "new"), "model", "new")
+
+    assert await fresh.purge() == 1
+    assert await CompletionCache(maxsize=16, ttl=60).get(cache_key("model", "new")) == "new"
+
+
+def test_description_key_covers_every_request_parameter(monkeypatch: pytest.MonkeyPatch) -> None:
+    key = ai.description_cache_key("بطاقة", None)
+    assert ai.description_cache_key("بطاقة", "") == key
+    assert ai.description_cache_key("بطاقة", "للألعاب") != key
+
+    monkeypatch.setattr(ai, "DESCRIPTION_MAX_COMPLETION_TOKENS", 800)
+    assert ai.description_cache_key("بطاقة", None) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(ai, "DESCRIPTION_SYSTEM_PROMPT", "prompt")
+    assert ai.description_cache_key("بطاقة", None) != key
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import session_scope
+from app.models import AuditLog, AuditLogRollup
+from app.services import audit_retention
+
+
+async def test_concurrent_runs_archive_and_count_each_row_once(db, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "audit_retention_policies", {"*": 30})
+    monkeypatch.setattr(settings, "audit_retention_batch_size", 25)
+    old = datetime.utcnow() - timedelta(days=90)
+    async with session_scope() as session:
+        for index in range(200):
+            user_id = None if index % 2 else 1
+            session.add(AuditLog(action="chat.message", user_id=user_id, created_at=old))
+        await session.commit()
+
+    reports = await asyncio.gather(
+        audit_retention.apply_retention(), audit_retention.apply_retention()
+    )
+
+    assert sum(report[0]["purged"] for report in reports) == 200
+    async with session_scope() as session:
+        rollups = (await session.exec(select(AuditLogRollup))).all()
+        remaining = (await session.exec(select(AuditLog))).all()
+    assert sorted((rollup.user_id or 0, rollup.count) for rollup in rollups) == [(0, 100), (1, 100)]
+    assert remaining == []
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.db.session import session_scope
+from app.models import ProductInventory, Voucher
+from app.services import inventory
+from app.services import vouchers as voucher_service
+
+
+async def _counters(product_id: int) -> dict[str, int]:
+    async with session_scope() as session:
+        row = await session.get(ProductInventory, product_id)
+        return {name: getattr(row, name) for name in ("available", "reserved", "redeemed")}
+
+
+async def test_lapsed_hold_counts_as_reserved_until_swept(make_product) -> None:
+    product_id = await make_product(codes=4)
+    async with session_scope() as session:
+        await voucher_service.allocate(session, product_id=product_id, quantity=3, ttl_seconds=1)
+    await asyncio.sleep(1.1)
+
+    async def listed(status: str) -> int:
+        async with session_scope() as session:
+            result = await session.execute(
+                select(func.count())
+                .select_from(Voucher)
+                .where(
+                    Voucher.product_id == product_id,
+                    voucher_service.status_condition(status),
+                )
+            )
+            return result.scalar_one()
+
+    assert await _counters(product_id) == {"available": 1, "reserved": 3, "redeemed": 0}
+    assert (await listed("available"), await listed("reserved")) == (1, 3)
+
+    async with session_scope() as session:
+        assert await voucher_service.expire_reservations(session) == 3
+    assert await _counters(product_id) == {"available": 4, "reserved": 0, "redeemed": 0}
+    assert (await listed("available"), await listed("reserved")) == (4, 0)
+
+
+async def test_recount_rebuilds_drifted_counters(make_product) -> None:
+    product_id = await make_product(codes=5)
+    async with session_scope() as session:
+        await voucher_service.allocate(session, product_id=product_id, quantity=2)
+        await inventory.adjust(session, product_id, available=7, redeemed=1)
+        await session.commit()
+
+        assert await inventory.recount(session, product_id) == 1
+
+    assert await _counters(product_id) == {"available": 3, "reserved": 2, "redeemed": 0}
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.db.session import session_scope
+from app.models import Job, JobStatus
+from app.services import jobs
+
+_JOB_TYPE = "tests.noop"
+
+
+@jobs.handler(_JOB_TYPE)
+async def _noop(payload: dict) -> None:
+    return None
+
+
+async def _enqueue() -> int:
+    async with session_scope() as session:
+        job = jobs.enqueue(session, _JOB_TYPE, {})
+        await session.commit()
+        return job.id
+
+
+async def _job(job_id: int) -> Job:
+    async with session_scope() as session:
+        return await session.get(Job, job_id)
+
+
+async def test_a_job_is_leased_to_one_worker_at_a_time(db) -> None:
+    first = jobs.JobWorker(poll_interval=1, lease_seconds=60)
+    second = jobs.JobWorker(poll_interval=1, lease_seconds=60)
+    job_id = await _enqueue()
+
+    claimed = await first._claim(_JOB_TYPE, 5)
+    assert [job.id for job in claimed] == [job_id]
+    assert await second._claim(_JOB_TYPE, 5) == []
+
+    job = await _job(job_id)
+    assert (job.status, job.locked_by, job.attempts) == (JobStatus.RUNNING, first.worker_id, 1)
+
+
+async def test_an_expired_lease_moves_the_job_to_another_worker(db) -> None:
+    first = jobs.JobWorker(poll_interval=1, lease_seconds=60)
+    second = jobs.JobWorker(poll_interval=1, lease_seconds=60)
+    job_id = await _enqueue()
+    await first._claim(_JOB_TYPE, 1)
+
+    # The first worker stopped renewing its lease, e.g. because its process died.
+    async with session_scope() as session:
+        await session.execute(
+            update(Job.__table__)
+            .where(Job.__table__.c.id == job_id)
+            .values(lease_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await session.commit()
+    assert [job.id for job in await second._claim(_JOB_TYPE, 1)] == [job_id]
+
+    # A late result from the first worker must not settle the job it no longer owns.
+    await first._finish(job_id, {"status": JobStatus.SUCCEEDED})
+    job = await _job(job_id)
+    assert (job.status, job.locked_by, job.attempts) == (JobStatus.RUNNING, second.worker_id, 2)
+
+    await second._finish(job_id, {"status": JobStatus.SUCCEEDED})
+    assert (await _job(job_id)).status == JobStatus.SUCCEEDED
+
+
+async def test_a_dead_job_is_requeued_by_one_retry_only(db) -> None:
+    job_id = await _enqueue()
+    async with session_scope() as session:
+        with pytest.raises(jobs.JobError):
+            await jobs.retry(session, await session.get(Job, job_id))
+        await session.execute(
+            update(Job.__table__)
+            .where(Job.__table__.c.id == job_id)
+            .values(status=JobStatus.DEAD, attempts=5, finished_at=datetime.utcnow())
+        )
+        await session.commit()
+
+    async with session_scope() as first, session_scope() as second:
+        # Both admins opened the dead job before either retried it.
+        mine, theirs = await first.get(Job, job_id), await second.get(Job, job_id)
+        retried = await jobs.retry(first, mine)
+        with pytest.raises(jobs.JobError):
+            await jobs.retry(second, theirs)
+
+    assert (retried.status, retried.attempts, retried.finished_at) == (JobStatus.PENDING, 0, None)
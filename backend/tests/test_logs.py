@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.session import session_scope
+from app.models import AuditLog, User
+from app.routers import logs
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+async def _seed(entries: list[tuple[str, datetime]]) -> None:
+    async with session_scope() as session:
+        for action, created_at in entries:
+            session.add(AuditLog(action=action, created_at=created_at, updated_at=created_at))
+        await session.commit()
+
+
+async def _export(**params) -> tuple[str, bytes]:
+    query = {
+        "fmt": "ndjson",
+        "gzip": False,
+        "user_id": None,
+        "action": None,
+        "since": None,
+        # Leaves out the ``logs.export`` entry the endpoint itself records.
+        "until": START + timedelta(days=1),
+    }
+    query.update(params)
+    async with session_scope() as session:
+        admin = User(username="admin")
+        response = await logs.export_logs(**query, session=session, current_user=admin)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return response.headers["content-disposition"], body
+
+
+async def _page(**params) -> logs.AuditLogPage:
+    query = {
+        "user_id": None,
+        "action": None,
+        "since": None,
+        "cursor": None,
+        "limit": 50,
+        "include_total": False,
+    }
+    query.update(params)
+    async with session_scope() as session:
+        return await logs.list_logs(**query, session=session, _=User(username="viewer"))
+
+
+async def test_cursor_pages_cover_every_row_once_in_order(db: AsyncEngine) -> None:
+    # Several rows share a timestamp so the id tie-breaker decides their order.
+    await _seed([(f"a{index}", START + timedelta(seconds=index // 3)) for index in range(11)])
+
+    seen: list[tuple[datetime, int]] = []
+    cursor = None
+    pages = 0
+    while True:
+        page = await _page(cursor=cursor, limit=4)
+        seen.extend((item.created_at, item.id) for item in page.items)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 11
+    assert seen == sorted(seen, reverse=True)
+
+
+async def test_cursor_keeps_its_position_when_newer_rows_arrive(db: AsyncEngine) -> None:
+    await _seed([(f"a{index}", START + timedelta(seconds=index)) for index in range(6)])
+    first = await _page(limit=3)
+    await _seed([("newer", START + timedelta(hours=1))])
+
+    second = await _page(cursor=first.next_cursor, limit=3)
+
+    assert [item.action for item in first.items] == ["a5", "a4", "a3"]
+    assert [item.action for item in second.items] == ["a2", "a1", "a0"]
+    assert second.next_cursor is None
+
+
+async def test_filters_and_capped_total(db: AsyncEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    await _seed([("login" if index % 2 else "logout", START) for index in range(7)])
+    monkeypatch.setattr(logs, "COUNT_CAP", 3)
+
+    filtered = await _page(action="login", include_total=True)
+    everything = await _page(limit=2, include_total=True)
+
+    assert {item.action for item in filtered.items} == {"login"}
+    assert (filtered.total, filtered.total_is_estimate) == (3, False)
+    assert (everything.total, everything.total_is_estimate) == (3, True)
+
+
+async def test_malformed_cursor_is_rejected(db: AsyncEngine) -> None:
+    with pytest.raises(HTTPException) as error:
+        await _page(cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+
+async def test_ndjson_export_streams_every_row_in_batches(
+    db: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await _seed([(f"a{index}", START + timedelta(seconds=index)) for index in range(7)])
+    monkeypatch.setattr(logs, "EXPORT_BATCH_SIZE", 3)
+
+    disposition, body = await _export()
+
+    rows = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert disposition == 'attachment; filename="audit-logs.ndjson"'
+    assert [row["action"] for row in rows] == [f"a{index}" for index in range(7)]
+    assert set(rows[0]) == set(logs.EXPORT_COLUMNS)
+
+
+async def test_gzipped_csv_export_has_a_header_and_honours_filters(db: AsyncEngine) -> None:
+    await _seed([("login" if index % 2 else "logout", START) for index in range(5)])
+
+    disposition, body = await _export(fmt="csv", gzip=True, action="login")
+
+    reader = csv.reader(io.StringIO(gzip.decompress(body).decode("utf-8")))
+    header, *rows = list(reader)
+    assert disposition == 'attachment; filename="audit-logs.csv.gz"'
+    assert tuple(header) == logs.EXPORT_COLUMNS
+    assert [row[2] for row in rows] == ["login", "login"]
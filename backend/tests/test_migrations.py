@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+import app.models  # noqa: F401  (registers every table on SQLModel.metadata)
+from app.db import migrations
+from app.utils.encryption import hash_code
+
+pytestmark = pytest.mark.filterwarnings("ignore:Skipped unsupported reflection")
+
+
+def _schema(path: Path) -> dict[str, tuple]:
+    """Columns, indexes and foreign keys of every application table."""
+
+    inspector = inspect(create_engine(f"sqlite:///{path}"))
+    schema = {}
+    for table in inspector.get_table_names():
+        if table == "schema_migrations":
+            continue
+        schema[table] = (
+            {column["name"]: str(column["type"]) for column in inspector.get_columns(table)},
+            {
+                index["name"]: (tuple(index["column_names"]), bool(index["unique"]))
+                for index in inspector.get_indexes(table)
+            },
+            sorted(
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspector.get_foreign_keys(table)
+            ),
+        )
+    return schema
+
+
+def _expression_indexes(path: Path) -> set[tuple[str, str]]:
+    with create_engine(f"sqlite:///{path}").connect() as conn:
+        rows = conn.execute(
+            text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+        )
+        return {(name, " ".join(sql.split())) for name, sql in rows}
+
+
+async def _upgrade(path: Path, target: int | None = None) -> list[int]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        return await migrations.upgrade(engine, target)
+    finally:
+        await engine.dispose()
+
+
+def _models_schema(path: Path) -> Path:
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    return path
+
+
+async def test_fresh_database_matches_models(tmp_path: Path) -> None:
+    fresh = tmp_path / "fresh.db"
+    assert await _upgrade(fresh) == [step.version for step in migrations.MIGRATIONS]
+    models = _models_schema(tmp_path / "models.db")
+
+    assert _schema(fresh) == _schema(models)
+    assert _expression_indexes(fresh) == _expression_indexes(models)
+    assert await _upgrade(fresh) == []
+
+
+async def test_baseline_database_upgrades_to_head(tmp_path: Path) -> None:
+    # A database created by the pre-migration ``create_all``: baseline tables, no versions.
+    baseline = tmp_path / "baseline.db"
+    await _upgrade(baseline, target=1)
+    now = datetime.utcnow()
+    with create_engine(f"sqlite:///{baseline}").begin() as conn:
+        conn.execute(text("DROP TABLE schema_migrations"))
+        conn.execute(
+            text(
+                "INSERT INTO products (id, name_ar, price, currency, is_active, created_at,"
+                " updated_at) VALUES (1, 'p', 10, 'SAR', 1, :now, :now)"
+            ),
+            {"now": now},
+        )
+        for code, redeemed in (("CODE-0001", 0), ("CODE-0002", 0), ("CODE-0003", 1)):
+            conn.execute(
+                text(
+                    "INSERT INTO vouchers (product_id, code, is_redeemed, created_at, updated_at)"
+                    " VALUES (1, :code, :redeemed, :now, :now)"
+                ),
+                {"code": code, "redeemed": redeemed, "now": now},
+            )
+
+    assert await _upgrade(baseline) == [step.version for step in migrations.MIGRATIONS]
+    models = _models_schema(tmp_path / "models.db")
+    assert _schema(baseline) == _schema(models)
+    assert _expression_indexes(baseline) == _expression_indexes(models)
+
+    with create_engine(f"sqlite:///{baseline}").connect() as conn:
+        counters = conn.execute(
+            text("SELECT available, reserved, redeemed, locked FROM product_inventory")
+        ).all()
+        hashes = dict(conn.execute(text("SELECT code, code_hash FROM vouchers")).all())
+        admins = conn.execute(text("SELECT count(*) FROM users WHERE username = 'admin'")).scalar()
+    assert counters == [(2, 0, 1, 0)]
+    assert hashes == {code: hash_code(code) for code in hashes}
+    assert admins == 1
+
+
+async def test_upgrade_that_lost_the_race_rechecks_the_version(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    database = tmp_path / "race.db"
+    await _upgrade(database)
+
+    def _stale_upgrade(conn, target):
+        # What a second worker does when it read the versions before the first one committed.
+        step = migrations.MIGRATIONS[-1]
+        conn.execute(
+            migrations.schema_migrations.insert().values(
+                version=step.version, description=step.description, applied_at=datetime.utcnow()
+            )
+        )
+        return [step.version]
+
+    monkeypatch.setattr(migrations, "_upgrade", _stale_upgrade)
+    assert await _upgrade(database) == []
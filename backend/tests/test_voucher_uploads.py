@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import pytest
+from sqlmodel import func, select
+
+from app.core.config import settings
+from app.db.session import session_scope
+from app.models import Voucher, VoucherUpload, VoucherUploadStatus
+from app.services import voucher_uploads
+
+CSV = "\n".join(
+    ["code", "NEW-1", "NEW-2", "NEW-1", "has space", "", "OLD-0000", "NEW-3", "NEW-2"]
+).encode("utf-8")
+
+
+@pytest.fixture
+def staged(
+    make_product: Callable[..., Awaitable[int]], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Callable[[], Awaitable[str]]:
+    """Factory staging ``CSV`` for a product that already holds ``OLD-0000``."""
+
+    monkeypatch.setattr(settings, "voucher_upload_dir", str(tmp_path))
+
+    async def create() -> str:
+        product_id = await make_product(codes=1, sku="OLD")
+        async with session_scope() as session:
+            upload = VoucherUpload(id=uuid4().hex, product_id=product_id, filename="codes.csv")
+            session.add(upload)
+            await session.commit()
+            await voucher_uploads.stage_upload(session, upload, io.BytesIO(CSV), "csv")
+            return upload.id
+
+    return create
+
+
+async def _load(session, upload_id: str) -> VoucherUpload:
+    result = await session.exec(select(VoucherUpload).where(VoucherUpload.id == upload_id))
+    return result.one()
+
+
+async def _voucher_count() -> int:
+    async with session_scope() as session:
+        return (await session.exec(select(func.count()).select_from(Voucher))).one()
+
+
+async def test_staging_reports_invalid_duplicate_and_existing_codes(staged) -> None:
+    upload_id = await staged()
+
+    async with session_scope() as session:
+        upload = await _load(session, upload_id)
+
+    assert upload.status == VoucherUploadStatus.STAGED
+    assert (upload.rows_processed, upload.valid, upload.invalid) == (7, 3, 1)
+    assert (upload.duplicates_in_file, upload.existing) == (2, 1)
+    assert Path(upload.staged_path).read_text().split() == ["NEW-1", "NEW-2", "NEW-3"]
+    assert await _voucher_count() == 1
+
+
+async def test_commit_imports_staged_codes_once(staged) -> None:
+    upload_id = await staged()
+
+    async with session_scope() as session:
+        upload = await _load(session, upload_id)
+        staged_path = Path(upload.staged_path)
+        result = await voucher_uploads.commit_upload(session, upload)
+        with pytest.raises(voucher_uploads.UploadError):
+            await voucher_uploads.commit_upload(session, await _load(session, upload_id))
+
+    assert (result.inserted, result.duplicates) == (3, 0)
+    assert await _voucher_count() == 4
+    assert not staged_path.exists()
+    async with session_scope() as session:
+        upload = await _load(session, upload_id)
+    assert (upload.status, upload.inserted, upload.staged_path) == (
+        VoucherUploadStatus.COMMITTED,
+        3,
+        None,
+    )
+
+
+async def test_commit_loses_to_a_discard_that_claimed_the_upload_first(staged) -> None:
+    upload_id = await staged()
+
+    async with session_scope() as committer, session_scope() as discarder:
+        # Both requests loaded the upload while it was still staged.
+        stale = await _load(committer, upload_id)
+        await voucher_uploads.discard_upload(discarder, await _load(discarder, upload_id))
+
+        with pytest.raises(voucher_uploads.UploadError):
+            await voucher_uploads.commit_upload(committer, stale)
+
+    assert await _voucher_count() == 1
+    async with session_scope() as session:
+        assert (await _load(session, upload_id)).status == VoucherUploadStatus.DISCARDED
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.db.session import session_scope
+from app.models import ProductInventory, ReservationStatus, VoucherReservation
+from app.services import vouchers as voucher_service
+from app.services.vouchers import InsufficientStockError, ReservationError
+
+
+async def _counters(product_id: int) -> dict[str, int]:
+    async with session_scope() as session:
+        row = await session.get(ProductInventory, product_id)
+        return {name: getattr(row, name) for name in ("available", "reserved", "redeemed")}
+
+
+async def test_concurrent_allocations_never_share_or_oversell_codes(make_product) -> None:
+    product_id = await make_product(codes=10)
+
+    async def reserve() -> list[str] | None:
+        async with session_scope() as session:
+            try:
+                allocation = await voucher_service.allocate(
+                    session, product_id=product_id, quantity=3
+                )
+            except InsufficientStockError:
+                return None
+            return allocation.codes
+
+    results = await asyncio.gather(*(reserve() for _ in range(5)))
+
+    granted = [codes for codes in results if codes is not None]
+    assert len(granted) == 3
+    assert all(len(codes) == 3 for codes in granted)
+    assert len({code for codes in granted for code in codes}) == 9
+    assert await _counters(product_id) == {"available": 1, "reserved": 9, "redeemed": 0}
+
+
+async def test_concurrent_confirm_and_release_settle_once(make_product) -> None:
+    product_id = await make_product(codes=3)
+    async with session_scope() as session:
+        allocation = await voucher_service.allocate(session, product_id=product_id, quantity=2)
+    reservation_id = allocation.reservation.id
+
+    async def settle(action) -> str:
+        async with session_scope() as session:
+            try:
+                await action(session, reservation_id)
+            except ReservationError:
+                return "rejected"
+            return action.__name__
+
+    outcomes = await asyncio.gather(
+        settle(voucher_service.confirm_reservation), settle(voucher_service.release_reservation)
+    )
+
+    assert outcomes.count("rejected") == 1
+    async with session_scope() as session:
+        reservation = await session.get(VoucherReservation, reservation_id)
+    if "confirm_reservation" in outcomes:
+        assert reservation.status == ReservationStatus.CONFIRMED
+        assert await _counters(product_id) == {"available": 1, "reserved": 0, "redeemed": 2}
+    else:
+        assert reservation.status == ReservationStatus.RELEASED
+        assert await _counters(product_id) == {"available": 3, "reserved": 0, "redeemed": 0}
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import session_scope
+from app.models import Product, ZidPullCursor
+from app.services import zid, zid_pull
+
+
+@pytest.fixture
+def catalog(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Serve ``catalog["items"]`` in pages of two and record each ``updated_since``."""
+
+    state: dict = {"items": [], "since": []}
+    monkeypatch.setattr(settings, "zid_pull_page_size", 2)
+
+    async def fetch_products(*, page: int, page_size: int, updated_since=None):
+        if page == 1:
+            state["since"].append(updated_since)
+        items = state["items"][(page - 1) * page_size : page * page_size]
+        return items, page * page_size < len(state["items"])
+
+    monkeypatch.setattr(zid, "fetch_products", fetch_products)
+    return state
+
+
+def _item(zid_id: int, sku: str | None, name: str, stamp: str = "2024-05-01T10:00:00Z") -> dict:
+    return {"id": zid_id, "sku": sku, "name": name, "price": 15, "updated_at": stamp}
+
+
+async def _by_sku() -> dict[str, Product]:
+    async with session_scope() as session:
+        result = await session.exec(select(Product))
+        return {product.sku: product for product in result.all()}
+
+
+async def test_pull_creates_links_updates_and_keeps_local_edits(
+    db: AsyncEngine, catalog: dict
+) -> None:
+    synced = datetime.utcnow() - timedelta(hours=1)
+    async with session_scope() as session:
+        session.add_all(
+            [
+                Product(name_ar="محلي", sku="LOCAL"),
+                Product(
+                    name_ar="قديم",
+                    sku="SYNCED",
+                    zid_product_id="2",
+                    updated_at=synced,
+                    last_synced_at=synced,
+                ),
+                Product(
+                    name_ar="معدل هنا",
+                    sku="EDITED",
+                    zid_product_id="3",
+                    updated_at=datetime.utcnow(),
+                    last_synced_at=synced,
+                ),
+                Product(name_ar="آخر", sku="TAKEN", zid_product_id="99"),
+            ]
+        )
+        await session.commit()
+    catalog["items"] = [
+        _item(1, "LOCAL", "من زد"),
+        _item(2, "SYNCED", "جديد من زد", "2024-05-02T10:00:00Z"),
+        _item(3, "EDITED", "من زد"),
+        _item(4, "TAKEN", "تعارض"),
+        _item(5, "FRESH", "منتج جديد"),
+    ]
+
+    report = await zid_pull.pull_catalog()
+
+    assert {key: report[key] for key in ("pages", "items", "created", "updated")} == {
+        "pages": 3,
+        "items": 5,
+        "created": 1,
+        "updated": 1,
+    }
+    assert (report["linked"], report["kept_local"], report["conflicts"]) == (1, 1, 1)
+    assert report["conflict_items"][0]["zid_product_id"] == "4"
+    products = await _by_sku()
+    assert (products["LOCAL"].zid_product_id, products["LOCAL"].name_ar) == ("1", "محلي")
+    assert products["SYNCED"].name_ar == "جديد من زد"
+    assert products["EDITED"].name_ar == "معدل هنا"
+    assert products["TAKEN"].zid_product_id == "99"
+    assert products["FRESH"].zid_product_id == "5"
+    # Pulled rows are in sync, so the push job would not send them back.
+    fresh = products["FRESH"]
+    assert fresh.last_synced_at == fresh.updated_at
+    assert fresh.zid_payload_hash == zid.payload_hash(zid.to_zid_product_payload(fresh))
+
+    catalog["items"] = []
+    await zid_pull.pull_catalog()
+    assert catalog["since"] == [None, datetime(2024, 5, 2, 10, 0)]
+    async with session_scope() as session:
+        cursor = await session.get(ZidPullCursor, zid_pull.store_key())
+    assert cursor.updated_since == datetime(2024, 5, 2, 10, 0)
+
+
+async def test_item_listed_twice_is_applied_once(db: AsyncEngine, catalog: dict) -> None:
+    catalog["items"] = [_item(7, "TWICE", "أول"), _item(7, "TWICE", "ثان")]
+
+    report = await zid_pull.pull_catalog()
+
+    assert (report["created"], report["conflicts"]) == (1, 0)
+    assert (await _by_sku())["TWICE"].name_ar == "ثان"
+
+
+async def test_insert_without_on_conflict_support_checks_first(db: AsyncEngine) -> None:
+    now = datetime.utcnow()
+    async with session_scope() as session:
+        session.get_bind = lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql"))
+        row = zid.from_zid_product(_item(8, "OTHER-DB", "منتج"))
+
+        inserted = await zid_pull._insert(session, row, now)
+        again = await zid_pull._insert(session, {**row, "zid_product_id": "9"}, now)
+        await session.commit()
+
+    assert inserted is not None
+    assert again is None
+    assert (await _by_sku())["OTHER-DB"].id == inserted
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.zid_scheduler import Priority, ZidScheduler
+
+REQUEST = httpx.Request("GET", "https://api.zid.sa/v1/products")
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "zid_max_retries", 3)
+    monkeypatch.setattr(settings, "zid_backoff_base", 0.001)
+    monkeypatch.setattr(settings, "zid_backoff_max", 0.004)
+
+
+def _replay(*outcomes):
+    """A call returning (or raising) ``outcomes`` in order, recording each attempt."""
+
+    attempts: list[float] = []
+    queue = list(outcomes)
+
+    async def call() -> httpx.Response:
+        attempts.append(time.monotonic())
+        outcome = queue.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return httpx.Response(status, headers=headers, request=REQUEST)
+
+    return call, attempts
+
+
+async def test_throttled_call_waits_for_retry_after() -> None:
+    scheduler = ZidScheduler()
+    call, attempts = _replay((429, {"Retry-After": "0.2"}), 200)
+
+    response = await scheduler.send(call)
+
+    assert response.status_code == 200
+    assert attempts[1] - attempts[0] >= 0.19
+    assert scheduler.stats()["throttled"] == 1
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_backoff_grows_with_jitter_up_to_the_cap() -> None:
+    scheduler = ZidScheduler()
+
+    for attempt, ceiling in ((0, 0.001), (1, 0.002), (2, 0.004), (6, 0.004)):
+        delays = [scheduler._backoff(attempt) for _ in range(20)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+async def test_idempotent_calls_retry_server_and_read_errors(method: str) -> None:
+    scheduler = ZidScheduler()
+    call, attempts = _replay(503, httpx.ReadTimeout("slow"), 200)
+
+    response = await scheduler.send(call, method=method)
+
+    assert response.status_code == 200
+    assert len(attempts) == 3
+
+
+async def test_retries_stop_after_the_configured_attempts() -> None:
+    scheduler = ZidScheduler()
+    call, attempts = _replay(*[502] * 5)
+
+    response = await scheduler.send(call)
+
+    assert response.status_code == 502
+    assert len(attempts) == settings.zid_max_retries + 1
+
+
+@pytest.mark.parametrize(
+    "outcome", [500, httpx.ReadTimeout("slow"), httpx.RemoteProtocolError("dropped")]
+)
+async def test_post_is_not_resent_once_it_may_have_reached_zid(outcome) -> None:
+    scheduler = ZidScheduler()
+    call, attempts = _replay(outcome, 201)
+
+    if isinstance(outcome, Exception):
+        with pytest.raises(type(outcome)):
+            await scheduler.send(call, method="POST")
+    else:
+        assert (await scheduler.send(call, method="POST")).status_code == outcome
+    assert len(attempts) == 1
+
+
+@pytest.mark.parametrize(
+    "outcome", [(429, {"Retry-After": "0"}), httpx.ConnectError("refused"), httpx.PoolTimeout("")]
+)
+async def test_post_is_resent_when_zid_cannot_have_acted(outcome) -> None:
+    scheduler = ZidScheduler()
+    call, attempts = _replay(outcome, 201)
+
+    response = await scheduler.send(call, method="POST")
+
+    assert response.status_code == 201
+    assert len(attempts) == 2
+
+
+async def test_interactive_calls_overtake_queued_background_calls() -> None:
+    scheduler = ZidScheduler()
+    scheduler.bucket.capacity, scheduler.bucket.window = 1, 0.1
+    scheduler.bucket.tokens = 0.0
+    order: list[str] = []
+
+    def tagged(name: str):
+        async def call() -> httpx.Response:
+            order.append(name)
+            return httpx.Response(200, request=REQUEST)
+
+        return call
+
+    background = asyncio.create_task(scheduler.send(tagged("background"), Priority.BACKGROUND))
+    await asyncio.sleep(0.01)
+    assert scheduler.stats()["queued"] == {"interactive": 0, "background": 1}
+    await scheduler.send(tagged("interactive"), Priority.INTERACTIVE)
+    await background
+
+    assert order == ["interactive", "background"]
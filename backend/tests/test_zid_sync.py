@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.session import session_scope
+from app.models import Product, ZidSyncRun, ZidSyncStatus
+from app.services import zid, zid_sync
+
+
+@pytest.fixture
+def pushes(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record the SKUs pushed to Zid; products with a ``FAIL`` SKU are rejected."""
+
+    pushed: list[str] = []
+
+    async def push_product(product, payload, *, priority) -> str:
+        if product.sku.startswith("FAIL"):
+            raise zid.ZidError("rejected")
+        pushed.append(product.sku)
+        return product.zid_product_id or f"zid-{product.sku}"
+
+    monkeypatch.setattr(zid, "push_product", push_product)
+    monkeypatch.setattr(settings, "zid_sync_batch_size", 2)
+    return pushed
+
+
+async def _run() -> ZidSyncRun:
+    async with session_scope() as session:
+        run = ZidSyncRun(id=uuid4().hex)
+        session.add(run)
+        await session.commit()
+    await zid_sync.run_push(run.id)
+    async with session_scope() as session:
+        return await session.get(ZidSyncRun, run.id)
+
+
+async def test_only_changed_payloads_of_stale_products_are_pushed(
+    db: AsyncEngine, pushes: list[str]
+) -> None:
+    synced_at = datetime.utcnow() - timedelta(hours=1)
+    async with session_scope() as session:
+        unchanged = Product(name_ar="كما هي", sku="SAME", price=10.0, zid_product_id="zid-SAME")
+        unchanged.zid_payload_hash = zid.payload_hash(zid.to_zid_product_payload(unchanged))
+        # Touched after its last sync but with the same payload: stale, yet not resent.
+        unchanged.last_synced_at = synced_at
+        current = Product(name_ar="محدثة", sku="CURRENT", zid_product_id="zid-CURRENT")
+        current.last_synced_at = datetime.utcnow() + timedelta(hours=1)
+        edited = Product(name_ar="معدلة", sku="EDITED", zid_product_id="zid-EDITED")
+        edited.zid_payload_hash, edited.last_synced_at = "old-digest", synced_at
+        session.add_all(
+            [Product(name_ar="جديدة", sku="NEW"), unchanged, current, edited]
+            + [Product(name_ar="مرفوضة", sku="FAIL-1")]
+        )
+        await session.commit()
+
+    run = await _run()
+
+    assert sorted(pushes) == ["EDITED", "NEW"]
+    assert (run.status, run.processed, run.pushed, run.skipped, run.failed) == (
+        ZidSyncStatus.COMPLETED,
+        4,
+        2,
+        1,
+        1,
+    )
+    assert [failure["error"] for failure in run.failures] == ["rejected"]
+
+    pushes.clear()
+    again = await _run()
+    assert pushes == []
+    assert (again.pushed, again.skipped, again.failed) == (0, 0, 1)
+
+
+async def test_resumed_run_continues_after_its_checkpoint(
+    db: AsyncEngine, pushes: list[str]
+) -> None:
+    async with session_scope() as session:
+        products = [Product(name_ar="منتج", sku=f"P{index}") for index in range(4)]
+        session.add_all(products)
+        await session.commit()
+        run = ZidSyncRun(id=uuid4().hex, checkpoint=products[1].id)
+        session.add(run)
+        await session.commit()
+
+    await zid_sync.run_push(run.id)
+
+    assert pushes == ["P2", "P3"]
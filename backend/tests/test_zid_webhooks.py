@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlmodel import select
+
+from app.db.session import session_scope
+from app.models import (
+    ProductInventory,
+    ReservationStatus,
+    VoucherReservation,
+    ZidWebhookEvent,
+    ZidWebhookStatus,
+)
+from app.services import zid_webhooks
+from app.services.zid_webhooks import processor
+
+
+def _order(event: str, order_id: int, quantity: int = 2, **fields: Any) -> dict[str, Any]:
+    return {
+        "event": event,
+        "id": order_id,
+        "products": [{"sku": "CARD", "quantity": quantity}],
+        **fields,
+    }
+
+
+async def _send(event_id: str, payload: dict[str, Any]) -> bool:
+    async with session_scope() as session:
+        return await zid_webhooks.record(
+            session, event_id=event_id, event_type=payload["event"], payload=payload
+        )
+
+
+async def _drain() -> None:
+    while await processor.process_batch():
+        pass
+
+
+async def _events() -> dict[str, tuple[ZidWebhookStatus, str | None]]:
+    async with session_scope() as session:
+        result = await session.exec(select(ZidWebhookEvent))
+        return {event.event_id: (event.status, event.error) for event in result.all()}
+
+
+async def _reservations() -> list[ReservationStatus]:
+    async with session_scope() as session:
+        result = await session.exec(
+            select(VoucherReservation).order_by(VoucherReservation.created_at)
+        )
+        return [reservation.status for reservation in result.all()]
+
+
+async def _stock(product_id: int) -> tuple[int, int, int]:
+    async with session_scope() as session:
+        row = await session.get(ProductInventory, product_id)
+        return row.available, row.reserved, row.redeemed
+
+
+async def test_duplicate_delivery_is_applied_once(make_product) -> None:
+    product_id = await make_product(codes=5, sku="CARD")
+
+    assert await _send("evt-1", _order("order.create", 70)) is True
+    assert await _send("evt-1", _order("order.create", 70)) is False
+    await _drain()
+    # A redelivery under a new id is recognised by the order's reservation reference.
+    assert await _send("evt-2", _order("order.create", 70)) is True
+    await _drain()
+
+    assert await _reservations() == [ReservationStatus.ACTIVE]
+    assert await _stock(product_id) == (3, 2, 0)
+    assert {status for status, _ in (await _events()).values()} == {ZidWebhookStatus.PROCESSED}
+
+
+async def test_paid_update_confirms_and_replayed_create_is_harmless(make_product) -> None:
+    product_id = await make_product(codes=5, sku="CARD")
+
+    await _send("evt-1", _order("order.create", 71))
+    await _drain()
+    await _send("evt-2", _order("order.status.update", 71, order_status="ready"))
+    await _drain()
+    await _send("evt-3", _order("order.create", 71))
+    await _drain()
+
+    assert await _reservations() == [ReservationStatus.CONFIRMED]
+    assert await _stock(product_id) == (3, 0, 2)
+
+
+async def test_only_the_latest_pending_event_of_an_order_is_applied(make_product) -> None:
+    product_id = await make_product(codes=5, sku="CARD")
+
+    await _send("evt-1", _order("order.create", 72))
+    await _send("evt-2", _order("order.status.update", 72, order_status="ready"))
+    await _send("evt-3", _order("order.status.update", 72, order_status="cancelled"))
+    await _drain()
+
+    events = await _events()
+    assert events["evt-3"] == (ZidWebhookStatus.PROCESSED, None)
+    assert [events[key][0] for key in ("evt-1", "evt-2")] == [ZidWebhookStatus.IGNORED] * 2
+    assert await _reservations() == []
+    assert await _stock(product_id) == (5, 0, 0)
+
+
+async def test_events_arriving_after_a_cancellation_are_ignored(make_product) -> None:
+    product_id = await make_product(codes=5, sku="CARD")
+
+    await _send("evt-1", _order("order.create", 73))
+    await _drain()
+    await _send("evt-2", _order("order.status.update", 73, order_status="cancelled"))
+    await _drain()
+    assert await _reservations() == [ReservationStatus.RELEASED]
+
+    # Zid retries the original create (new delivery id) after the cancellation landed.
+    await _send("evt-3", _order("order.create", 73))
+    await _send("evt-4", _order("order.status.update", 74, order_status="ready"))
+    await _drain()
+
+    assert await _reservations() == [ReservationStatus.RELEASED, ReservationStatus.CONFIRMED]
+    assert await _stock(product_id) == (3, 0, 2)